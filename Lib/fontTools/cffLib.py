@@ -137,25 +137,35 @@ class CFFWriter(object):
 		self.data.append(table)
 
 	def toFile(self, file):
-		lastPosList = None
-		count = 1
-		while True:
-			log.log(DEBUG, "CFFWriter.toFile() iteration: %d", count)
-			count = count + 1
-			pos = 0
-			posList = [pos]
-			for item in self.data:
-				if hasattr(item, "getDataLength"):
-					endPos = pos + item.getDataLength()
-				else:
-					endPos = pos + len(item)
-				if hasattr(item, "setPos"):
-					item.setPos(pos, endPos)
-				pos = endPos
-				posList.append(pos)
-			if posList == lastPosList:
-				break
-			lastPosList = posList
+		# The offsets in the dicts depend on the layout, and the layout on
+		# the number of bytes the offsets take.  The first pass lays the
+		# items out with every offset taking 5 bytes, the most a number can
+		# take, so that each value is an upper bound of its final one; then
+		# each offset gets the fewest bytes that fit all the values it can
+		# still take, and the second pass is final, as the lengths no longer
+		# depend on the positions.  The lengths of the items without offsets,
+		# like the INDEXes of charstrings, are only computed in the first pass.
+		# The dicts are compiled once beforehand, so that the strings they
+		# use (like the FontNames of the FDArray, which comes after the
+		# INDEX of strings) are all in it from the first pass: no item may
+		# grow between the passes.
+		data = self.data
+		offsetDicts = []
+		for item in data:
+			if hasattr(item, "setPos"):
+				item.setPos(0, 0)
+				if item.parent not in offsetDicts:
+					offsetDicts.append(item.parent)
+		for item in data:
+			if getattr(item, "variableLength", True) and hasattr(item, "getDataLength"):
+				item.getDataLength()
+		lengths = [None] * len(data)
+		self.layOut(lengths, 1)
+		# the items can only move back by the bytes saved on the offsets
+		maxShrink = 4 * sum(d.getNumOffsets() for d in offsetDicts)
+		for offsetDict in offsetDicts:
+			offsetDict.fixOffsetSizes(maxShrink)
+		lastPosList = self.layOut(lengths, 2)
 		log.log(DEBUG, "CFFWriter.toFile() writing to file.")
 		begin = file.tell()
 		posList = [0]
@@ -171,6 +181,65 @@ class CFFWriter(object):
 			posList.append(file.tell() - begin)
 		assert posList == lastPosList
 
+	def layOut(self, lengths, count):
+		log.log(DEBUG, "CFFWriter.toFile() pass: %d", count)
+		pos = 0
+		posList = [pos]
+		for i in range(len(self.data)):
+			item = self.data[i]
+			length = lengths[i]
+			if length is None:
+				if hasattr(item, "getDataLength"):
+					length = item.getDataLength()
+					if not getattr(item, "variableLength", True):
+						lengths[i] = length
+				else:
+					length = lengths[i] = len(item)
+			endPos = pos + length
+			if hasattr(item, "setPos"):
+				item.setPos(pos, endPos)
+			pos = endPos
+			posList.append(pos)
+		return posList
+
+
+def decodeOffsets(data, offSize):
+	"""Return the list of the big-endian numbers of 'offSize' bytes in
+	'data', as in the offset array of an INDEX."""
+	count = len(data) // offSize
+	if offSize == 1:
+		return list(bytearray(data))
+	if offSize == 2:
+		return list(struct.unpack(">%dH" % count, data))
+	if offSize == 4:
+		return list(struct.unpack(">%dL" % count, data))
+	try:
+		import numpy
+	except ImportError:
+		numpy = None
+	if numpy is not None:
+		b = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, 3).astype(numpy.uint32)
+		return ((b[:, 0] << 16) | (b[:, 1] << 8) | b[:, 2]).tolist()
+	b = bytearray(data)
+	return [(b[i] << 16) | (b[i+1] << 8) | b[i+2] for i in range(0, len(b), 3)]
+
+
+def encodeOffsets(offsets, offSize):
+	"""Return the offsets as big-endian numbers of 'offSize' bytes, as in
+	the offset array of an INDEX."""
+	count = len(offsets)
+	if offSize == 1:
+		return bytesjoin([bytechr(offset) for offset in offsets])
+	if offSize == 2:
+		return struct.pack(">%dH" % count, *offsets)
+	data = struct.pack(">%dL" % count, *offsets)
+	if offSize == 3:
+		# drop the high byte of each number
+		data = bytearray(data)
+		del data[::4]
+		data = bytes(data)
+	return data
+
 
 def calcOffSize(largestOffset):
 	if largestOffset < 0x100:
@@ -189,11 +258,17 @@ class IndexCompiler(object):
 	def __init__(self, items, strings, parent):
 		self.items = self.getItems(items, strings)
 		self.parent = parent
+		# An INDEX of dicts changes length as the offsets in the dicts are
+		# laid out; the offsets of the other INDEXes are computed once.
+		self.variableLength = any(hasattr(item, "getDataLength") for item in self.items)
+		self.offsets = None
 
 	def getItems(self, items, strings):
 		return items
 
 	def getOffsets(self):
+		if self.offsets is not None and not self.variableLength:
+			return self.offsets
 		# An empty INDEX contains only the count field.
 		if self.items:
 			pos = 1
@@ -206,6 +281,7 @@ class IndexCompiler(object):
 				offsets.append(pos)
 		else:
 			offsets = []
+		self.offsets = offsets
 		return offsets
 
 	def getDataLength(self):
@@ -230,12 +306,7 @@ class IndexCompiler(object):
 		if self.items:
 			offSize = calcOffSize(offsets[-1])
 			writeCard8(file, offSize)
-			offSize = -offSize
-			pack = struct.pack
-			for offset in offsets:
-				binOffset = pack(">l", offset)[offSize:]
-				assert len(binOffset) == -offSize
-				file.write(binOffset)
+			file.write(encodeOffsets(offsets, offSize))
 			for item in self.items:
 				if hasattr(item, "toFile"):
 					item.toFile(file)
@@ -245,9 +316,26 @@ class IndexCompiler(object):
 
 class IndexedStringsCompiler(IndexCompiler):
 
+	def __init__(self, items, strings, parent):
+		IndexCompiler.__init__(self, items, strings, parent)
+		# strings are added as the dicts are compiled
+		self.variableLength = True
+
 	def getItems(self, items, strings):
 		return items.strings
 
+	def getOffsets(self):
+		# only the offsets of the strings added since the last call are computed
+		offsets = self.offsets or [1]
+		pos = offsets[-1]
+		for item in self.items[len(offsets)-1:]:
+			pos = pos + len(item)
+			offsets.append(pos)
+		self.offsets = offsets
+		if not self.items:
+			return []
+		return offsets
+
 
 class TopDictIndexCompiler(IndexCompiler):
 
@@ -283,12 +371,7 @@ class FDArrayIndexCompiler(IndexCompiler):
 		writeCard16(file, len(self.items))
 		offSize = calcOffSize(offsets[-1])
 		writeCard8(file, offSize)
-		offSize = -offSize
-		pack = struct.pack
-		for offset in offsets:
-			binOffset = pack(">l", offset)[offSize:]
-			assert len(binOffset) == -offSize
-			file.write(binOffset)
+		file.write(encodeOffsets(offsets, offSize))
 		for item in self.items:
 			if hasattr(item, "toFile"):
 				item.toFile(file)
@@ -296,7 +379,7 @@ class FDArrayIndexCompiler(IndexCompiler):
 				file.write(item)
 
 	def setPos(self, pos, endPos):
-		self.parent.rawDict["FDArray"] = pos
+		self.parent.setOffset("FDArray", pos)
 
 
 class GlobalSubrsCompiler(IndexCompiler):
@@ -310,11 +393,41 @@ class GlobalSubrsCompiler(IndexCompiler):
 class SubrsCompiler(GlobalSubrsCompiler):
 	def setPos(self, pos, endPos):
 		offset = pos - self.parent.pos
-		self.parent.rawDict["Subrs"] = offset
+		self.parent.setOffset("Subrs", offset)
 
 class CharStringsCompiler(GlobalSubrsCompiler):
 	def setPos(self, pos, endPos):
-		self.parent.rawDict["CharStrings"] = pos
+		self.parent.setOffset("CharStrings", pos)
+
+
+class BufferReader(object):
+
+	"""A read-only file object on the data of a CFF table (a byte string or
+	a memoryview), from which the items of the INDEXes are sliced without
+	being copied."""
+
+	def __init__(self, data):
+		self.buffer = memoryview(data)
+		self.pos = 0
+
+	def read(self, size=-1):
+		start = self.pos
+		end = len(self.buffer)
+		if 0 <= size < end - start:
+			end = start + size
+		self.pos = max(start, end)
+		return self.buffer[start:end].tobytes()
+
+	def seek(self, pos, whence=0):
+		if whence == 1:
+			pos = pos + self.pos
+		elif whence == 2:
+			pos = pos + len(self.buffer)
+		self.pos = pos
+		return pos
+
+	def tell(self):
+		return self.pos
 
 
 class Index(object):
@@ -337,13 +450,7 @@ class Index(object):
 		offSize = readCard8(file)
 		log.log(DEBUG, "    index count: %s offSize: %s", count, offSize)
 		assert offSize <= 4, "offSize too large: %s" % offSize
-		self.offsets = offsets = []
-		pad = b'\0' * (4 - offSize)
-		for index in range(count+1):
-			chunk = file.read(offSize)
-			chunk = pad + chunk
-			offset, = struct.unpack(">L", chunk)
-			offsets.append(int(offset))
+		self.offsets = offsets = decodeOffsets(file.read((count+1) * offSize), offSize)
 		self.offsetBase = file.tell() - 1
 		file.seek(self.offsetBase + offsets[-1])  # pretend we've read the whole lot
 		log.log(DEBUG, "    end of %s at %s", name, file.tell())
@@ -358,15 +465,40 @@ class Index(object):
 		offset = self.offsets[index] + self.offsetBase
 		size = self.offsets[index+1] - self.offsets[index]
 		file = self.file
-		file.seek(offset)
-		data = file.read(size)
+		if isinstance(file, BufferReader):
+			data = file.buffer[offset:offset+size]
+		else:
+			file.seek(offset)
+			data = file.read(size)
 		assert len(data) == size
 		item = self.produceItem(index, data, file, offset, size)
 		self.items[index] = item
 		return item
 
+	def loadItems(self):
+		"""Produce all the items which were not accessed yet, reading the
+		data of the INDEX at once; for when every item will be used."""
+		items = self.items
+		if None not in items:
+			return
+		offsets = self.offsets
+		offsetBase = self.offsetBase
+		file = self.file
+		if isinstance(file, BufferReader):
+			data = file.buffer[offsetBase+1:offsetBase+offsets[-1]]
+		else:
+			file.seek(offsetBase + 1)
+			data = memoryview(file.read(offsets[-1] - 1))
+		produceItem = self.produceItem
+		for index in range(len(items)):
+			if items[index] is None:
+				start = offsets[index]
+				end = offsets[index+1]
+				items[index] = produceItem(index, data[start-1:end-1], file,
+						offsetBase + start, end - start)
+
 	def produceItem(self, index, data, file, offset, size):
-		return data
+		return tobytes(data)
 
 	def append(self, item):
 		self.items.append(item)
@@ -435,7 +567,7 @@ class TopDictIndex(Index):
 
 	def produceItem(self, index, data, file, offset, size):
 		top = TopDict(self.strings, file, offset, self.GlobalSubrs)
-		top.decompile(data)
+		top.decompile(tobytes(data))
 		return top
 
 	def toXML(self, xmlWriter, progress):
@@ -453,7 +585,7 @@ class FDArrayIndex(TopDictIndex):
 
 	def produceItem(self, index, data, file, offset, size):
 		fontDict = FontDict(self.strings, file, offset, self.GlobalSubrs)
-		fontDict.decompile(data)
+		fontDict.decompile(tobytes(data))
 		return fontDict
 
 	def fromXML(self, name, attrs, content):
@@ -538,6 +670,12 @@ class CharStrings(object):
 			if fdArray is not None:
 				self.fdArray = fdArray
 
+	def loadAll(self):
+		"""Load all the charstrings at once, rather than on access; for when
+		every glyph will be used."""
+		if self.charStringsAreIndexed:
+			self.charStringsIndex.loadItems()
+
 	def keys(self):
 		return list(self.charStrings.keys())
 
@@ -865,7 +1003,7 @@ class CharsetCompiler(object):
 		self.parent = parent
 
 	def setPos(self, pos, endPos):
-		self.parent.rawDict["charset"] = pos
+		self.parent.setOffset("charset", pos)
 
 	def getDataLength(self):
 		return len(self.data)
@@ -993,7 +1131,7 @@ class EncodingCompiler(object):
 		self.parent = parent
 
 	def setPos(self, pos, endPos):
-		self.parent.rawDict["Encoding"] = pos
+		self.parent.setOffset("Encoding", pos)
 
 	def getDataLength(self):
 		return len(self.data)
@@ -1243,7 +1381,7 @@ class FDSelectCompiler(object):
 		self.parent = parent
 
 	def setPos(self, pos, endPos):
-		self.parent.rawDict["FDSelect"] = pos
+		self.parent.setOffset("FDSelect", pos)
 
 	def getDataLength(self):
 		return len(self.data)
@@ -1388,10 +1526,31 @@ class DictCompiler(object):
 				continue
 			rawDict[name] = value
 		self.rawDict = rawDict
+		# the number of bytes each value of the operators whose values
+		# are offsets (or sizes) of other items is encoded in
+		self.offsetSizes = {}
 
 	def setPos(self, pos, endPos):
 		pass
 
+	def setOffset(self, name, value):
+		self.rawDict[name] = value
+		if name not in self.offsetSizes:
+			numValues = len(value) if isinstance(value, tuple) else 1
+			self.offsetSizes[name] = (5,) * numValues
+
+	def getNumOffsets(self):
+		return sum(len(sizes) for sizes in self.offsetSizes.values())
+
+	def fixOffsetSizes(self, maxShrink):
+		"""Encode each offset in the fewest bytes that fit its current
+		value and the ones down to 'maxShrink' less."""
+		for name in self.offsetSizes:
+			value = self.rawDict[name]
+			values = value if isinstance(value, tuple) else (value,)
+			self.offsetSizes[name] = tuple(
+				calcNumberSize(max(0, v - maxShrink), v) for v in values)
+
 	def getDataLength(self):
 		return len(self.compile("getDataLength"))
 
@@ -1404,7 +1563,12 @@ class DictCompiler(object):
 			if value is None:
 				continue
 			op, argType = self.opcodes[name]
-			if isinstance(argType, tuple):
+			sizes = self.offsetSizes.get(name)
+			if sizes is not None:
+				values = value if isinstance(value, tuple) else (value,)
+				for v, size in zip(values, sizes):
+					data.append(encodeIntCFFSize(v, size))
+			elif isinstance(argType, tuple):
 				l = len(argType)
 				assert len(value) == l, "value doesn't match arg type"
 				for i in range(l):
@@ -1449,6 +1613,29 @@ def encodeNumber(num):
 		return psCharStrings.encodeIntCFF(num)
 
 
+def calcNumberSize(low, high):
+	"""Return the fewest bytes in which all the integers from 'low' to
+	'high' can be encoded in a dict."""
+	if -107 <= low and high <= 107:
+		return 1
+	if 108 <= low and high <= 1131:
+		return 2
+	if -32768 <= low and high <= 32767:
+		return 3
+	return 5
+
+
+def encodeIntCFFSize(value, size):
+	"""Encode an integer in a dict in 'size' bytes (see calcNumberSize)."""
+	if size == 3:
+		return bytechr(28) + struct.pack(">h", value)
+	if size == 5:
+		return bytechr(29) + struct.pack(">l", value)
+	data = psCharStrings.encodeIntCFF(value)
+	assert len(data) == size
+	return data
+
+
 class TopDictCompiler(DictCompiler):
 
 	opcodes = buildOpcodeDict(topDictOperators)
@@ -1520,7 +1707,7 @@ class PrivateDictCompiler(DictCompiler):
 
 	def setPos(self, pos, endPos):
 		size = endPos - pos
-		self.parent.rawDict["Private"] = size, pos
+		self.parent.setOffset("Private", (size, pos))
 		self.pos = pos
 
 	def getChildren(self, strings):
@@ -1618,6 +1805,7 @@ class TopDict(BaseDict):
 
 	def decompileAllCharStrings(self, progress):
 		# XXX only when doing ttdump -i?
+		self.CharStrings.loadAll()
 		i = 0
 		for charString in self.CharStrings.values():
 			try:
@@ -682,6 +682,33 @@ def mapFeatures(self, featureMap):
 		s.Script.mapFeatures(featureMap)
 
 
+def _loadTables(font):
+	for tag in font.keys():
+		with timer("load '%s'" % tag):
+			font[tag]
+
+# The fonts are only loaded by a pool of processes when their tables add
+# up to at least this many bytes: for smaller fonts, starting the processes
+# and sending the loaded fonts back to the parent costs more than loading
+# them in-process.
+POOL_MIN_SIZE = 1 << 20
+
+def _tablesSize(font):
+	reader = font.reader
+	return sum(reader.tables[tag].length for tag in reader.keys())
+
+def _loadFont(job):
+	# Helper for Merger._loadFonts, run in the worker processes.
+	fontfile, glyphOrder = job
+	font = ttLib.TTFont(fontfile)
+	font.setGlyphOrder(glyphOrder)
+	_loadTables(font)
+	# The file can't be sent back to the parent process.
+	font.reader.close()
+	font.reader = None
+	return font
+
+
 class Options(object):
 
 	class UnknownOptionError(Exception):
@@ -691,6 +718,7 @@ class Options(object):
 
 		self.verbose = False
 		self.timing = False
+		self.workers = 1
 
 		self.set(**kwargs)
 
@@ -778,14 +806,17 @@ class Merger(object):
 		# Settle on a mega glyph order.
 		#
 		fonts = [ttLib.TTFont(fontfile) for fontfile in fontfiles]
-		glyphOrders = [font.getGlyphOrder() for font in fonts]
+		glyphOrders = [list(font.getGlyphOrder()) for font in fonts]
 		megaGlyphOrder = self._mergeGlyphOrders(glyphOrders)
-		# Reload fonts and set new glyph names on them.
-		# TODO Is it necessary to reload font?  I think it is.  At least
-		# it's safer, in case tables were loaded to provide glyph names.
-		fonts = [ttLib.TTFont(fontfile) for fontfile in fontfiles]
+		# Set new glyph names on the fonts.  The tables that were loaded
+		# to provide the old names are dropped, to be decompiled again
+		# with the new ones.
 		for font,glyphOrder in zip(fonts, glyphOrders):
+			for tag in list(font.tables.keys()):
+				if tag != 'GlyphOrder':
+					del font.tables[tag]
 			font.setGlyphOrder(glyphOrder)
+		fonts = self._loadFonts(fontfiles, fonts)
 		mega.setGlyphOrder(megaGlyphOrder)
 
 		for font in fonts:
@@ -825,6 +856,24 @@ class Merger(object):
 
 		return mega
 
+	def _loadFonts(self, fontfiles, fonts):
+		"""Decompiles all the tables of the fonts.  If the 'workers' option
+		is greater than 1, and the fonts are large enough (see POOL_MIN_SIZE),
+		the font files are loaded again by a pool of as many processes (this
+		requires the concurrent.futures module), each font in one process.
+		Returns the loaded fonts."""
+		workers = self.options.workers
+		if (workers > 1 and len(fonts) > 1 and
+				sum(_tablesSize(font) for font in fonts) >= POOL_MIN_SIZE):
+			from concurrent.futures import ProcessPoolExecutor
+			jobs = [(fontfile, list(font.getGlyphOrder()))
+				for fontfile,font in zip(fontfiles, fonts)]
+			with ProcessPoolExecutor(max_workers=workers) as executor:
+				return list(executor.map(_loadFont, jobs))
+		for font in fonts:
+			_loadTables(font)
+		return fonts
+
 	def _mergeGlyphOrders(self, glyphOrders):
 		"""Modifies passed-in glyphOrders to reflect new glyph names.
 		Returns glyphOrder for the merged font."""
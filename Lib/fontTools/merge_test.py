@@ -1,12 +1,69 @@
 from fontTools.misc.py23 import *
 from fontTools import ttLib
 from fontTools.merge import *
+import os
+import shutil
+import tempfile
 import unittest
 
 
+def _expectedGlyphOrder(glyphOrder):
+	return [g + "#0" for g in glyphOrder] + [g + "#1" for g in glyphOrder]
+
+
 class MergeIntegrationTest(unittest.TestCase):
-	# TODO
-	pass
+
+	def setUp(self):
+		self.tempdir = tempfile.mkdtemp()
+		path, _ = os.path.split(__file__)
+		font = ttLib.TTFont()
+		font.importXML(os.path.join(path, "subset", "testdata", "TestTTF-Regular.ttx"))
+		self.fontfiles = []
+		for i in range(2):
+			fontfile = os.path.join(self.tempdir, "font%d.ttf" % i)
+			font.save(fontfile)
+			self.fontfiles.append(fontfile)
+		self.glyphOrder = font.getGlyphOrder()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempdir)
+
+	def test_glyph_names(self):
+		mega = Merger().merge(self.fontfiles)
+		self.assertEqual(mega.getGlyphOrder(), _expectedGlyphOrder(self.glyphOrder))
+		self.assertEqual(sorted(mega['glyf'].keys()), sorted(mega.getGlyphOrder()))
+		self.assertEqual(sorted(mega['hmtx'].metrics.keys()), sorted(mega.getGlyphOrder()))
+
+	def test_workers(self):
+		try:
+			import concurrent.futures
+		except ImportError:
+			self.skipTest("concurrent.futures not available")
+		expected = BytesIO()
+		font = Merger().merge(self.fontfiles)
+		font.recalcTimestamp = False
+		font.save(expected)
+		# the test fonts are too small for the pool to be used by default
+		import fontTools.merge
+		minSize = fontTools.merge.POOL_MIN_SIZE
+		fontTools.merge.POOL_MIN_SIZE = 0
+		try:
+			mega = Merger(Options(workers=2)).merge(self.fontfiles)
+		finally:
+			fontTools.merge.POOL_MIN_SIZE = minSize
+		self.assertEqual(mega.getGlyphOrder(), _expectedGlyphOrder(self.glyphOrder))
+		out = BytesIO()
+		# the merged 'head' is modified at merge time
+		mega['head'].modified = font['head'].modified
+		mega.recalcTimestamp = False
+		mega.save(out)
+		self.assertEqual(out.getvalue(), expected.getvalue())
+
+	def test_workers_small_fonts(self):
+		merger = Merger(Options(workers=2))
+		fonts = [ttLib.TTFont(fontfile) for fontfile in self.fontfiles]
+		loaded = merger._loadFonts(self.fontfiles, fonts)
+		self.assertEqual([id(font) for font in loaded], [id(font) for font in fonts])
 
 class CmapMergeUnitTest(unittest.TestCase):
 	def setUp(self):
@@ -443,14 +443,14 @@ class CapturingLogHandler(logging.Handler):
 		self.original_level = self.logger.level
 
 		self.logger.addHandler(self)
-		self.logger.level = self.level
+		self.logger.setLevel(self.level)
 		self.logger.disabled = False
 
 		return self
 
 	def __exit__(self, type, value, traceback):
 		self.logger.removeHandler(self)
-		self.logger.level = self.original_level
+		self.logger.setLevel(self.original_level)
 		self.logger.disabled = self.logger.disabled
 		return self
 
@@ -353,7 +353,7 @@ class T2CharString(ByteCodeBase):
 	def getBytes(self, index, nBytes):
 		if self.bytecode is not None:
 			newIndex = index + nBytes
-			bytes = self.bytecode[index:newIndex]
+			bytes = tobytes(self.bytecode[index:newIndex])
 			index = newIndex
 		else:
 			bytes = self.program[index]
@@ -492,13 +492,36 @@ class T1CharString(T2CharString):
 		self.width = extractor.width
 
 
+def getOperatorHandlers(cls):
+	"""Return a dict mapping the operators to the op_* methods (as plain
+	functions) of a decompiler class; it is built once for each class."""
+	handlers = cls.__dict__.get("_operatorHandlers")
+	if handlers is None:
+		handlers = {}
+		for name in dir(cls):
+			if name.startswith("op_"):
+				handlers[name[3:]] = getattr(cls, name)
+		cls._operatorHandlers = handlers
+	return handlers
+
+
 class SimpleT2Decompiler(object):
 
-	def __init__(self, localSubrs, globalSubrs):
+	# A dict in which the effects of the subroutines are remembered, when
+	# executing a subroutine twice from the same state would have no other
+	# effect than the first time (see executeSubr).
+	subrEffects = None
+
+	# The lowest depth of the operand stack since the subroutine being
+	# executed for executeSubr was called
+	stackFloor = 0
+
+	def __init__(self, localSubrs, globalSubrs, subrEffects=None):
 		self.localSubrs = localSubrs
 		self.localBias = calcSubrBias(localSubrs)
 		self.globalSubrs = globalSubrs
 		self.globalBias = calcSubrBias(globalSubrs)
+		self.subrEffects = subrEffects
 		self.reset()
 
 	def reset(self):
@@ -509,12 +532,13 @@ class SimpleT2Decompiler(object):
 
 	def execute(self, charString):
 		self.callingStack.append(charString)
-		needsDecompilation = charString.needsDecompilation()
-		if needsDecompilation:
-			program = []
-			pushToProgram = program.append
-		else:
-			pushToProgram = lambda x: None
+		handlers = getOperatorHandlers(self.__class__)
+		if not charString.needsDecompilation():
+			self.executeProgram(charString.program, handlers)
+			del self.callingStack[-1]
+			return
+		program = []
+		pushToProgram = program.append
 		pushToStack = self.operandStack.append
 		index = 0
 		while True:
@@ -523,10 +547,9 @@ class SimpleT2Decompiler(object):
 				break  # we're done!
 			pushToProgram(token)
 			if isOperator:
-				handlerName = "op_" + token
-				handler = getattr(self, handlerName, None)
+				handler = handlers.get(token)
 				if handler is not None:
-					rv = handler(index)
+					rv = handler(self, index)
 					if rv:
 						hintMaskBytes, index = rv
 						pushToProgram(hintMaskBytes)
@@ -534,21 +557,86 @@ class SimpleT2Decompiler(object):
 					self.popall()
 			else:
 				pushToStack(token)
-		if needsDecompilation:
-			assert program, "illegal CharString: decompiled to empty program"
-			assert program[-1] in ("endchar", "return", "callsubr", "callgsubr",
-					"seac"), "illegal CharString"
-			charString.setProgram(program)
+		assert program, "illegal CharString: decompiled to empty program"
+		assert program[-1] in ("endchar", "return", "callsubr", "callgsubr",
+				"seac"), "illegal CharString"
+		charString.setProgram(program)
 		del self.callingStack[-1]
 
+	def executeProgram(self, program, handlers):
+		# the tokens of decompiled charstrings are used as they are
+		pushToStack = self.operandStack.append
+		index = 0
+		end = len(program)
+		while index < end:
+			token = program[index]
+			index = index + 1
+			if isinstance(token, basestring):
+				handler = handlers.get(token)
+				if handler is not None:
+					rv = handler(self, index)
+					if rv:
+						index = rv[1]
+				else:
+					self.popall()
+			else:
+				pushToStack(token)
+
+	def executeSubr(self, subr):
+		"""Execute a subroutine; or if 'subrEffects' is a dict and the
+		subroutine was executed before from the same state, just leave the
+		operand stack and the hint counts as it left them then.
+
+		The effect of a subroutine which doesn't pop the operands that were
+		on the stack when it was called, nor uses the hint count, is kept for
+		any caller with the same hintMaskBytes and number of operands (an
+		operator which clears the stack also clears those of the caller);
+		otherwise it's only kept for the same operands and hint count. The dict can be shared by the
+		decompilers of all the glyphs of a font, as long as the charstrings
+		are not modified.
+		"""
+		subrEffects = self.subrEffects
+		if subrEffects is None:
+			self.execute(subr)
+			return
+		stack = self.operandStack
+		hintCount = self.hintCount
+		hintMaskBytes = self.hintMaskBytes
+		depth = len(stack)
+		key = (subr, id(self.localSubrs), hintMaskBytes, depth)
+		effect = subrEffects.get(key)
+		if effect is not None:
+			pushed, hintCountDelta, self.hintMaskBytes = effect
+			stack.extend(pushed)
+			self.hintCount = hintCount + hintCountDelta
+			return
+		exactKey = key + (hintCount, tuple(stack))
+		effect = subrEffects.get(exactKey)
+		if effect is not None:
+			stack[:], self.hintCount, self.hintMaskBytes = effect
+			self.stackFloor = 0
+			return
+		stackFloor = self.stackFloor
+		self.stackFloor = depth
+		self.execute(subr)
+		if self.stackFloor == depth and (hintMaskBytes or not self.hintMaskBytes):
+			subrEffects[key] = (stack[depth:], self.hintCount - hintCount,
+					self.hintMaskBytes)
+		else:
+			subrEffects[exactKey] = (stack[:], self.hintCount, self.hintMaskBytes)
+		self.stackFloor = min(stackFloor, self.stackFloor)
+
 	def pop(self):
 		value = self.operandStack[-1]
 		del self.operandStack[-1]
+		if len(self.operandStack) < self.stackFloor:
+			self.stackFloor = len(self.operandStack)
 		return value
 
 	def popall(self):
 		stack = self.operandStack[:]
 		self.operandStack[:] = []
+		self.stackFloor = 0
 		return stack
 
 	def push(self, value):
@@ -567,12 +655,12 @@ class SimpleT2Decompiler(object):
 	def op_callsubr(self, index):
 		subrIndex = self.pop()
 		subr = self.localSubrs[subrIndex+self.localBias]
-		self.execute(subr)
+		self.executeSubr(subr)
 
 	def op_callgsubr(self, index):
 		subrIndex = self.pop()
 		subr = self.globalSubrs[subrIndex+self.globalBias]
-		self.execute(subr)
+		self.executeSubr(subr)
 
 	def op_hstem(self, index):
 		self.countHints()
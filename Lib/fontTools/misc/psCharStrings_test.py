@@ -0,0 +1,85 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.misc.psCharStrings import T2CharString, SimpleT2Decompiler
+import unittest
+
+
+class CountingT2Decompiler(SimpleT2Decompiler):
+
+    def reset(self):
+        SimpleT2Decompiler.reset(self)
+        self.executed = []
+
+    def execute(self, charString):
+        self.executed.append(charString)
+        SimpleT2Decompiler.execute(self, charString)
+
+
+def run(program, subrs, subrEffects):
+    decompiler = CountingT2Decompiler(subrs, [], subrEffects)
+    decompiler.execute(T2CharString(program=program))
+    return decompiler
+
+
+class SubrEffectsTest(unittest.TestCase):
+
+    def test_independent(self):
+        # the subroutine only pops its own operands: its effect is reused
+        # whatever the hint count, for callers with as many operands
+        subr = T2CharString(program=[10, 20, 30, 40, 'hstem', 5, 'return'])
+        subrs = [subr]
+        subrEffects = {}
+        first = run([-107, 'callsubr', 'endchar'], subrs, subrEffects)
+        self.assertEqual(first.hintCount, 2)
+        self.assertEqual(first.executed.count(subr), 1)
+        second = run([1, 2, 'vstem', -107, 'callsubr'], subrs, subrEffects)
+        self.assertEqual(second.executed.count(subr), 0)
+        self.assertEqual(second.operandStack, [5])
+        self.assertEqual(second.hintCount, 3)
+
+    def test_clears_caller_operands(self):
+        # the stem clears the operand of the caller too
+        subr = T2CharString(program=[10, 20, 30, 40, 'hstem', 5, 'return'])
+        subrs = [subr]
+        subrEffects = {}
+        run([-107, 'callsubr', 'endchar'], subrs, subrEffects)
+        second = run([1, 2, 'vstem', 7, -107, 'callsubr'], subrs, subrEffects)
+        self.assertEqual(second.executed.count(subr), 1)
+        self.assertEqual(second.operandStack, [5])
+        self.assertEqual(second.hintCount, 3)
+        third = run([1, 2, 'vstem', 7, -107, 'callsubr'], subrs, subrEffects)
+        self.assertEqual(third.executed.count(subr), 0)
+        self.assertEqual(third.operandStack, [5])
+        self.assertEqual(third.hintCount, 3)
+
+    def test_dependent(self):
+        # the stem uses the operands pushed by the caller
+        subr = T2CharString(program=['hstem', 'return'])
+        subrs = [subr]
+        subrEffects = {}
+        first = run([10, 20, -107, 'callsubr', 'endchar'], subrs, subrEffects)
+        self.assertEqual(first.hintCount, 1)
+        second = run([10, 20, 30, 40, -107, 'callsubr', 'endchar'], subrs, subrEffects)
+        self.assertEqual(second.executed.count(subr), 1)
+        self.assertEqual(second.hintCount, 2)
+        third = run([10, 20, -107, 'callsubr', 'endchar'], subrs, subrEffects)
+        self.assertEqual(third.executed.count(subr), 0)
+        self.assertEqual(third.hintCount, 1)
+
+    def test_hintmask(self):
+        # the first hintmask sets the mask size from the hint count
+        subr = T2CharString(program=['hintmask', b'\x80', 'return'])
+        subrs = [subr]
+        subrEffects = {}
+        first = run([1, 2, 'hstemhm', -107, 'callsubr', 'endchar'], subrs, subrEffects)
+        self.assertEqual(first.hintMaskBytes, 1)
+        program = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18,
+                   'hstemhm', -107, 'callsubr', 'endchar']
+        with self.assertRaises(AssertionError):
+            # the mask of the subroutine is too short for 9 hints
+            run(program, subrs, subrEffects)
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(unittest.main())
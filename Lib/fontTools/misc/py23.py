@@ -121,6 +121,8 @@ def strjoin(iterable, joiner=''):
 	return tostr(joiner).join(iterable)
 
 def tobytes(s, encoding='ascii', errors='strict'):
+	if isinstance(s, memoryview):
+		return s.tobytes()
 	if not isinstance(s, bytes):
 		return s.encode(encoding, errors)
 	else:
@@ -148,7 +150,7 @@ else:
 		@staticmethod
 		def transcode(blob):
 			if not isinstance(blob, str):
-				blob = blob.decode('latin-1')
+				blob = tobytes(blob).decode('latin-1')
 			return blob
 
 		def __new__(self, content):
@@ -25,6 +25,9 @@ class FakeFont:
     def getGlyphID(self, name):
         return self.glyphOrder_.index(name)
 
+    def getGlyphIDs(self, names):
+        return [self.getGlyphID(name) for name in names]
+
     def getGlyphName(self, glyphID):
         if glyphID < len(self.glyphOrder_):
             return self.glyphOrder_[glyphID]
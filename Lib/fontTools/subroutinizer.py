@@ -0,0 +1,589 @@
+"""Subroutinize the CharStrings of CFF fonts.
+
+The charstrings are desubroutinized and split into commands (the operands
+and operator of each stack-clearing operator, with the mask of hintmask
+and cntrmask).  The sequences of commands that are repeated in the font
+are found with a suffix array of all the commands, and the ones that save
+the most bytes are moved to global and local subroutines.  Subroutines
+always start and end at command boundaries, so the argument stack is
+empty when they are called, and they don't call other subroutines, so the
+nesting limit of the Type 2 charstrings is respected.
+
+Usage:
+    $ python -m fontTools.subroutinizer font.otf [output.otf]
+prints the time it takes and the size of the CFF table before and after.
+"""
+
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.misc import psCharStrings
+from fontTools import cffLib
+import logging
+
+log = logging.getLogger(__name__)
+
+
+# The maximum number of subroutines in an INDEX
+MAX_SUBRS = 65535
+
+# Estimated number of bytes added by a subroutine: its 'return' operator
+# and its offset in the INDEX
+SUBR_OVERHEAD = 3
+
+# Estimated number of bytes added by a non-empty INDEX of subroutines: its
+# offSize and first offset (the global INDEX is always there, if empty)
+GLOBAL_SUBRS_OVERHEAD = 3
+
+# Same for the local subroutines: the count, offSize and first offset of
+# the INDEX, and the Subrs operator and its operand in the Private dict
+LOCAL_SUBRS_OVERHEAD = 8
+
+# Number of times the subroutines are selected again with the costs of the
+# calls to the subroutines kept so far
+MAX_ROUNDS = 4
+
+
+def _desubroutinize(program, localSubrs, globalSubrs, result=None):
+	"""Return the decompiled program with the subroutine calls replaced by
+	the subroutines' programs (without their 'return')."""
+	if result is None:
+		result = []
+	localBias = psCharStrings.calcSubrBias(localSubrs)
+	globalBias = psCharStrings.calcSubrBias(globalSubrs)
+	i = 0
+	end = len(program)
+	while i < end:
+		token = program[i]
+		i += 1
+		if token == 'callsubr':
+			subr = localSubrs[result.pop() + localBias]
+		elif token == 'callgsubr':
+			subr = globalSubrs[result.pop() + globalBias]
+		elif token in ('hintmask', 'cntrmask'):
+			result.append(token)
+			result.append(program[i])
+			i += 1
+			continue
+		elif token == 'return':
+			break
+		else:
+			result.append(token)
+			if token == 'endchar':
+				break
+			continue
+		_desubroutinize(subr.program, localSubrs, globalSubrs, result)
+		if result and result[-1] == 'endchar':
+			break
+	return result
+
+
+def _splitCommands(program):
+	"""Return the commands of a program: tuples of the operands and the
+	operator (with the mask of hintmask and cntrmask operators)."""
+	commands = []
+	start = 0
+	i = 0
+	end = len(program)
+	while i < end:
+		token = program[i]
+		i += 1
+		if isinstance(token, basestring):
+			if token in ('hintmask', 'cntrmask'):
+				i += 1
+			commands.append(tuple(program[start:i]))
+			start = i
+	if start < end:
+		commands.append(tuple(program[start:]))
+	return commands
+
+
+def _commandLength(command):
+	length = 0
+	prev = None
+	for token in command:
+		if prev in ('hintmask', 'cntrmask'):
+			length += len(token)
+		elif isinstance(token, basestring):
+			length += len(psCharStrings.T2CharString.opcodes[token])
+		elif isinstance(token, float):
+			length += 5
+		else:
+			length += len(psCharStrings.encodeIntT2(token))
+		prev = token
+	return length
+
+
+def suffixArray(s):
+	"""Return the suffix array of a sequence of integers (the start
+	positions of its suffixes, in lexicographic order) and the rank of each
+	suffix, by prefix doubling.
+
+	>>> suffixArray([2, 1, 2, 1, 3])
+	([1, 3, 0, 2, 4], [2, 0, 3, 1, 4])
+	"""
+	n = len(s)
+	if not n:
+		return [], []
+	try:
+		import numpy
+	except ImportError:
+		numpy = None
+	if numpy is not None:
+		return _suffixArrayNumpy(numpy, s)
+	values = {v: r for r, v in enumerate(sorted(set(s)))}
+	rank = [values[v] for v in s]
+	sa = list(range(n))
+	k = 1
+	while True:
+		# sort the suffixes by the ranks of their first k and next k items
+		key = [r * (n + 1) for r in rank]
+		for i in range(n - k):
+			key[i] += rank[i + k] + 1
+		sa.sort(key=key.__getitem__)
+		newRank = rank
+		r = 0
+		prev = key[sa[0]]
+		for i in sa:
+			if key[i] != prev:
+				r += 1
+				prev = key[i]
+			newRank[i] = r
+		rank = newRank
+		if r == n - 1:
+			return sa, rank
+		k *= 2
+
+
+def _suffixArrayNumpy(numpy, s):
+	n = len(s)
+	rank = numpy.unique(numpy.array(s), return_inverse=True)[1].astype(numpy.int64)
+	k = 1
+	while True:
+		key = rank * (n + 1)
+		key[:n - k] += rank[k:] + 1
+		sa = numpy.argsort(key, kind='mergesort')
+		key = key[sa]
+		ranks = numpy.zeros(n, dtype=numpy.int64)
+		ranks[1:] = numpy.cumsum(key[1:] != key[:-1])
+		rank = numpy.empty(n, dtype=numpy.int64)
+		rank[sa] = ranks
+		if ranks[-1] == n - 1:
+			return sa.tolist(), rank.tolist()
+		k *= 2
+
+
+def lcpArray(s, sa, rank):
+	"""Return the lengths of the longest common prefixes of the suffixes
+	which are adjacent in the suffix array (lcp[i] is for sa[i-1] and sa[i]),
+	by Kasai's algorithm."""
+	n = len(s)
+	lcp = [0] * n
+	h = 0
+	for i in range(n):
+		r = rank[i]
+		if r:
+			j = sa[r - 1]
+			while i + h < n and j + h < n and s[i + h] == s[j + h]:
+				h += 1
+			lcp[r] = h
+			if h:
+				h -= 1
+		else:
+			h = 0
+	return lcp
+
+
+def repeatedSubstrings(s, sa, lcp, minCount=2):
+	"""Yield the (length, start, end) of the maximal repeated substrings of
+	's', where sa[start:end] are the positions of the substring, from the
+	intervals of the LCP array."""
+	stack = [(0, 0)]  # (lcp, left bound)
+	for i in range(1, len(s) + 1):
+		h = lcp[i] if i < len(s) else 0
+		left = i - 1
+		while h < stack[-1][0]:
+			length, left = stack.pop()
+			if i - left >= minCount:
+				yield length, left, i
+		if h > stack[-1][0]:
+			stack.append((h, left))
+
+
+class _Candidate(object):
+
+	__slots__ = ('commands', 'length', 'cost', 'usage', 'index', 'callCost', 'fds')
+
+	def __init__(self, commands, cost):
+		self.commands = commands
+		self.length = len(commands)
+		self.cost = cost
+		self.usage = 0
+		self.index = None
+		self.callCost = 2
+		self.fds = set()
+
+
+class Subroutinizer(object):
+
+	"""Subroutinize the CharStrings of a CFF font (a cffLib.TopDict)."""
+
+	def __init__(self, font, globalSubrs):
+		self.font = font
+		self.globalSubrs = globalSubrs
+		self.isCID = hasattr(font, "FDArray") and font.FDArray is not None
+
+	def _getPrivates(self):
+		if self.isCID:
+			return [fd.Private for fd in self.font.FDArray]
+		return [self.font.Private]
+
+	def _readGlyphs(self):
+		font = self.font
+		charStrings = font.CharStrings
+		charStrings.loadAll()
+		self.glyphs = []  # (charString, fdIndex, commands, endCommand)
+		for glyphName in font.charset:
+			charString, sel = charStrings.getItemAndSelector(glyphName)
+			charString.decompile()
+			subrs = getattr(charString.private, "Subrs", None) or []
+			program = _desubroutinize(charString.program, subrs, self.globalSubrs)
+			commands = _splitCommands(program)
+			endCommand = None
+			if commands and 'endchar' in commands[-1]:
+				endCommand = commands.pop()
+			self.glyphs.append((charString, sel or 0, commands, endCommand))
+
+	def _findCandidates(self):
+		# Number the distinct commands, and concatenate the commands of all
+		# glyphs, each followed by a unique separator (a negative number)
+		ids = {}
+		costs = []
+		s = []
+		self.glyphStarts = []
+		for i, (_, _, commands, _) in enumerate(self.glyphs):
+			self.glyphStarts.append(len(s))
+			for command in commands:
+				cid = ids.get(command)
+				if cid is None:
+					cid = ids[command] = len(costs)
+					costs.append(_commandLength(command))
+				s.append(cid)
+			s.append(-1 - i)
+		self.glyphStarts.append(len(s))
+		self.commands = [None] * len(costs)
+		for command, cid in ids.items():
+			self.commands[cid] = command
+		self.costs = costs
+		self.s = s
+
+		# Byte offsets of the commands
+		offsets = [0] * (len(s) + 1)
+		total = 0
+		for i, cid in enumerate(s):
+			if cid >= 0:
+				total += costs[cid]
+			offsets[i + 1] = total
+
+		sa, rank = suffixArray(s)
+		lcp = lcpArray(s, sa, rank)
+		candidates = []
+		for length, start, end in repeatedSubstrings(s, sa, lcp):
+			pos = sa[start]
+			cost = offsets[pos + length] - offsets[pos]
+			count = end - start
+			if count * (cost - 2) - cost - SUBR_OVERHEAD <= 0:
+				continue
+			candidates.append((count * (cost - 2) - cost, length, start, end))
+		# Keep the candidates which would save the most
+		candidates.sort(reverse=True)
+		del candidates[2 * MAX_SUBRS * (len(self._getPrivates()) + 1):]
+		self.candidates = []
+		self.starts = starts = {}
+		for _, length, start, end in candidates:
+			pos = sa[start]
+			candidate = _Candidate(s[pos:pos + length],
+					offsets[pos + length] - offsets[pos])
+			self.candidates.append(candidate)
+			for pos in sa[start:end]:
+				starts.setdefault(pos, []).append(candidate)
+
+	def _encodeGlyphs(self):
+		"""Choose the calls to the subroutine candidates that make each glyph
+		the shortest, and count the uses of the candidates."""
+		s = self.s
+		costs = self.costs
+		starts = self.starts
+		for candidate in self.candidates:
+			candidate.usage = 0
+			candidate.fds = set()
+		encodings = []
+		for g, (_, fd, commands, _) in enumerate(self.glyphs):
+			begin = self.glyphStarts[g]
+			size = len(commands)
+			best = [0] * (size + 1)
+			choice = [None] * size
+			for j in range(size - 1, -1, -1):
+				value = costs[s[begin + j]] + best[j + 1]
+				chosen = None
+				for candidate in starts.get(begin + j, ()):
+					if candidate.callCost is None:
+						continue
+					v = candidate.callCost + best[j + candidate.length]
+					if v < value:
+						value = v
+						chosen = candidate
+				best[j] = value
+				choice[j] = chosen
+			encoding = []
+			j = 0
+			while j < size:
+				candidate = choice[j]
+				if candidate is None:
+					encoding.append(s[begin + j])
+					j += 1
+				else:
+					encoding.append(candidate)
+					candidate.usage += 1
+					candidate.fds.add(fd)
+					j += candidate.length
+			encodings.append(encoding)
+		return encodings
+
+	def _assignIndices(self, candidates):
+		"""Put the most used candidates first in the global and local
+		subroutines, and return the candidates that fit."""
+		for candidate in self.candidates:
+			candidate.index = candidate.callCost = None
+		candidates = sorted(candidates, key=lambda c: -c.usage)
+		subrs = {}
+		kept = []
+		for candidate in candidates:
+			if self.isCID:
+				# subroutines used by the glyphs of one FDArray font are local
+				keys = [next(iter(candidate.fds))] if len(candidate.fds) == 1 else []
+				keys.append(None)
+			elif len(kept) % 2:
+				# alternate between the global and local subroutines, to have
+				# twice as many subroutines with one-byte numbers
+				keys = [None, 0]
+			else:
+				keys = [0, None]
+			for key in keys:
+				if key in self.excludedKeys:
+					continue
+				items = subrs.setdefault(key, [])
+				if len(items) < MAX_SUBRS:
+					candidate.index = (key, len(items))
+					items.append(candidate)
+					kept.append(candidate)
+					break
+		for key, items in subrs.items():
+			bias = psCharStrings.calcSubrBias(items)
+			for candidate in items:
+				number = candidate.index[1] - bias
+				candidate.callCost = len(psCharStrings.encodeIntT2(number)) + 1
+		self.subrs = subrs
+		return kept
+
+	def subroutinize(self):
+		self._readGlyphs()
+		self._findCandidates()
+		log.debug("%d candidate subroutines", len(self.candidates))
+		# The INDEXes whose subroutines don't save more than the INDEX costs
+		# are left out, and the subroutines are selected again
+		self.excludedKeys = set()
+		while True:
+			encodings = self._selectSubrs()
+			keys = self._unprofitableKeys()
+			if not keys:
+				break
+			self.excludedKeys.update(keys)
+		log.debug("%d subroutines", sum(len(items) for items in self.subrs.values()))
+		self._build(encodings)
+
+	def _selectSubrs(self):
+		"""Select the subroutines, and return the encodings of the glyphs."""
+		candidates = self.candidates
+		self._assignIndices(candidates)
+		for _ in range(MAX_ROUNDS):
+			self._encodeGlyphs()
+			kept = [c for c in candidates
+					if c.usage * (c.cost - c.callCost) > c.cost + SUBR_OVERHEAD]
+			kept = self._assignIndices(kept)
+			if len(kept) == len(candidates):
+				break
+			candidates = kept
+		# Encode the glyphs with the subroutines kept, and number the ones
+		# that are used
+		encodings = self._encodeGlyphs()
+		self._assignIndices([c for c in candidates if c.usage])
+		return encodings
+
+	def _unprofitableKeys(self):
+		keys = []
+		for key, items in self.subrs.items():
+			if not items:
+				continue
+			saving = sum(c.usage * (c.cost - c.callCost) - c.cost - SUBR_OVERHEAD
+					for c in items)
+			overhead = GLOBAL_SUBRS_OVERHEAD if key is None else LOCAL_SUBRS_OVERHEAD
+			if saving <= overhead:
+				keys.append(key)
+		return keys
+
+	def saveState(self):
+		"""Return the current CharStrings and subroutines of the font, for
+		restoreState().  The INDEXes are loaded completely."""
+		font = self.font
+		font.CharStrings.loadAll()
+		indexes = [self.globalSubrs]
+		privates = []
+		for private in self._getPrivates():
+			subrs = private.__dict__.get("Subrs")
+			privates.append((private, subrs, private.rawDict.get("Subrs")))
+			if subrs is not None:
+				indexes.append(subrs)
+		charStrings = set()
+		for index in indexes:
+			if getattr(index, "file", None) is not None:
+				index.loadItems()
+			charStrings.update(index.items)
+		charStrings.update(font.CharStrings.values())
+		return ([(index, list(index.items)) for index in indexes], privates,
+				[(c, c.bytecode, c.program) for c in charStrings])
+
+	def restoreState(self, state):
+		"""Put back the CharStrings and subroutines saved by saveState()."""
+		indexes, privates, charStrings = state
+		for index, items in indexes:
+			index.items = items
+		for private, subrs, rawSubrs in privates:
+			if subrs is None:
+				private.__dict__.pop("Subrs", None)
+			else:
+				private.Subrs = subrs
+			if rawSubrs is None:
+				private.rawDict.pop("Subrs", None)
+			else:
+				private.rawDict["Subrs"] = rawSubrs
+		for charString, bytecode, program in charStrings:
+			charString.bytecode = bytecode
+			charString.program = program
+
+	def _build(self, encodings):
+		font = self.font
+		globalSubrs = self.globalSubrs
+		privates = self._getPrivates()
+		localSubrs = []
+		for fd, private in enumerate(privates):
+			if fd in self.subrs:
+				if not getattr(private, "Subrs", None):
+					private.Subrs = cffLib.SubrsIndex()
+				localSubrs.append(private.Subrs)
+				private.Subrs.items = []
+			else:
+				if hasattr(private, "Subrs"):
+					del private.Subrs
+				private.rawDict.pop("Subrs", None)
+				localSubrs.append(None)
+		globalSubrs.items = []
+		for attr in ('file', 'offsets'):
+			for subrs in [globalSubrs] + localSubrs:
+				if subrs is not None and hasattr(subrs, attr):
+					delattr(subrs, attr)
+
+		commands = self.commands
+
+		def expand(encoding):
+			program = []
+			for item in encoding:
+				if isinstance(item, _Candidate):
+					key, index = item.index
+					program.append(index - biases[key])
+					program.append('callgsubr' if key is None else 'callsubr')
+				else:
+					program.extend(commands[item])
+			return program
+
+		biases = {key: psCharStrings.calcSubrBias(items)
+				for key, items in self.subrs.items()}
+		for key, items in sorted(self.subrs.items(), key=lambda i: (i[0] is None, i[0])):
+			if key is None:
+				subrs = globalSubrs
+				private = None if self.isCID else privates[0]
+			else:
+				subrs = localSubrs[key]
+				private = privates[key]
+			for candidate in items:
+				program = expand(candidate.commands)
+				program.append('return')
+				subrs.append(psCharStrings.T2CharString(program=program,
+						private=private, globalSubrs=globalSubrs))
+
+		for (charString, _, _, endCommand), encoding in zip(self.glyphs, encodings):
+			program = expand(encoding)
+			if endCommand is not None:
+				program.extend(endCommand)
+			charString.setProgram(program)
+
+
+def _compiledSize(cff):
+	file = BytesIO()
+	cff.compile(file, None)
+	return len(file.getvalue())
+
+
+def subroutinize(cff):
+	"""Subroutinize the CharStrings of the font of a cffLib.CFFFontSet in
+	place, replacing its subroutines, unless that doesn't make the compiled
+	table smaller.  Return whether the subroutines were replaced."""
+	if len(cff.fontNames) != 1:
+		raise ValueError("can only subroutinize a CFF table with one font")
+	font = cff[cff.fontNames[0]]
+	subroutinizer = Subroutinizer(font, cff.GlobalSubrs)
+	before = _compiledSize(cff)
+	state = subroutinizer.saveState()
+	subroutinizer.subroutinize()
+	if _compiledSize(cff) >= before:
+		log.info("subroutinizing doesn't make the CFF table smaller, "
+			"keeping the original subroutines")
+		subroutinizer.restoreState(state)
+		return False
+	return True
+
+
+def main(args=None):
+	import sys
+	import time
+	from fontTools.ttLib import TTFont
+
+	if args is None:
+		args = sys.argv[1:]
+	if not 1 <= len(args) <= 2:
+		print(__doc__, file=sys.stderr)
+		return 2
+	font = TTFont(args[0])
+	before = len(font.getTableData('CFF '))
+	cff = font['CFF '].cff
+	start = time.time()
+	subroutinize(cff)
+	elapsed = time.time() - start
+	font.markDirty('CFF ')
+	after = len(font.getTableData('CFF '))
+	topDict = cff[cff.fontNames[0]]
+	if hasattr(topDict, "FDArray"):
+		privates = [fd.Private for fd in topDict.FDArray]
+	else:
+		privates = [topDict.Private]
+	numLocalSubrs = sum(len(getattr(p, "Subrs", None) or []) for p in privates)
+	print("%s: 'CFF ' %d -> %d bytes (%.1f%%), %d global and %d local "
+		"subroutines, in %.2fs" % (args[0], before, after, 100. * after / before,
+		len(cff.GlobalSubrs), numLocalSubrs, elapsed))
+	if len(args) == 2:
+		font.save(args[1])
+	return 0
+
+
+if __name__ == "__main__":
+	import sys
+	sys.exit(main())
@@ -0,0 +1,152 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.pens.basePen import BasePen
+from fontTools.ttLib import TTFont
+from fontTools import subroutinizer
+import os
+import unittest
+
+
+class RecordingPen(BasePen):
+
+	def __init__(self):
+		BasePen.__init__(self, None)
+		self.value = []
+
+	def _moveTo(self, pt):
+		self.value.append(("moveTo", pt))
+
+	def _lineTo(self, pt):
+		self.value.append(("lineTo", pt))
+
+	def _curveToOne(self, pt1, pt2, pt3):
+		self.value.append(("curveTo", pt1, pt2, pt3))
+
+	def _closePath(self):
+		self.value.append(("closePath",))
+
+	def _endPath(self):
+		self.value.append(("endPath",))
+
+
+def getpath(testfile):
+	path, _ = os.path.split(__file__)
+	return os.path.join(path, "subset", "testdata", testfile)
+
+
+def loadFont(testfile):
+	font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+	font.importXML(getpath(testfile))
+	buf = BytesIO()
+	font.save(buf)
+	buf.seek(0)
+	return TTFont(buf)
+
+
+def drawGlyphs(font):
+	cff = font['CFF '].cff
+	topDict = cff[cff.fontNames[0]]
+	result = {}
+	for glyphName in topDict.charset:
+		charString, _ = topDict.CharStrings.getItemAndSelector(glyphName)
+		pen = RecordingPen()
+		charString.draw(pen)
+		result[glyphName] = (charString.width, pen.value)
+	return result
+
+
+def roundTrip(font):
+	subroutinizer.subroutinize(font['CFF '].cff)
+	font.markDirty('CFF ')
+	buf = BytesIO()
+	font.save(buf)
+	buf.seek(0)
+	return TTFont(buf)
+
+
+class SuffixArrayTest(unittest.TestCase):
+
+	def test_suffixArray(self):
+		s = [2, 1, 2, 1, 3]
+		sa, rank = subroutinizer.suffixArray(s)
+		self.assertEqual(sa, sorted(range(len(s)), key=lambda i: s[i:]))
+		self.assertEqual([rank[i] for i in sa], list(range(len(s))))
+
+	def test_repeatedSubstrings(self):
+		s = [1, 2, 3, 1, 2, 3, 1, 2, -1, 4]
+		sa, rank = subroutinizer.suffixArray(s)
+		lcp = subroutinizer.lcpArray(s, sa, rank)
+		found = {tuple(s[sa[start]:sa[start] + length]): end - start
+			for length, start, end in subroutinizer.repeatedSubstrings(s, sa, lcp)}
+		self.assertEqual(found[(1, 2, 3, 1, 2)], 2)
+		self.assertEqual(found[(1, 2)], 3)
+
+
+class SubroutinizerTest(unittest.TestCase):
+
+	def check_outlines(self, testfile):
+		font = loadFont(testfile)
+		expected = drawGlyphs(font)
+		before = len(font.getTableData('CFF '))
+		font = roundTrip(font)
+		self.assertEqual(drawGlyphs(font), expected)
+		# the table is never made larger
+		self.assertLessEqual(len(font.getTableData('CFF ')), before)
+
+	def test_not_larger(self):
+		# make every repeated sequence look worth a subroutine, so that the
+		# result would be larger: the original subroutines must be kept
+		font = loadFont("TestOTF-Regular.ttx")
+		cff = font['CFF '].cff
+		expected = drawGlyphs(font)
+		before = len(font.getTableData('CFF '))
+		overheads = (subroutinizer.SUBR_OVERHEAD,
+			subroutinizer.GLOBAL_SUBRS_OVERHEAD, subroutinizer.LOCAL_SUBRS_OVERHEAD)
+		subroutinizer.SUBR_OVERHEAD = -1000
+		subroutinizer.GLOBAL_SUBRS_OVERHEAD = subroutinizer.LOCAL_SUBRS_OVERHEAD = -1000
+		try:
+			self.assertFalse(subroutinizer.subroutinize(cff))
+		finally:
+			(subroutinizer.SUBR_OVERHEAD, subroutinizer.GLOBAL_SUBRS_OVERHEAD,
+				subroutinizer.LOCAL_SUBRS_OVERHEAD) = overheads
+		font.markDirty('CFF ')
+		self.assertEqual(len(font.getTableData('CFF ')), before)
+		self.assertEqual(drawGlyphs(font), expected)
+
+	def test_otf(self):
+		self.check_outlines("TestOTF-Regular.ttx")
+
+	def test_cid(self):
+		self.check_outlines("TestCID-Regular.ttx")
+
+	def test_repeated_glyphs(self):
+		font = loadFont("TestOTF-Regular.ttx")
+		cff = font['CFF '].cff
+		topDict = cff[cff.fontNames[0]]
+		charStrings = topDict.CharStrings
+		# give all the glyphs the outline of .notdef, so that it is worth a subr
+		source, _ = charStrings.getItemAndSelector(".notdef")
+		source.decompile()
+		for glyphName in topDict.charset[1:]:
+			charString, _ = charStrings.getItemAndSelector(glyphName)
+			charString.setProgram(list(source.program))
+		font.markDirty('CFF ')
+		expected = drawGlyphs(font)
+		before = len(font.getTableData('CFF '))
+		font = roundTrip(font)
+		self.assertEqual(drawGlyphs(font), expected)
+		self.assertTrue(len(font['CFF '].cff.GlobalSubrs) +
+			len(getattr(font['CFF '].cff[cff.fontNames[0]].Private, "Subrs", None) or []) > 0)
+		self.assertLess(len(font.getTableData('CFF ')), before)
+
+	def test_multiple_fonts(self):
+		font = loadFont("TestOTF-Regular.ttx")
+		cff = font['CFF '].cff
+		cff.fontNames.append("Other")
+		with self.assertRaises(ValueError):
+			subroutinizer.subroutinize(cff)
+
+
+if __name__ == "__main__":
+	import sys
+	sys.exit(unittest.main())
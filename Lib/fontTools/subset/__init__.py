@@ -118,6 +118,26 @@ Output options:
       The Zopfli Python bindings are available at:
       https://github.com/anthrotype/py-zopfli
 
+Batch options:
+  In batch mode, pyftsubset makes the subsets listed in a manifest file
+  instead of the subset of one font:
+    $ pyftsubset --batch-file=jobs.csv --batch-report=report.csv --workers=8
+  The other options apply to all the subsets.
+  --batch-file=<path>
+      The manifest of the subsets to make: a JSON file (if the path ends
+      with '.json') with a list of objects, or a CSV file with a header
+      line.  Each job has a 'font' and an 'output' path, and 'text',
+      'unicodes', 'glyphs' and/or 'gids', which take the same values as
+      the options with those names.  The jobs are grouped by font, so
+      that each font is loaded once.
+  --batch-report=<path>
+      Write the 'font', 'output', 'time' (seconds) and 'size' (bytes) of
+      each subset, or the 'error' that failed it, to a JSON file (if the
+      path ends with '.json') or a CSV file.
+  --workers=<number>
+      Make the subsets of the fonts in a pool of as many processes.
+      [default: 1]
+
 Glyph set expansion:
   These options control how additional glyphs are added to the subset.
   --notdef-glyph
@@ -1115,6 +1135,79 @@ def may_have_non_1to1(self):
     else:
         assert 0, "unknown format: %s" % self.Format
 
+@_add_method(otTables.SingleSubst,
+             otTables.MultipleSubst)
+def closure_inputs(self, s):
+    return set(self.mapping)
+
+@_add_method(otTables.AlternateSubst)
+def closure_inputs(self, s):
+    return set(self.alternates)
+
+@_add_method(otTables.LigatureSubst)
+def closure_inputs(self, s):
+    glyphs = set(self.ligatures)
+    for seqs in self.ligatures.values():
+        for seq in seqs:
+            glyphs.update(seq.Component)
+    return glyphs
+
+@_add_method(otTables.ReverseChainSingleSubst)
+def closure_inputs(self, s):
+    if self.Format == 1:
+        glyphs = set(self.Coverage.glyphs)
+        for c in self.LookAheadCoverage + self.BacktrackCoverage:
+            glyphs.update(c.glyphs)
+        return glyphs
+    else:
+        assert 0, "unknown format: %s" % self.Format
+
+@_add_method(otTables.ContextSubst,
+             otTables.ChainContextSubst)
+def closure_inputs(self, s):
+    c = self.__subset_classify_context()
+
+    glyphs = set(c.Coverage(self).glyphs)
+    if self.Format in [1, 2]:
+        rules = [r for rs in getattr(self, c.RuleSet) if rs
+                 for r in getattr(rs, c.Rule) if r]
+    else:
+        rules = [self]
+    if self.Format == 1:
+        for r in rules:
+            for seq in c.RuleData(r):
+                glyphs.update(seq)
+    elif self.Format == 2:
+        for r in rules:
+            if any(0 in klist for klist in c.RuleData(r)):
+                # Class 0 matches any glyph not in the ClassDef
+                return None
+        for cd in c.ContextData(self):
+            if cd:
+                glyphs.update(cd.classDefs)
+    elif self.Format == 3:
+        for cov in c.RuleData(self):
+            glyphs.update(cov.glyphs)
+    else:
+        assert 0, "unknown format: %s" % self.Format
+
+    for r in rules:
+        for ll in getattr(r, c.LookupRecord):
+            if not ll: continue
+            lookup = s.table.LookupList.Lookup[ll.LookupListIndex]
+            inputs = lookup.closure_inputs(s)
+            if inputs is None:
+                return None
+            glyphs.update(inputs)
+    return glyphs
+
+@_add_method(otTables.ExtensionSubst)
+def closure_inputs(self, s):
+    if self.Format == 1:
+        return self.ExtSubTable.closure_inputs(s)
+    else:
+        assert 0, "unknown format: %s" % self.Format
+
 @_add_method(otTables.ExtensionSubst,
              otTables.ExtensionPos)
 def subset_glyphs(self, s):
@@ -1166,6 +1259,25 @@ def closure_glyphs(self, s, cur_glyphs=None):
     assert(s._activeLookups[-1] == self)
     del s._activeLookups[-1]
 
+@_add_method(otTables.Lookup)
+def closure_inputs(self, s):
+    """Returns the set of glyphs whose addition to s.glyphs may make
+    closure_glyphs add more glyphs, or None if any glyph may."""
+    key = id(self)
+    if key in s._lookupInputs:
+        return s._lookupInputs[key]
+    # Recursive lookups are not followed
+    s._lookupInputs[key] = None
+    glyphs = set()
+    for st in self.SubTable:
+        if not st: continue
+        inputs = st.closure_inputs(s)
+        if inputs is None:
+            return None
+        glyphs.update(inputs)
+    s._lookupInputs[key] = glyphs
+    return glyphs
+
 @_add_method(otTables.Lookup)
 def subset_glyphs(self, s):
     self.SubTable = [st for st in self.SubTable if st and st.subset_glyphs(s)]
@@ -1358,17 +1470,53 @@ def closure_glyphs(self, s):
     else:
         lookup_indices = []
     if self.table.LookupList:
-        while True:
+        lookups = self.table.LookupList.Lookup
+        # Index the subtables of the lookups by the glyphs that may make
+        # them add glyphs to the closure.
+        with timer("index 'GSUB' subtables for closure"):
+            subtables = []
+            index = {}
+            any_glyph = []
+            s._lookupInputs = {}
+            for i in lookup_indices:
+                if i >= self.table.LookupList.LookupCount: continue
+                if not lookups[i]: continue
+                for st in lookups[i].SubTable:
+                    if not st: continue
+                    inputs = st.closure_inputs(s)
+                    if inputs is None:
+                        any_glyph.append(len(subtables))
+                    else:
+                        for g in inputs:
+                            index.setdefault(g, []).append(len(subtables))
+                    subtables.append((lookups[i], st))
+            del s._lookupInputs
+        # Run all the subtables once, then only the ones that the glyphs
+        # added by the previous round may trigger, until none are added.
+        pending = range(len(subtables))
+        rounds = runs = 0
+        while pending:
+            rounds += 1
+            runs += len(pending)
             orig_glyphs = frozenset(s.glyphs)
+            cur_glyphs = orig_glyphs
             s._activeLookups = []
             s._doneLookups = set()
-            for i in lookup_indices:
-                if i >= self.table.LookupList.LookupCount: continue
-                if not self.table.LookupList.Lookup[i]: continue
-                self.table.LookupList.Lookup[i].closure_glyphs(s)
+            for k in pending:
+                lookup, st = subtables[k]
+                if len(cur_glyphs) != len(s.glyphs):
+                    cur_glyphs = frozenset(s.glyphs)
+                s._activeLookups.append(lookup)
+                st.closure_glyphs(s, cur_glyphs)
+                del s._activeLookups[-1]
             del s._activeLookups, s._doneLookups
-            if orig_glyphs == s.glyphs:
-                break
+            added = s.glyphs.difference(orig_glyphs)
+            pending = set(any_glyph) if added else set()
+            for g in added:
+                pending.update(index.get(g, ()))
+            pending = sorted(pending)
+        log.info("'GSUB' closure ran %d subtable(s) of %d in %d round(s)",
+                 runs, len(subtables), rounds)
     del s.table
 
 @_add_method(ttLib.getTableClass('GSUB'),
@@ -1944,10 +2092,11 @@ def drop_hints(self):
 
 class _MarkingT2Decompiler(psCharStrings.SimpleT2Decompiler):
 
-    def __init__(self, localSubrs, globalSubrs):
+    def __init__(self, localSubrs, globalSubrs, subrEffects=None):
         psCharStrings.SimpleT2Decompiler.__init__(self,
                                                   localSubrs,
-                                                  globalSubrs)
+                                                  globalSubrs,
+                                                  subrEffects)
         for subrs in [localSubrs, globalSubrs]:
             if subrs and not hasattr(subrs, "_used"):
                 subrs._used = set()
@@ -1981,11 +2130,12 @@ class _DehintingT2Decompiler(psCharStrings.SimpleT2Decompiler):
             self.has_hintmask = False
         pass
 
-    def __init__(self, css, localSubrs, globalSubrs):
+    def __init__(self, css, localSubrs, globalSubrs, subrEffects=None):
         self._css = css
         psCharStrings.SimpleT2Decompiler.__init__(self,
                                                   localSubrs,
-                                                  globalSubrs)
+                                                  globalSubrs,
+                                                  subrEffects)
 
     def execute(self, charString):
         old_hints = charString._hints if hasattr(charString, '_hints') else None
@@ -2104,10 +2254,11 @@ class _DehintingT2Decompiler(psCharStrings.SimpleT2Decompiler):
 
 class _DesubroutinizingT2Decompiler(psCharStrings.SimpleT2Decompiler):
 
-    def __init__(self, localSubrs, globalSubrs):
+    def __init__(self, localSubrs, globalSubrs, subrEffects=None):
         psCharStrings.SimpleT2Decompiler.__init__(self,
                                                   localSubrs,
-                                                  globalSubrs)
+                                                  globalSubrs,
+                                                  subrEffects)
 
     def execute(self, charString):
         # Note: Currently we recompute _desubroutinized each time.
@@ -2174,11 +2325,13 @@ def prune_post_subset(self, options):
 
         # Desubroutinize if asked for
         if options.desubroutinize:
+            subrEffects = {}
             for g in font.charset:
                 c,sel = cs.getItemAndSelector(g)
                 c.decompile()
                 subrs = getattr(c.private, "Subrs", [])
-                decompiler = _DesubroutinizingT2Decompiler(subrs, c.globalSubrs)
+                decompiler = _DesubroutinizingT2Decompiler(subrs, c.globalSubrs,
+                                                           subrEffects)
                 decompiler.execute(c)
                 c.program = c._desubroutinized
 
@@ -2201,11 +2354,13 @@ def prune_post_subset(self, options):
             #     we have seen any non-hint operators so far and do the right
             #     thing, recursively... Good luck understanding that :(
             css = set()
+            subrEffects = {}
             for g in font.charset:
                 c,sel = cs.getItemAndSelector(g)
                 c.decompile()
                 subrs = getattr(c.private, "Subrs", [])
-                decompiler = _DehintingT2Decompiler(css, subrs, c.globalSubrs)
+                decompiler = _DehintingT2Decompiler(css, subrs, c.globalSubrs,
+                                                    subrEffects)
                 decompiler.execute(c)
             for charstring in css:
                 charstring.drop_hints()
@@ -2227,11 +2382,13 @@ def prune_post_subset(self, options):
 
         # Renumber subroutines to remove unused ones
 
-        # Mark all used subroutines
+        # Mark all used subroutines; a subroutine is only executed again
+        # when called from a state it was not executed from before
+        subrEffects = {}
         for g in font.charset:
             c,sel = cs.getItemAndSelector(g)
             subrs = getattr(c.private, "Subrs", [])
-            decompiler = _MarkingT2Decompiler(subrs, c.globalSubrs)
+            decompiler = _MarkingT2Decompiler(subrs, c.globalSubrs, subrEffects)
             decompiler.execute(c)
 
         all_subrs = [font.GlobalSubrs]
@@ -2781,6 +2938,56 @@ class Subsetter(object):
         self._prune_post_subset(font)
 
 
+class PreparedFont(object):
+    """A font loaded and pruned once, to make many subsets of it with the
+    same options.
+
+    The tables are pruned as by Subsetter when the PreparedFont is made, and
+    the glyph closures of the subsets are done over the pruned font, whose
+    'cmap', 'GSUB', 'MATH', 'COLR' and 'glyf' tables stay decompiled between
+    subsets.  Each subset gets a new TTFont, loaded lazily from the compiled
+    pruned font, so subsets don't share any table objects.
+    """
+
+    def __init__(self, fontFile, options=None, **kwargs):
+        if not options:
+            options = Options()
+        self.options = options
+        font = load_font(fontFile, options, **kwargs)
+        Subsetter(options)._prune_pre_subset(font)
+        with timer("compile prepared font"):
+            buf = BytesIO()
+            font.save(buf, reorderTables=None)
+            self.fontData = buf.getvalue()
+        self.glyphOrder = font.getGlyphOrder()
+        with timer("load closure tables"):
+            for tag in ('cmap', 'GSUB', 'MATH', 'COLR', 'glyf'):
+                if tag in font:
+                    font[tag]
+        self.font = font
+
+    def _loadFont(self):
+        font = ttLib.TTFont(BytesIO(self.fontData),
+                            recalcBBoxes=self.options.recalc_bounds,
+                            recalcTimestamp=self.options.recalc_timestamp,
+                            lazy=True)
+        font.setGlyphOrder(self.glyphOrder)
+        return font
+
+    def subset(self, glyphs=[], gids=[], unicodes=[], text=""):
+        """Return a new TTFont with the subset of the prepared font for the
+        given glyph names, glyph IDs, Unicodes and text, as Subsetter.populate
+        takes them.
+        """
+        subsetter = Subsetter(self.options)
+        subsetter.populate(glyphs=glyphs, gids=gids, unicodes=unicodes, text=text)
+        subsetter._closure_glyphs(self.font)
+        font = self._loadFont()
+        subsetter._subset_glyphs(font)
+        subsetter._prune_post_subset(font)
+        return font
+
+
 @timer("load font")
 def load_font(fontFile,
               options,
@@ -2826,6 +3033,168 @@ def save_font(font, outfile, options):
     font.flavor = options.flavor
     font.save(outfile, reorderTables=options.canonical_order)
 
+_batch_fields = ['font', 'output', 'text', 'unicodes', 'glyphs', 'gids']
+_report_fields = ['font', 'output', 'time', 'size', 'error']
+
+def parse_manifest(path):
+    """Returns the jobs of a batch manifest file, a JSON list of objects
+    or a CSV file with a header line, as a list of dicts."""
+    if path.endswith('.json'):
+        import json
+        with open(path, encoding='utf-8') as f:
+            jobs = json.load(f)
+    else:
+        import csv
+        if sys.version_info[0] < 3:
+            f = open(path, 'rb')
+        else:
+            f = open(path, 'r', newline='', encoding='utf-8')
+        with f:
+            jobs = [{k:v for k,v in row.items() if v}
+                    for row in csv.DictReader(f)]
+    for job in jobs:
+        unknown = set(job).difference(_batch_fields)
+        if unknown:
+            raise ValueError("unknown fields in manifest job: %s" % sorted(unknown))
+        if 'font' not in job or 'output' not in job:
+            raise ValueError("manifest job has no 'font' or 'output': %s" % job)
+    return jobs
+
+def _parse_job(job, prepared):
+    def parse(value, parser):
+        if isinstance(value, basestring):
+            return parser(value)
+        return list(value)
+    glyphs = parse(job.get('glyphs', []), parse_glyphs)
+    if '*' in glyphs:
+        glyphs = prepared.glyphOrder
+    unicodes = job.get('unicodes', [])
+    if unicodes == '*':
+        unicodes = []
+        for t in prepared.font['cmap'].tables:
+            if t.isUnicode():
+                unicodes.extend(t.cmap.keys())
+    else:
+        unicodes = parse(unicodes, parse_unicodes)
+    gids = parse(job.get('gids', []), parse_gids)
+    return dict(glyphs=glyphs, gids=gids, unicodes=unicodes,
+                text=job.get('text', ''))
+
+# The PreparedFont last made by a worker process of subset_batch, as
+# ((fontfile, dontLoadGlyphNames), prepared): the tasks of the same font
+# that a worker runs one after the other share it.
+_workerPreparedFont = None
+
+def _prepare_font(fontfile, options, dontLoadGlyphNames, reuse):
+    global _workerPreparedFont
+    key = (fontfile, dontLoadGlyphNames)
+    if reuse and _workerPreparedFont is not None and _workerPreparedFont[0] == key:
+        return _workerPreparedFont[1]
+    if reuse:
+        # let the previous font be freed before loading the next one
+        _workerPreparedFont = None
+    with timer("prepare font") as t:
+        prepared = PreparedFont(fontfile, options,
+                                dontLoadGlyphNames=dontLoadGlyphNames)
+    log.info("Prepared %s in %.3fs", fontfile, t.elapsed)
+    if reuse:
+        _workerPreparedFont = (key, prepared)
+    return prepared
+
+def _subset_font_jobs(fontfile, jobs, options, dontLoadGlyphNames, reuse=False):
+    import os
+    reports = []
+    try:
+        prepared = _prepare_font(fontfile, options, dontLoadGlyphNames, reuse)
+    except Exception as e:
+        log.error("Failed to load %s: %s", fontfile, e)
+        return [(i, {'font': fontfile, 'output': job['output'],
+                     'error': "%s: %s" % (type(e).__name__, e)})
+                for i,job in jobs]
+    for i,job in jobs:
+        report = {'font': fontfile, 'output': job['output']}
+        try:
+            with Timer() as t:
+                font = prepared.subset(**_parse_job(job, prepared))
+                save_font(font, job['output'], options)
+                font.close()
+            report['time'] = round(t.elapsed, 6)
+            report['size'] = os.path.getsize(job['output'])
+        except Exception as e:
+            log.error("Failed to subset %s to %s: %s", fontfile, job['output'], e)
+            report['error'] = "%s: %s" % (type(e).__name__, e)
+        reports.append((i, report))
+    return reports
+
+def _batch_tasks(jobs, options, workers=1):
+    """Group the jobs by font, and split the jobs of each font in up to
+    'workers' tasks.  Returns a list of (fontfile, jobs, dontLoadGlyphNames)
+    tuples, the jobs being (index, job) pairs."""
+    groups = {}
+    for i,job in enumerate(jobs):
+        groups.setdefault(job['font'], []).append((i, job))
+    # The fonts with the most jobs first, to balance the workers' loads
+    groups = sorted(groups.items(), key=lambda item: -len(item[1]))
+    tasks = []
+    for fontfile,group in groups:
+        # the glyph names are loaded the same way for all the tasks of a font
+        dontLoadGlyphNames = (not options.glyph_names and
+                              not any(job.get('glyphs') for _,job in group))
+        numTasks = min(workers, len(group))
+        for k in range(numTasks):
+            tasks.append((fontfile, group[k::numTasks], dontLoadGlyphNames))
+    return tasks
+
+def subset_batch(jobs, options=None, workers=None):
+    """Make the subsets of a list of jobs, as returned by parse_manifest.
+    The jobs are grouped by font, and each font is loaded once with
+    PreparedFont.  If 'workers' is greater than 1, the subsets are made
+    by a pool of as many processes (this requires the concurrent.futures
+    module, which on Python 2 is the 'futures' backport): the jobs of each
+    font are spread over the workers, and each worker loads the font once.
+
+    Returns a report for each job, in order: a dict with the 'font',
+    'output', 'time' and 'size' of the subset, or the 'error' that
+    failed it.
+    """
+    if not options:
+        options = Options()
+    reports = [None] * len(jobs)
+    if workers is not None and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_subset_font_jobs, fontfile, group,
+                                       options, dontLoadGlyphNames, True)
+                       for fontfile,group,dontLoadGlyphNames
+                       in _batch_tasks(jobs, options, workers)]
+            for future in futures:
+                for i,report in future.result():
+                    reports[i] = report
+    else:
+        for fontfile,group,dontLoadGlyphNames in _batch_tasks(jobs, options):
+            for i,report in _subset_font_jobs(fontfile, group, options,
+                                              dontLoadGlyphNames):
+                reports[i] = report
+    return reports
+
+def save_report(reports, path):
+    """Writes the reports of subset_batch to a JSON file, if the path ends
+    with '.json', or else to a CSV file."""
+    if path.endswith('.json'):
+        import json
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(tounicode(json.dumps(reports, indent=1, sort_keys=True)))
+    else:
+        import csv
+        if sys.version_info[0] < 3:
+            f = open(path, 'wb')
+        else:
+            f = open(path, 'w', newline='', encoding='utf-8')
+        with f:
+            writer = csv.DictWriter(f, _report_fields)
+            writer.writeheader()
+            writer.writerows(reports)
+
 def parse_unicodes(s):
     import re
     s = re.sub (r"0[xX]", " ", s)
@@ -2875,12 +3244,16 @@ def main(args=None):
                             'glyphs', 'glyphs-file',
                             'text', 'text-file',
                             'unicodes', 'unicodes-file',
-                            'output-file'])
+                            'output-file',
+                            'batch-file', 'batch-report', 'workers'])
     except options.OptionError as e:
         usage()
         print("ERROR:", e, file=sys.stderr)
         sys.exit(2)
 
+    if any(a.startswith('--batch-file=') for a in args):
+        return batch_main(args, options)
+
     if len(args) < 2:
         usage()
         sys.exit(1)
@@ -2977,15 +3350,58 @@ def main(args=None):
     font.close()
 
 
+def batch_main(args, options):
+    from fontTools import configLogger
+
+    configLogger(level=logging.INFO if options.verbose else logging.WARNING)
+    if options.timing:
+        timer.logger.setLevel(logging.DEBUG)
+    else:
+        timer.logger.disabled = True
+
+    manifest = report = None
+    workers = 1
+    for a in args:
+        if a.startswith('--batch-file='):
+            manifest = a[13:]
+        elif a.startswith('--batch-report='):
+            report = a[15:]
+        elif a.startswith('--workers='):
+            workers = int(a[10:])
+        else:
+            usage()
+            print("ERROR: unexpected argument in batch mode: %s" % a,
+                  file=sys.stderr)
+            sys.exit(2)
+
+    jobs = parse_manifest(manifest)
+    with timer("make %d subsets" % len(jobs)):
+        reports = subset_batch(jobs, options, workers=workers)
+    if report:
+        save_report(reports, report)
+
+    failed = [r for r in reports if 'error' in r]
+    log.info("Made %d subsets of %d fonts; %d failed",
+             len(reports) - len(failed), len(set(j['font'] for j in jobs)),
+             len(failed))
+    if failed:
+        sys.exit(1)
+
+
 __all__ = [
     'Options',
     'Subsetter',
+    'PreparedFont',
     'load_font',
     'save_font',
+    'parse_manifest',
+    'subset_batch',
+    'save_report',
     'parse_gids',
     'parse_glyphs',
     'parse_unicodes',
-    'main'
+    'main',
+    'batch_main'
 ]
 
 if __name__ == '__main__':
@@ -2,8 +2,10 @@ from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools import subset
 from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables import otTables
 from fontTools.misc.loggingTools import CapturingLogHandler
 import difflib
+import json
 import logging
 import os
 import shutil
@@ -195,6 +197,158 @@ class SubsetTest(unittest.TestCase):
         # unknown tables are kept if --passthrough-tables option is passed
         self.assertTrue(unknown_tag in subsetfont)
 
+    def test_prepared_font(self):
+        for testfile, suffix in (("TestTTF-Regular.ttx", ".ttf"),
+                                 ("TestCID-Regular.ttx", ".otf"),
+                                 ("TestMATH-Regular.ttx", ".otf")):
+            _, fontpath = self.compile_font(self.getpath(testfile), suffix)
+            options = subset.Options(recalc_timestamp=False)
+            prepared = subset.PreparedFont(fontpath, options)
+            for text, gids in (("abc", []), ("Hello", [0, 1]), ("", [2])):
+                subsetter = subset.Subsetter(options)
+                subsetter.populate(text=text, gids=gids)
+                font = subset.load_font(fontpath, options)
+                subsetter.subset(font)
+                expected = BytesIO()
+                font.save(expected)
+                actual = BytesIO()
+                prepared.subset(text=text, gids=gids).save(actual)
+                self.assertEqual(actual.getvalue(), expected.getvalue())
+            # the subsets don't modify the prepared font
+            self.assertEqual(prepared.font.getGlyphOrder(), prepared.glyphOrder)
+            self.assertEqual(len(prepared.subset(text="a").getGlyphOrder()),
+                             len(subset.PreparedFont(fontpath, options)
+                                 .subset(text="a").getGlyphOrder()))
+
+    def test_batch(self):
+        _, ttfpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        _, otfpath = self.compile_font(self.getpath("TestOTF-Regular.ttx"), ".otf")
+        outpaths = [self.temp_path(".ttf"), self.temp_path(".otf"),
+                    self.temp_path(".ttf"), self.temp_path(".ttf")]
+        manifest = self.temp_path(".csv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("font,output,text,unicodes,gids\n")
+            f.write("%s,%s,AB,,\n" % (ttfpath, outpaths[0]))
+            f.write("%s,%s,,41-43,\n" % (otfpath, outpaths[1]))
+            f.write("%s,%s,,,\"0,2\"\n" % (ttfpath, outpaths[2]))
+            f.write("%s,%s,,,\n" % (self.temp_path(".ttf"), outpaths[3]))
+        report = self.temp_path(".json")
+        with self.assertRaises(SystemExit) as cm:
+            subset.main(["--batch-file=%s" % manifest,
+                         "--batch-report=%s" % report])
+        self.assertEqual(cm.exception.code, 1)
+
+        with open(report, encoding="utf-8") as f:
+            reports = json.load(f)
+        self.assertEqual([r["output"] for r in reports], outpaths)
+        self.assertEqual([os.path.getsize(p) for p in outpaths[:3]],
+                         [r["size"] for r in reports[:3]])
+        self.assertTrue("error" in reports[3])
+        self.assertEqual(TTFont(outpaths[2]).getGlyphOrder(), [".notdef", "B"])
+        for outpath, args in ((outpaths[0], ["--text=AB"]),
+                              (outpaths[1], ["--unicodes=41-43"])):
+            fontpath = ttfpath if outpath.endswith(".ttf") else otfpath
+            expected = self.temp_path(".ttf")
+            subset.main([fontpath, "--output-file=%s" % expected] + args)
+            self.assertEqual(TTFont(outpath).getGlyphOrder(),
+                             TTFont(expected).getGlyphOrder())
+
+        jobs = subset.parse_manifest(manifest)[:3]
+        for job, outpath in zip(jobs, outpaths):
+            job["output"] = outpath + ".2"
+        sizes = [r["size"] for r in reports[:3]]
+        self.assertEqual([r["size"] for r in subset.subset_batch(jobs)], sizes)
+        try:
+            import concurrent.futures
+        except ImportError:
+            return
+        self.assertEqual([r["size"] for r in subset.subset_batch(jobs, workers=2)],
+                         sizes)
+
+        # the jobs of a single font are spread over the workers
+        ttfJobs = [jobs[0], jobs[2], dict(jobs[0], output=outpaths[0] + ".3")]
+        tasks = subset._batch_tasks(ttfJobs, subset.Options(), workers=2)
+        self.assertEqual([[i for i,_ in group] for _,group,_ in tasks],
+                         [[0, 2], [1]])
+        self.assertEqual([r["size"] for r in subset.subset_batch(ttfJobs, workers=2)],
+                         [sizes[0], sizes[2], sizes[0]])
+
+
+def _make_gsub(subtables):
+    lookups = []
+    for lookupType, st in subtables:
+        lookup = otTables.Lookup()
+        lookup.LookupType = lookupType
+        lookup.LookupFlag = 0
+        lookup.SubTable = [st]
+        lookup.SubTableCount = 1
+        lookups.append(lookup)
+    feature = otTables.Feature()
+    feature.LookupListIndex = list(range(len(lookups)))
+    feature.LookupCount = len(lookups)
+    record = otTables.FeatureRecord()
+    record.FeatureTag = "ccmp"
+    record.Feature = feature
+    langSys = otTables.LangSys()
+    langSys.ReqFeatureIndex = 0xFFFF
+    langSys.FeatureIndex = [0]
+    langSys.FeatureCount = 1
+    script = otTables.Script()
+    script.DefaultLangSys = langSys
+    script.LangSysRecord = []
+    script.LangSysCount = 0
+    scriptRecord = otTables.ScriptRecord()
+    scriptRecord.ScriptTag = "DFLT"
+    scriptRecord.Script = script
+    table = otTables.GSUB()
+    table.Version = 0x00010000
+    table.ScriptList = otTables.ScriptList()
+    table.ScriptList.ScriptRecord = [scriptRecord]
+    table.ScriptList.ScriptCount = 1
+    table.FeatureList = otTables.FeatureList()
+    table.FeatureList.FeatureRecord = [record]
+    table.FeatureList.FeatureCount = 1
+    table.LookupList = otTables.LookupList()
+    table.LookupList.Lookup = lookups
+    table.LookupList.LookupCount = len(lookups)
+    gsub = newTable("GSUB")
+    gsub.table = table
+    return gsub
+
+
+class GSUBClosureTest(unittest.TestCase):
+
+    def closure(self, gsub, glyphs):
+        s = subset.Subsetter()
+        s.glyphs = set(glyphs)
+        gsub.closure_glyphs(s)
+        return s.glyphs
+
+    def test_chain(self):
+        # each lookup substitutes the glyph that the next one adds
+        subtables = []
+        for i in reversed(range(20)):
+            st = otTables.SingleSubst()
+            st.mapping = {"g%d" % i: "g%d" % (i + 1)}
+            subtables.append((1, st))
+        gsub = _make_gsub(subtables)
+        self.assertEqual(self.closure(gsub, ["g0"]),
+                         set("g%d" % i for i in range(21)))
+        self.assertEqual(self.closure(gsub, ["g19"]), {"g19", "g20"})
+
+    def test_ligature_components(self):
+        single = otTables.SingleSubst()
+        single.mapping = {"a": "b"}
+        ligature = otTables.Ligature()
+        ligature.Component = ["b"]
+        ligature.LigGlyph = "f_b"
+        ligatures = otTables.LigatureSubst()
+        ligatures.ligatures = {"f": [ligature]}
+        # the ligature comes first, and its component is added after it
+        gsub = _make_gsub([(4, ligatures), (1, single)])
+        self.assertEqual(self.closure(gsub, ["f", "a"]), {"f", "a", "b", "f_b"})
+        self.assertEqual(self.closure(gsub, ["f"]), {"f"})
+
 
 if __name__ == "__main__":
     unittest.main()
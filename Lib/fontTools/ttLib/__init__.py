@@ -44,6 +44,7 @@ Dumping 'prep' table...
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools.misc.loggingTools import deprecateArgument, deprecateFunction
+from collections import OrderedDict
 import os
 import sys
 import logging
@@ -65,7 +66,8 @@ class TTFont(object):
 	def __init__(self, file=None, res_name_or_index=None,
 			sfntVersion="\000\001\000\000", flavor=None, checkChecksums=False,
 			verbose=None, recalcBBoxes=True, allowVID=False, ignoreDecompileErrors=False,
-			recalcTimestamp=True, fontNumber=-1, lazy=None, quiet=None):
+			recalcTimestamp=True, fontNumber=-1, lazy=None, quiet=None,
+			useMmap=False, compactLayout=False, _tableCache=None):
 
 		"""The constructor can be called with a few different arguments.
 		When reading a font from disk, 'file' should be either a pathname
@@ -120,6 +122,19 @@ class TTFont(object):
 		If lazy is set to True, many data structures are loaded lazily, upon
 		access only.  If it is set to False, many data structures are loaded
 		immediately.  The default is lazy=None which is somewhere in between.
+
+		If useMmap is set to True, the input file is memory-mapped instead of
+		being read into memory, and the tables which support it (eg. 'glyf',
+		'CFF ' and the OpenType Layout tables) are decompiled from memoryview
+		slices of the mapped file, without copying their data. The file is kept open
+		until close() is called. If the file can't be mapped (eg. it's not a
+		real file on disk), the tables are read from the file object instead.
+
+		If compactLayout is set to True, the Coverage and ClassDef tables of
+		the OpenType Layout tables keep the glyph IDs they were read with, as
+		sorted arrays of ranges, instead of lists and dicts of glyph names;
+		these are only made when their 'glyphs' and 'classDefs' attributes
+		are accessed. See otTables.Coverage and otTables.ClassDef.
 		"""
 
 		from fontTools.ttLib import sfnt
@@ -131,10 +146,14 @@ class TTFont(object):
 			setattr(self, name, val)
 
 		self.lazy = lazy
+		self.compactLayout = compactLayout
 		self.recalcBBoxes = recalcBBoxes
 		self.recalcTimestamp = recalcTimestamp
 		self.tables = {}
 		self.reader = None
+		self._dirtyTables = set()
+		self._tableCache = _tableCache
+		self._loadingGlyphOrder = False
 
 		# Permit the user to reference glyphs that are not int the font.
 		self.last_vid = 0xFFFE # Can't make it be 0xFFFF, as the world is full unsigned short integer counters that get incremented after the last seen GID value.
@@ -168,7 +187,7 @@ class TTFont(object):
 		else:
 			# assume "file" is a readable file object
 			closeStream = False
-		if not self.lazy:
+		if not self.lazy and not useMmap:
 			# read input file in memory and wrap a stream around it to allow overwriting
 			tmp = BytesIO(file.read())
 			if hasattr(file, 'name'):
@@ -177,7 +196,8 @@ class TTFont(object):
 			if closeStream:
 				file.close()
 			file = tmp
-		self.reader = sfnt.SFNTReader(file, checkChecksums, fontNumber=fontNumber)
+		self.reader = sfnt.SFNTReader(file, checkChecksums, fontNumber=fontNumber,
+				useMmap=useMmap)
 		self.sfntVersion = self.reader.sfntVersion
 		self.flavor = self.reader.flavor
 		self.flavorData = self.reader.flavorData
@@ -187,58 +207,90 @@ class TTFont(object):
 		if self.reader is not None:
 			self.reader.close()
 
-	def save(self, file, reorderTables=True):
+	def save(self, file, reorderTables=True, onlyDirty=False, workers=None):
 		"""Save the font to disk. Similarly to the constructor,
 		the 'file' argument can be either a pathname or a writable
 		file object.
+
+		If 'onlyDirty' is true, tables that were loaded from the input file
+		but not modified are not recompiled: their original data is written
+		as is. Since in-place modifications can't be detected, tables that
+		were changed in place must be flagged with markDirty() first. See
+		getDirtyTables() for the list of tables that would be recompiled.
+
+		If 'workers' is greater than 1, the tables of WOFF fonts are
+		compressed concurrently using as many threads.
 		"""
-		from fontTools.ttLib import sfnt
 		if not hasattr(file, "write"):
-			if self.lazy and self.reader.file.name == file:
+			if self.lazy and getattr(self.reader.file, "name", None) == file:
 				raise TTLibError(
 					"Can't overwrite TTFont when 'lazy' attribute is True")
+			if (self.reader is not None and self.reader.mappedData is not None
+					and getattr(self.reader.file, "name", None) == file):
+				raise TTLibError(
+					"Can't overwrite TTFont whose input file is memory-mapped")
 			closeStream = True
 			file = open(file, "wb")
 		else:
 			# assume "file" is a writable file object
 			closeStream = False
 
+		# SFNTWriter needs to seek back to write the table directory: unless
+		# the font starts at the beginning of a seekable stream, write it to
+		# a temporary stream first
+		if _isSeekable(file) and file.tell() == 0:
+			stream = file
+		else:
+			stream = BytesIO()
+		self._save(stream, reorderTables, onlyDirty, workers=workers)
+
+		if stream is not file:
+			file.write(stream.getvalue())
+			stream.close()
+
+		if closeStream:
+			file.close()
+
+	def _save(self, file, reorderTables=True, onlyDirty=False, tableCache=None,
+			workers=None):
+		"""Internal function, to be shared by save() and TTCollection.save().
+		The font is written at the current position of the seekable 'file'.
+		"""
+		from fontTools.ttLib import sfnt
+
 		tags = list(self.keys())
 		if "GlyphOrder" in tags:
 			tags.remove("GlyphOrder")
 		numTables = len(tags)
-		# write to a temporary stream to allow saving to unseekable streams
-		tmp = BytesIO()
-		writer = sfnt.SFNTWriter(tmp, numTables, self.sfntVersion, self.flavor, self.flavorData)
 
+		if onlyDirty:
+			compileTags = set(self.getDirtyTables())
+			log.info("compiling tables: %s", " ".join(sortedTagList(compileTags)))
+		else:
+			compileTags = None
+		# compile all tables first, in dependency order, so that they can be
+		# written out in their final order in a single pass
+		tableData = OrderedDict()
 		done = []
 		for tag in tags:
-			self._writeTable(tag, writer, done)
-
-		writer.close()
+			self._writeTable(tag, tableData, done, compileTags)
 
-		if (reorderTables is None or writer.reordersTables() or
+		if (reorderTables is None or
 				(reorderTables is False and self.reader is None)):
 			# don't reorder tables and save as is
-			file.write(tmp.getvalue())
-			tmp.close()
+			tableOrder = list(tableData.keys())
+		elif reorderTables is False:
+			# sort tables using the original font's order
+			tableOrder = sortedTagList(tags, list(self.reader.keys()))
 		else:
-			if reorderTables is False:
-				# sort tables using the original font's order
-				tableOrder = list(self.reader.keys())
-			else:
-				# use the recommended order from the OpenType specification
-				tableOrder = None
-			tmp.flush()
-			tmp.seek(0)
-			tmp2 = BytesIO()
-			reorderFontTables(tmp, tmp2, tableOrder)
-			file.write(tmp2.getvalue())
-			tmp.close()
-			tmp2.close()
+			# use the recommended order from the OpenType specification
+			tableOrder = sortedTagList(tags)
 
-		if closeStream:
-			file.close()
+		writer = sfnt.SFNTWriter(file, numTables, self.sfntVersion, self.flavor,
+				self.flavorData, tableCache=tableCache, workers=workers)
+		for tag in tableOrder:
+			writer[tag] = tableData.pop(tag)
+		writer.close()
 
 	def saveXML(self, fileOrPath, progress=None, quiet=None,
 			tables=None, skipTables=None, splitTables=False, disassembleInstructions=True,
@@ -372,6 +424,43 @@ class TTFont(object):
 		decompiled and loaded into memory."""
 		return tag in self.tables
 
+	def markDirty(self, tag):
+		"""Flag the table identified by 'tag' as modified, so that it gets
+		recompiled by save(onlyDirty=True)."""
+		self._dirtyTables.add(Tag(tag))
+
+	def isDirty(self, tag):
+		"""Return true if the table identified by 'tag' was loaded and must
+		be recompiled, ie. it was marked with markDirty(), or it was set with
+		font[tag] = table, or it doesn't come from the input file."""
+		tag = Tag(tag)
+		if not self.isLoaded(tag):
+			return False
+		if tag in self._dirtyTables:
+			return True
+		return not (self.reader and tag in self.reader)
+
+	def getDirtyTables(self):
+		"""Return the list of tables which save(onlyDirty=True) recompiles:
+		the dirty tables, plus the loaded tables that depend on them."""
+		tags = [tag for tag in self.keys() if tag != "GlyphOrder"]
+		dirty = set(tag for tag in tags if self.isDirty(tag))
+		if dirty and self.recalcTimestamp and self.isLoaded("head"):
+			# update the modification timestamp
+			dirty.add("head")
+		changed = True
+		while changed:
+			changed = False
+			for tag in tags:
+				if tag in dirty or not self.isLoaded(tag):
+					continue
+				for masterTable in getTableClass(tag).dependencies:
+					if masterTable in dirty:
+						dirty.add(tag)
+						changed = True
+						break
+		return sortedTagList(dirty)
+
 	def has_key(self, tag):
 		if self.isLoaded(tag):
 			return True
@@ -410,9 +499,22 @@ class TTFont(object):
 				return table
 			if self.reader is not None:
 				import traceback
+				cacheKey = None
+				if self._tableCache is not None and not self._loadingGlyphOrder:
+					# tables at the same offset of a collection are shared,
+					# between fonts with the same glyph order
+					entry = self.reader.tables[tag]
+					cacheKey = (tag, entry.offset, entry.length, self._glyphOrderSources())
+					table = self._tableCache.get(cacheKey)
+					if table is not None:
+						log.debug("Sharing '%s' table", tag)
+						self.tables[tag] = table
+						return table
 				log.debug("Reading '%s' table from disk", tag)
 				data = self.reader[tag]
 				tableClass = getTableClass(tag)
+				if not tableClass.zeroCopy:
+					data = tobytes(data)
 				table = tableClass(tag)
 				self.tables[tag] = table
 				log.debug("Decompiling '%s' table", tag)
@@ -430,19 +532,24 @@ class TTFont(object):
 					table = DefaultTable(tag)
 					table.ERROR = file.getvalue()
 					self.tables[tag] = table
-					table.decompile(data, self)
+					table.decompile(tobytes(data), self)
+				if cacheKey is not None:
+					self._tableCache[cacheKey] = table
 				return table
 			else:
 				raise KeyError("'%s' table not found" % tag)
 
 	def __setitem__(self, tag, table):
-		self.tables[Tag(tag)] = table
+		tag = Tag(tag)
+		self.tables[tag] = table
+		self._dirtyTables.add(tag)
 
 	def __delitem__(self, tag):
 		if tag not in self:
 			raise KeyError("'%s' table not found" % tag)
 		if tag in self.tables:
 			del self.tables[tag]
+		self._dirtyTables.discard(tag)
 		if self.reader and tag in self.reader:
 			del self.reader[tag]
 
@@ -452,14 +559,53 @@ class TTFont(object):
 		except KeyError:
 			return default
 
+	@property
+	def glyphOrder(self):
+		try:
+			return self.__dict__["_glyphOrder"]
+		except KeyError:
+			raise AttributeError("glyphOrder")
+
+	@glyphOrder.setter
+	def glyphOrder(self, glyphOrder):
+		self._glyphOrder = glyphOrder
+		self.__dict__.pop("_reverseGlyphOrderDict", None)
+
+	@glyphOrder.deleter
+	def glyphOrder(self):
+		del self._glyphOrder
+		self.__dict__.pop("_reverseGlyphOrderDict", None)
+
 	def setGlyphOrder(self, glyphOrder):
+		"""Set the glyph order. The list itself is used, not a copy. A
+		GlyphOrderList keeps its reverse map up to date as it's modified,
+		and makes getGlyphID() faster for names that aren't in it."""
 		self.glyphOrder = glyphOrder
 
+	def _glyphOrderSources(self):
+		# The fonts of a collection whose glyph order is made from the same
+		# tables have the same glyph order, and can share their other tables.
+		tables = self.reader.tables
+		return tuple((tag, tables[tag].offset)
+			for tag in ('CFF ', 'post', 'maxp', 'cmap') if tag in tables)
+
 	def getGlyphOrder(self):
 		try:
 			return self.glyphOrder
 		except AttributeError:
 			pass
+		# The tables read to make the glyph order are not shared with other
+		# fonts: their glyph order can only be taken once, and the 'cmap'
+		# table may be decompiled with made-up glyph names.
+		loadingGlyphOrder = self._loadingGlyphOrder
+		self._loadingGlyphOrder = True
+		try:
+			self._getGlyphOrder()
+		finally:
+			self._loadingGlyphOrder = loadingGlyphOrder
+		return self.glyphOrder
+
+	def _getGlyphOrder(self):
 		if 'CFF ' in self:
 			cff = self['CFF ']
 			self.glyphOrder = cff.getGlyphOrder()
@@ -474,10 +620,10 @@ class TTFont(object):
 				#
 				self._getGlyphNamesFromCmap()
 			else:
-				self.glyphOrder = glyphOrder
+				# the 'post' table doesn't keep it
+				self.glyphOrder = GlyphOrderList(glyphOrder)
 		else:
 			self._getGlyphNamesFromCmap()
-		return self.glyphOrder
 
 	def _getGlyphNamesFromCmap(self):
 		#
@@ -508,7 +654,7 @@ class TTFont(object):
 		# temporary cmap and by the real cmap in case we don't find a unicode
 		# cmap.
 		numGlyphs = int(self['maxp'].numGlyphs)
-		glyphOrder = [None] * numGlyphs
+		glyphOrder = GlyphOrderList([None] * numGlyphs)
 		glyphOrder[0] = ".notdef"
 		for i in range(1, numGlyphs):
 			glyphOrder[i] = "glyph%.5d" % i
@@ -585,62 +731,87 @@ class TTFont(object):
 				return glyphName
 
 	def getGlyphID(self, glyphName, requireReal=False):
-		if not hasattr(self, "_reverseGlyphOrderDict"):
-			self._buildReverseGlyphOrderDict()
 		glyphOrder = self.getGlyphOrder()
-		d = self._reverseGlyphOrderDict
-		if glyphName not in d:
-			if glyphName in glyphOrder:
-				self._buildReverseGlyphOrderDict()
-				return self.getGlyphID(glyphName)
+		d = self._getReverseGlyphMap(glyphOrder)
+		glyphID = d.get(glyphName)
+		if not isinstance(glyphOrder, GlyphOrderList):
+			# the map of a plain list may be out of date
+			if glyphID is None:
+				if glyphName in glyphOrder:
+					d = self._getReverseGlyphMap(glyphOrder, rebuild=True)
+					glyphID = d[glyphName]
+			elif glyphID >= len(glyphOrder) or glyphOrder[glyphID] != glyphName:
+				d = self._getReverseGlyphMap(glyphOrder, rebuild=True)
+				glyphID = d.get(glyphName)
+		if glyphID is None:
+			if requireReal:
+				raise KeyError(glyphName)
+			elif not self.allowVID:
+				# Handle glyphXXX only
+				if glyphName[:5] == "glyph":
+					try:
+						return int(glyphName[5:])
+					except (NameError, ValueError):
+						pass
+				raise KeyError(glyphName)
 			else:
-				if requireReal:
-					raise KeyError(glyphName)
-				elif not self.allowVID:
-					# Handle glyphXXX only
+				# user intends virtual GID support
+				try:
+					glyphID = self.reverseVIDDict[glyphName]
+				except KeyError:
+					# if name is in glyphXXX format, use the specified name.
 					if glyphName[:5] == "glyph":
 						try:
-							return int(glyphName[5:])
+							glyphID = int(glyphName[5:])
 						except (NameError, ValueError):
-							raise KeyError(glyphName)
-				else:
-					# user intends virtual GID support
-					try:
-						glyphID = self.reverseVIDDict[glyphName]
-					except KeyError:
-						# if name is in glyphXXX format, use the specified name.
-						if glyphName[:5] == "glyph":
-							try:
-								glyphID = int(glyphName[5:])
-							except (NameError, ValueError):
-								glyphID = None
-						if glyphID is None:
-							glyphID = self.last_vid -1
-							self.last_vid = glyphID
-						self.reverseVIDDict[glyphName] = glyphID
-						self.VIDDict[glyphID] = glyphName
-					return glyphID
-
-		glyphID = d[glyphName]
-		if glyphName != glyphOrder[glyphID]:
-			self._buildReverseGlyphOrderDict()
-			return self.getGlyphID(glyphName)
+							glyphID = None
+					if glyphID is None:
+						glyphID = self.last_vid -1
+						self.last_vid = glyphID
+					self.reverseVIDDict[glyphName] = glyphID
+					self.VIDDict[glyphID] = glyphName
+				return glyphID
+
 		return glyphID
 
+	def getGlyphIDs(self, glyphNames, requireReal=False):
+		"""Return the list of the glyph IDs of the glyph names, as returned by
+		getGlyphID()."""
+		glyphOrder = self.getGlyphOrder()
+		if isinstance(glyphOrder, GlyphOrderList):
+			d = glyphOrder.getReverseMap()
+			try:
+				return list(map(d.__getitem__, glyphNames))
+			except KeyError:
+				pass
+		getGlyphID = self.getGlyphID
+		return [getGlyphID(glyphName, requireReal) for glyphName in glyphNames]
+
 	def getReverseGlyphMap(self, rebuild=False):
-		if rebuild or not hasattr(self, "_reverseGlyphOrderDict"):
-			self._buildReverseGlyphOrderDict()
-		return self._reverseGlyphOrderDict
+		return self._getReverseGlyphMap(self.getGlyphOrder(), rebuild)
+
+	def _getReverseGlyphMap(self, glyphOrder, rebuild=False):
+		if isinstance(glyphOrder, GlyphOrderList):
+			if rebuild:
+				glyphOrder.invalidateReverseMap()
+			return glyphOrder.getReverseMap()
+		# a plain list can be modified without the font knowing
+		d = self.__dict__.get("_reverseGlyphOrderDict")
+		if rebuild or d is None:
+			d = self._reverseGlyphOrderDict = dict(
+				zip(glyphOrder, range(len(glyphOrder))))
+		return d
 
 	def _buildReverseGlyphOrderDict(self):
-		self._reverseGlyphOrderDict = d = {}
-		glyphOrder = self.getGlyphOrder()
-		for glyphID in range(len(glyphOrder)):
-			d[glyphOrder[glyphID]] = glyphID
+		self.getReverseGlyphMap(rebuild=True)
 
-	def _writeTable(self, tag, writer, done):
+	def _writeTable(self, tag, writer, done, compileTags=None):
 		"""Internal helper function for self.save(). Keeps track of
-		inter-table dependencies.
+		inter-table dependencies. 'writer' is either an SFNTWriter or a
+		dict-like object to store the table data into. If 'compileTags'
+		is not None, loaded tables not in it are copied from the input file,
+		unless one of their master tables was compiled: those are added to
+		it.
 		"""
 		if tag in done:
 			return
@@ -648,10 +819,22 @@ class TTFont(object):
 		for masterTable in tableClass.dependencies:
 			if masterTable not in done:
 				if masterTable in self:
-					self._writeTable(masterTable, writer, done)
+					self._writeTable(masterTable, writer, done, compileTags)
 				else:
 					done.append(masterTable)
-		tabledata = self.getTableData(tag)
+		if (compileTags is not None and tag not in compileTags and
+				self.isLoaded(tag) and
+				any(t in compileTags for t in tableClass.dependencies)):
+			# the table may have been loaded while its master tables were
+			# compiled (like 'hhea' while 'glyf' recalculates the extents),
+			# after getDirtyTables() was called
+			compileTags.add(tag)
+		if (compileTags is not None and tag not in compileTags and
+				self.reader and tag in self.reader):
+			log.debug("copying '%s' table from input file", tag)
+			tabledata = self.reader[tag]
+		else:
+			tabledata = self.getTableData(tag)
 		log.debug("writing '%s' table to disk", tag)
 		writer[tag] = tabledata
 		done.append(tag)
@@ -693,6 +876,119 @@ class TTFont(object):
 		return glyphs
 
 
+class TTCollection(object):
+
+	"""Object representing a TrueType Collection (TTC) file. The member fonts
+	are available as a list of TTFont objects in the 'fonts' attribute, and
+	by indexing or iterating over the collection.
+
+	All members are read from a single file object. If 'shareTables' is
+	true, a table stored at the same offset for several members is only
+	decompiled once, and the same table object is returned for each of them.
+	Only the fonts whose glyph order is made from the same tables share
+	them, and the tables read to make the glyph order are not shared. Note
+	that modifying a shared table modifies it for all the fonts using it.
+
+	The other keyword arguments are passed on to the TTFont constructor.
+	"""
+
+	def __init__(self, file=None, shareTables=False, **kwargs):
+		from fontTools.ttLib import sfnt
+		self.fonts = []
+		if file is None:
+			return
+		assert 'fontNumber' not in kwargs, kwargs
+
+		if not hasattr(file, "read"):
+			closeStream = True
+			file = open(file, "rb")
+		else:
+			closeStream = False
+		if not kwargs.get('lazy') and not kwargs.get('useMmap'):
+			# read the whole collection in memory once: each TTFont then
+			# wraps a stream around the same data (which isn't copied)
+			tmp = BytesIO(file.read())
+			if hasattr(file, 'name'):
+				tmp.name = file.name
+			if closeStream:
+				file.close()
+			file = tmp
+
+		tableCache = {} if shareTables else None
+		file.seek(0)
+		header = sfnt.readTTCHeader(file)
+		for i in range(header.numFonts):
+			file.seek(0)
+			font = TTFont(file, fontNumber=i, _tableCache=tableCache, **kwargs)
+			self.fonts.append(font)
+
+	def __getitem__(self, index):
+		return self.fonts[index]
+
+	def __setitem__(self, index, font):
+		self.fonts[index] = font
+
+	def __delitem__(self, index):
+		del self.fonts[index]
+
+	def __len__(self):
+		return len(self.fonts)
+
+	def __iter__(self):
+		return iter(self.fonts)
+
+	def close(self):
+		for font in self.fonts:
+			font.close()
+
+	def save(self, file, shareTables=True):
+		"""Save the collection to disk. The 'file' argument can be either a
+		pathname or a writable file object.
+
+		If 'shareTables' is true, tables whose binary data is identical
+		(after compilation) are only stored once in the file, and shared
+		by all the member fonts using them.
+		"""
+		from fontTools.ttLib import sfnt
+		for font in self.fonts:
+			if font.flavor:
+				raise TTLibError("'%s' fonts can't be stored in a collection" % font.flavor)
+		if not hasattr(file, "write"):
+			for font in self.fonts:
+				reader = font.reader
+				if (reader is not None and (font.lazy or reader.mappedData is not None)
+						and getattr(reader.file, "name", None) == file):
+					raise TTLibError(
+						"Can't overwrite TTCollection whose input file is still in use")
+			closeStream = True
+			file = open(file, "wb")
+		else:
+			closeStream = False
+
+		# offsets are relative to the start of the file, and the header is
+		# only filled in after all the fonts are written
+		if _isSeekable(file) and file.tell() == 0:
+			stream = file
+		else:
+			stream = BytesIO()
+		tableCache = {} if shareTables else None
+		offsets = []
+		stream.write(b'\0' * sfnt.calcTTCHeaderSize(len(self.fonts)))
+		for font in self.fonts:
+			offsets.append(stream.tell())
+			font._save(stream, tableCache=tableCache)
+			stream.seek(0, 2)
+		stream.seek(0)
+		sfnt.writeTTCHeader(stream, offsets)
+
+		if stream is not file:
+			file.write(stream.getvalue())
+			stream.close()
+
+		if closeStream:
+			file.close()
+
+
 class _TTGlyphSet(object):
 
 	"""Generic dict-like GlyphSet class that pulls metrics from hmtx and
@@ -775,12 +1071,97 @@ class GlyphOrder(object):
 
 	def fromXML(self, name, attrs, content, ttFont):
 		if not hasattr(self, "glyphOrder"):
-			self.glyphOrder = []
+			self.glyphOrder = GlyphOrderList()
 			ttFont.setGlyphOrder(self.glyphOrder)
 		if name == "GlyphID":
 			self.glyphOrder.append(attrs["name"])
 
 
+def _invalidating(method):
+	def wrapper(self, *args, **kwargs):
+		self.invalidateReverseMap()
+		return method(self, *args, **kwargs)
+	wrapper.__name__ = method.__name__
+	return wrapper
+
+
+class GlyphOrderList(list):
+
+	"""A list of glyph names which keeps a map from the names to their glyph
+	IDs (the last one, for duplicate names) up to date as it's modified, and
+	counts its modifications in 'version'. Appending and replacing names
+	update the map, other changes make it rebuilt on next use.
+	"""
+
+	def __init__(self, glyphNames=()):
+		list.__init__(self, glyphNames)
+		self.version = 0
+		self._reverseMap = None
+
+	def __reduce__(self):
+		# list pickling would append the items before __init__ is called
+		return (self.__class__, (list(self),))
+
+	def getReverseMap(self):
+		"""Return the dict mapping the glyph names to their glyph IDs. It must
+		not be modified."""
+		d = self._reverseMap
+		if d is None:
+			d = self._reverseMap = dict(zip(self, range(len(self))))
+		return d
+
+	def invalidateReverseMap(self):
+		self._reverseMap = None
+		self.version += 1
+
+	def append(self, glyphName):
+		list.append(self, glyphName)
+		self.version += 1
+		if self._reverseMap is not None:
+			self._reverseMap[glyphName] = len(self) - 1
+
+	def extend(self, glyphNames):
+		start = len(self)
+		list.extend(self, glyphNames)
+		self.version += 1
+		d = self._reverseMap
+		if d is not None:
+			d.update(zip(self[start:], range(start, len(self))))
+
+	def __iadd__(self, glyphNames):
+		self.extend(glyphNames)
+		return self
+
+	def __setitem__(self, index, glyphName):
+		d = self._reverseMap
+		if d is not None and not isinstance(index, slice):
+			if index < 0:
+				index += len(self)
+			oldName = self[index]
+			# renaming a unique glyph to a new name
+			if d.get(oldName) == index and glyphName not in d and len(d) == len(self):
+				list.__setitem__(self, index, glyphName)
+				del d[oldName]
+				d[glyphName] = index
+				self.version += 1
+				return
+		self.invalidateReverseMap()
+		list.__setitem__(self, index, glyphName)
+
+	__delitem__ = _invalidating(list.__delitem__)
+	__imul__ = _invalidating(list.__imul__)
+	insert = _invalidating(list.insert)
+	pop = _invalidating(list.pop)
+	remove = _invalidating(list.remove)
+	reverse = _invalidating(list.reverse)
+	sort = _invalidating(list.sort)
+	if hasattr(list, "clear"):
+		clear = _invalidating(list.clear)
+	if hasattr(list, "__setslice__"):
+		__setslice__ = _invalidating(list.__setslice__)
+		__delslice__ = _invalidating(list.__delslice__)
+
+
 def getTableModule(tag):
 	"""Fetch the packer/unpacker module for a table.
 	Return None when no module is found.
@@ -967,6 +1348,18 @@ def reorderFontTables(inFile, outFile, tableOrder=None, checkChecksums=False):
 	writer.close()
 
 
+def _isSeekable(file):
+	try:
+		return file.seekable()
+	except AttributeError:
+		# Python 2 file objects
+		try:
+			file.tell()
+		except (AttributeError, IOError):
+			return False
+		return True
+
+
 def maxPowerOfTwo(x):
 	"""Return the highest exponent of two, so that
 	(2 ** exponent) <= x.  Return 0 if x is 0.
@@ -17,6 +17,9 @@ from fontTools.misc.py23 import *
 from fontTools.misc import sstruct
 from fontTools.ttLib import getSearchRange
 import struct
+import array
+import mmap
+import sys
 from collections import OrderedDict
 import logging
 
@@ -26,6 +29,9 @@ log = logging.getLogger(__name__)
 
 class SFNTReader(object):
 
+	# memoryview of the whole input file, when it is memory-mapped
+	mappedData = None
+
 	def __new__(cls, *args, **kwargs):
 		""" Return an instance of the SFNTReader sub-class which is compatible
 		with the input file type.
@@ -41,7 +47,7 @@ class SFNTReader(object):
 		# return default object
 		return object.__new__(cls)
 
-	def __init__(self, file, checkChecksums=1, fontNumber=-1):
+	def __init__(self, file, checkChecksums=1, fontNumber=-1, useMmap=False):
 		self.file = file
 		self.checkChecksums = checkChecksums
 
@@ -51,19 +57,12 @@ class SFNTReader(object):
 		self.sfntVersion = self.file.read(4)
 		self.file.seek(0)
 		if self.sfntVersion == b"ttcf":
-			data = self.file.read(ttcHeaderSize)
-			if len(data) != ttcHeaderSize:
-				from fontTools import ttLib
-				raise ttLib.TTLibError("Not a Font Collection (not enough data)")
-			sstruct.unpack(ttcHeaderFormat, data, self)
-			assert self.Version == 0x00010000 or self.Version == 0x00020000, "unrecognized TTC version 0x%08x" % self.Version
+			header = readTTCHeader(self.file)
+			self.__dict__.update(header.__dict__)
 			if not 0 <= fontNumber < self.numFonts:
 				from fontTools import ttLib
 				raise ttLib.TTLibError("specify a font number between 0 and %d (inclusive)" % (self.numFonts - 1))
-			offsetTable = struct.unpack(">%dL" % self.numFonts, self.file.read(self.numFonts * 4))
-			if self.Version == 0x00020000:
-				pass # ignoring version 2.0 signatures
-			self.file.seek(offsetTable[fontNumber])
+			self.file.seek(self.offsetTable[fontNumber])
 			data = self.file.read(sfntDirectorySize)
 			if len(data) != sfntDirectorySize:
 				from fontTools import ttLib
@@ -100,6 +99,9 @@ class SFNTReader(object):
 		if self.flavor == "woff":
 			self.flavorData = WOFFFlavorData(self)
 
+		if useMmap:
+			self.mappedData = mapFile(self.file)
+
 	def has_key(self, tag):
 		return tag in self.tables
 
@@ -111,11 +113,14 @@ class SFNTReader(object):
 	def __getitem__(self, tag):
 		"""Fetch the raw table data."""
 		entry = self.tables[Tag(tag)]
-		data = entry.loadData (self.file)
+		if self.mappedData is not None:
+			data = entry.loadDataFromBuffer(self.mappedData)
+		else:
+			data = entry.loadData(self.file)
 		if self.checkChecksums:
 			if tag == 'head':
 				# Beh: we have to special-case the 'head' table.
-				checksum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+				checksum = calcChecksum(data[12:], calcChecksum(data[:8]))
 			else:
 				checksum = calcChecksum(data)
 			if self.checkChecksums > 1:
@@ -130,6 +135,9 @@ class SFNTReader(object):
 		del self.tables[Tag(tag)]
 
 	def close(self):
+		if self.mappedData is not None:
+			unmapFile(self.mappedData)
+			self.mappedData = None
 		self.file.close()
 
 
@@ -173,6 +181,18 @@ def compress(data, level=ZLIB_COMPRESSION_LEVEL):
 		return compress(data, numiterations=ZOPFLI_LEVELS[level])
 
 
+def createExecutor(workers):
+	"""Return a pool of 'workers' threads, or None if the concurrent.futures
+	module is not available (on Python 2, it requires the 'futures' backport).
+	"""
+	try:
+		from concurrent.futures import ThreadPoolExecutor
+	except ImportError:
+		log.warning("concurrent.futures module not found; compressing tables serially")
+		return None
+	return ThreadPoolExecutor(max_workers=workers)
+
+
 class SFNTWriter(object):
 
 	def __new__(cls, *args, **kwargs):
@@ -193,12 +213,29 @@ class SFNTWriter(object):
 		return object.__new__(cls)
 
 	def __init__(self, file, numTables, sfntVersion="\000\001\000\000",
-			flavor=None, flavorData=None):
+			flavor=None, flavorData=None, tableCache=None, workers=None):
+		"""The table directory is written at the current position of 'file',
+		and the table offsets are relative to the start of 'file'; this allows
+		writing several fonts in the same TrueType Collection file.
+
+		If 'tableCache' is a dict, it is used to look up tables whose data is
+		identical to a table written before (possibly by another SFNTWriter
+		sharing the same cache and file): their data is only stored once.
+
+		If 'workers' is greater than 1, WOFF tables are compressed concurrently
+		by a pool of as many threads (both zlib and zopfli release the GIL
+		while compressing). Tables are still written in the order they are
+		added, so the output is identical to the serial one.
+		"""
 		self.file = file
 		self.numTables = numTables
 		self.sfntVersion = Tag(sfntVersion)
 		self.flavor = flavor
 		self.flavorData = flavorData
+		self.tableCache = tableCache
+		self.directoryOffset = self.file.tell()
+		self.executor = None
+		self.pendingTables = []
 
 		if self.flavor == "woff":
 			self.directoryFormat = woffDirectoryFormat
@@ -209,6 +246,9 @@ class SFNTWriter(object):
 
 			# to calculate WOFF checksum adjustment, we also need the original SFNT offsets
 			self.origNextTableOffset = sfntDirectorySize + numTables * sfntDirectoryEntrySize
+
+			if workers is not None and workers > 1:
+				self.executor = createExecutor(workers)
 		else:
 			assert not self.flavor, "Unknown flavor '%s'" % self.flavor
 			self.directoryFormat = sfntDirectoryFormat
@@ -217,7 +257,10 @@ class SFNTWriter(object):
 
 			self.searchRange, self.entrySelector, self.rangeShift = getSearchRange(numTables, 16)
 
-		self.nextTableOffset = self.directorySize + numTables * self.DirectoryEntry.formatSize
+		if self.directoryOffset and self.flavor:
+			from fontTools import ttLib
+			raise ttLib.TTLibError("'%s' fonts can't be stored in a collection" % self.flavor)
+		self.nextTableOffset = self.directoryOffset + self.directorySize + numTables * self.DirectoryEntry.formatSize
 		# clear out directory area
 		self.file.seek(self.nextTableOffset)
 		# make sure we're actually where we want to be. (old cStringIO bug)
@@ -234,13 +277,50 @@ class SFNTWriter(object):
 		entry.tag = tag
 		entry.offset = self.nextTableOffset
 		if tag == 'head':
-			entry.checkSum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+			entry.checkSum = calcChecksum(data[12:], calcChecksum(data[:8]))
 			self.headTable = data
 			entry.uncompressed = True
 		else:
 			entry.checkSum = calcChecksum(data)
+			if self.tableCache is not None:
+				sharedEntry = self._findSharedTable(entry, data)
+				if sharedEntry is not None:
+					entry.offset = sharedEntry.offset
+					entry.length = sharedEntry.length
+					self.tables[tag] = entry
+					return
+		self.tables[tag] = entry
+
+		if self.executor is not None:
+			if entry.uncompressed:
+				future = None
+			else:
+				future = self.executor.submit(compress, data, entry.zlibCompressionLevel)
+			self.pendingTables.append((entry, data, future))
+			self._writePendingTables(wait=False)
+			return
+
 		entry.saveData(self.file, data)
+		self._advanceTableOffset(entry)
 
+	def _writePendingTables(self, wait):
+		"""Write the tables whose compression is done, in the order they were
+		added. If 'wait' is true, wait for all the pending tables.
+		"""
+		pending = self.pendingTables
+		while pending:
+			entry, data, future = pending[0]
+			if future is not None and not wait and not future.done():
+				break
+			del pending[0]
+			compressedData = future.result() if future is not None else None
+			entry.offset = self.nextTableOffset
+			rawData = entry.encodeData(data, compressedData)
+			self.file.seek(entry.offset)
+			self.file.write(rawData)
+			self._advanceTableOffset(entry)
+
+	def _advanceTableOffset(self, entry):
 		if self.flavor == "woff":
 			entry.origOffset = self.origNextTableOffset
 			self.origNextTableOffset += (entry.origLength + 3) & ~3
@@ -253,12 +333,30 @@ class SFNTWriter(object):
 		self.file.write(b'\0' * (self.nextTableOffset - self.file.tell()))
 		assert self.nextTableOffset == self.file.tell()
 
-		self.tables[tag] = entry
+	def _findSharedTable(self, entry, data):
+		"""Return the directory entry of an already written table whose data
+		is identical to 'data', or None. Tables are first matched by checksum,
+		then by content. If not found, 'entry' is added to the cache.
+		('head' tables are never shared, as their checkSumAdjustment field
+		is specific to each font.)
+		"""
+		candidates = self.tableCache.setdefault(entry.checkSum, [])
+		for sharedEntry, sharedData in candidates:
+			if len(sharedData) == len(data) and sharedData == data:
+				log.debug("sharing '%s' table at offset %d", entry.tag, sharedEntry.offset)
+				return sharedEntry
+		candidates.append((entry, data))
+		return None
 
 	def close(self):
 		"""All tables must have been written to disk. Now write the
 		directory.
 		"""
+		if self.executor is not None:
+			self._writePendingTables(wait=True)
+			self.executor.shutdown()
+			self.executor = None
+
 		tables = sorted(self.tables.items())
 		if len(tables) != self.numTables:
 			from fontTools import ttLib
@@ -311,7 +409,6 @@ class SFNTWriter(object):
 
 		directory = sstruct.pack(self.directoryFormat, self)
 
-		self.file.seek(self.directorySize)
 		seenHead = 0
 		for tag, entry in tables:
 			if tag == "head":
@@ -319,7 +416,7 @@ class SFNTWriter(object):
 			directory = directory + entry.toString()
 		if seenHead:
 			self.writeMasterChecksum(directory)
-		self.file.seek(0)
+		self.file.seek(self.directoryOffset)
 		self.file.write(directory)
 
 	def _calcMasterChecksum(self, directory):
@@ -456,6 +553,16 @@ class DirectoryEntry(object):
 			data = self.decodeData(data)
 		return data
 
+	def loadDataFromBuffer(self, buffer):
+		"""Like loadData, but slice the data from 'buffer', a memoryview
+		of the whole file. No copy is made unless the data must be decoded.
+		"""
+		data = buffer[self.offset:self.offset + self.length]
+		assert len(data) == self.length
+		if hasattr(self.__class__, 'decodeData'):
+			data = self.decodeData(data)
+		return data
+
 	def saveData(self, file, data):
 		if hasattr(self.__class__, 'encodeData'):
 			data = self.encodeData(data)
@@ -500,9 +607,12 @@ class WOFFDirectoryEntry(DirectoryEntry):
 			assert len(data) == self.origLength
 		return data
 
-	def encodeData(self, data):
+	def encodeData(self, data, compressedData=None):
+		"""Return the data to be stored for this table. 'compressedData' is
+		the result of compress(data) when it was computed beforehand.
+		"""
 		self.origLength = len(data)
-		if not self.uncompressed:
+		if not self.uncompressed and compressedData is None:
 			compressedData = compress(data, self.zlibCompressionLevel)
 		if self.uncompressed or len(compressedData) >= self.origLength:
 			# Encode uncompressed
@@ -540,31 +650,138 @@ class WOFFFlavorData():
 				self.privData = data
 
 
-def calcChecksum(data):
+def readTTCHeader(file):
+	"""Read the TrueType Collection header at the current position of 'file'
+	and return an object with 'TTCTag', 'Version', 'numFonts' and
+	'offsetTable' attributes.
+	"""
+	from fontTools import ttLib
+	data = file.read(ttcHeaderSize)
+	if len(data) != ttcHeaderSize:
+		raise ttLib.TTLibError("Not a Font Collection (not enough data)")
+	header = TTCHeader()
+	sstruct.unpack(ttcHeaderFormat, data, header)
+	if Tag(header.TTCTag) != "ttcf":
+		raise ttLib.TTLibError("Not a Font Collection (bad TTCTag)")
+	assert header.Version == 0x00010000 or header.Version == 0x00020000, "unrecognized TTC version 0x%08x" % header.Version
+	header.offsetTable = struct.unpack(">%dL" % header.numFonts, file.read(header.numFonts * 4))
+	if header.Version == 0x00020000:
+		pass # ignoring version 2.0 signatures
+	return header
+
+
+def writeTTCHeader(file, offsetTable):
+	"""Write a version 1.0 TrueType Collection header at the current
+	position of 'file', with the given list of font offsets.
+	"""
+	header = TTCHeader()
+	header.TTCTag = Tag("ttcf")
+	header.Version = 0x00010000
+	header.numFonts = len(offsetTable)
+	file.write(sstruct.pack(ttcHeaderFormat, header))
+	file.write(struct.pack(">%dL" % len(offsetTable), *offsetTable))
+
+
+def calcTTCHeaderSize(numFonts):
+	"""Return the size of a version 1.0 TrueType Collection header."""
+	return ttcHeaderSize + numFonts * 4
+
+
+class TTCHeader(object):
+	pass
+
+
+def mapFile(file):
+	"""Memory-map the readable file object 'file' and return a read-only
+	memoryview of its contents. Return None if the file can't be mapped,
+	eg. because it's an in-memory stream, or it's empty.
+	"""
+	try:
+		fileno = file.fileno()
+	except (AttributeError, IOError, OSError, ValueError):
+		return None
+	try:
+		m = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+	except (IOError, OSError, ValueError):
+		return None
+	try:
+		return memoryview(m)
+	except TypeError:
+		# Python 2 mmap objects don't support the buffer protocol
+		m.close()
+		return None
+
+
+def unmapFile(view):
+	"""Release a memoryview returned by mapFile(). The mapping itself stays
+	alive until all the slices taken from it are garbage-collected.
+	"""
+	m = view.obj
+	view.release()
+	try:
+		m.close()
+	except BufferError:
+		pass
+
+
+def calcChecksum(data, start=0):
 	"""Calculate the checksum for an arbitrary block of data.
 	Optionally takes a 'start' argument, which allows you to
 	calculate a checksum in chunks by feeding it a previous
-	result.
+	result. All the chunks but the last must have a length
+	multiple of four.
 
 	If the data length is not a multiple of four, it assumes
 	it is to be padded with null byte.
 
+	The data can be a bytes string, a bytearray or a memoryview: it is
+	not copied when NumPy is available.
+
 		>>> print(calcChecksum(b"abcd"))
 		1633837924
 		>>> print(calcChecksum(b"abcdxyz"))
 		3655064932
+		>>> print(calcChecksum(b"xyz", calcChecksum(b"abcd")))
+		3655064932
 	"""
-	remainder = len(data) % 4
+	length = len(data)
+	remainder = length % 4
+	size = length - remainder
+	value = start
+	numpy = _importNumpy() if size >= _checksumBlockSize else None
+	if numpy:
+		longs = numpy.frombuffer(memoryview(data)[:size], dtype=">u4")
+		value += int(longs.sum(dtype=numpy.uint64))
+	elif size >= _checksumBlockSize and _checksumArrayType:
+		longs = array.array(_checksumArrayType, memoryview(data)[:size].tobytes())
+		if sys.byteorder != "big":
+			longs.byteswap()
+		value += sum(longs)
+	elif size:
+		value += sum(struct.unpack(">%dL" % (size // 4), data[:size]))
 	if remainder:
-		data += b"\0" * (4 - remainder)
-	value = 0
-	blockSize = 4096
-	assert blockSize % 4 == 0
-	for i in range(0, len(data), blockSize):
-		block = data[i:i+blockSize]
-		longs = struct.unpack(">%dL" % (len(block) // 4), block)
-		value = (value + sum(longs)) & 0xffffffff
-	return value
+		tail = memoryview(data)[size:].tobytes() + b"\0" * (4 - remainder)
+		value += struct.unpack(">L", tail)[0]
+	return value & 0xffffffff
+
+
+# blocks smaller than this are summed with struct, which is faster for them
+_checksumBlockSize = 256
+
+# array typecode for 32-bit unsigned integers, if any
+_checksumArrayType = "I" if array.array("I").itemsize == 4 else None
+
+# NumPy module, imported on first use; False if it's not available
+_numpy = None
+
+def _importNumpy():
+	global _numpy
+	if _numpy is None:
+		try:
+			import numpy as _numpy
+		except ImportError:
+			_numpy = False
+	return _numpy
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+from __future__ import print_function, division, absolute_import, unicode_literals
+from fontTools.misc.py23 import *
+from fontTools import ttLib
+from fontTools.ttLib.sfnt import SFNTReader, mapFile, calcChecksum
+import unittest
+import struct
+import tempfile
+import shutil
+import os
+
+
+# Python 3 renamed 'assertRaisesRegexp' to 'assertRaisesRegex', and fires
+# deprecation warnings if a program uses the old name.
+if not hasattr(unittest.TestCase, 'assertRaisesRegex'):
+	unittest.TestCase.assertRaisesRegex = unittest.TestCase.assertRaisesRegexp
+
+
+current_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+data_dir = os.path.join(current_dir, 'testdata')
+TTX = os.path.join(data_dir, 'TestTTF-Regular.ttx')
+
+
+def slowChecksum(data):
+	remainder = len(data) % 4
+	if remainder:
+		data += b"\0" * (4 - remainder)
+	return sum(struct.unpack(">%dL" % (len(data) // 4), data)) & 0xffffffff
+
+
+class CalcChecksumTest(unittest.TestCase):
+
+	def test_calcChecksum(self):
+		data = bytesjoin(bytechr(i * 7 % 256) for i in range(5003))
+		for size in (0, 1, 3, 4, 5, 255, 256, 257, 1024, 1027, 5003):
+			expected = slowChecksum(data[:size])
+			self.assertEqual(calcChecksum(data[:size]), expected)
+			self.assertEqual(calcChecksum(memoryview(data)[:size]), expected)
+			self.assertEqual(calcChecksum(bytearray(data[:size])), expected)
+
+	def test_calcChecksum_no_numpy(self):
+		from fontTools.ttLib import sfnt
+		numpy = sfnt._numpy
+		sfnt._numpy = False
+		try:
+			data = bytesjoin(bytechr(i * 7 % 256) for i in range(1027))
+			expected = slowChecksum(data)
+			self.assertEqual(calcChecksum(data), expected)
+			self.assertEqual(calcChecksum(bytearray(data)), expected)
+			self.assertEqual(calcChecksum(memoryview(data)), expected)
+		finally:
+			sfnt._numpy = numpy
+
+	def test_calcChecksum_overflow(self):
+		data = b"\xff" * 4096
+		self.assertEqual(calcChecksum(data), slowChecksum(data))
+
+	def test_calcChecksum_start(self):
+		data = bytesjoin(bytechr(i % 256) for i in range(3001))
+		value = 0
+		for i in range(0, len(data), 1000):
+			value = calcChecksum(data[i:i+1000], value)
+		self.assertEqual(value, slowChecksum(data))
+
+
+class SFNTReaderMmapTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.tempdir = tempfile.mkdtemp()
+		cls.path = os.path.join(cls.tempdir, 'TestTTF-Regular.ttf')
+		font = ttLib.TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		font.save(cls.path)
+		with open(cls.path, 'rb') as f:
+			cls.fontData = f.read()
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls.tempdir)
+
+	def test_mapFile_unmappable(self):
+		self.assertIsNone(mapFile(BytesIO(self.fontData)))
+
+	def test_mapFile_no_buffer_protocol(self):
+		# as on Python 2, where mmap objects can't be viewed
+		from fontTools.ttLib import sfnt
+		def memoryview(obj):
+			raise TypeError("cannot make memory view")
+		sfnt.memoryview = memoryview
+		try:
+			with open(self.path, 'rb') as f:
+				self.assertIsNone(mapFile(f))
+			font = ttLib.TTFont(self.path, useMmap=True)
+			self.assertIsNone(font.reader.mappedData)
+			self.assertEqual(font.getGlyphOrder()[0], '.notdef')
+			font.close()
+		finally:
+			del sfnt.memoryview
+
+	def test_tables_are_views(self):
+		with open(self.path, 'rb') as f:
+			reader = SFNTReader(f, checkChecksums=2, useMmap=True)
+			plain = SFNTReader(BytesIO(self.fontData))
+			for tag in reader.keys():
+				data = reader[tag]
+				self.assertIsInstance(data, memoryview)
+				self.assertEqual(data.tobytes(), plain[tag])
+			reader.close()
+			self.assertIsNone(reader.mappedData)
+
+	def test_TTFont_useMmap(self):
+		font = ttLib.TTFont(self.path, useMmap=True, recalcTimestamp=False)
+		self.assertIsInstance(font['glyf'].glyphs['period'].data, memoryview)
+		# tables that can't consume views get a copy of the data
+		self.assertIsInstance(font['name'].names[0].string, bytes)
+		out = BytesIO()
+		font.save(out, reorderTables=None)
+		expected = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+		expectedOut = BytesIO()
+		expected['glyf']
+		expected['name']
+		expected.save(expectedOut, reorderTables=None)
+		self.assertEqual(out.getvalue(), expectedOut.getvalue())
+		with self.assertRaisesRegex(ttLib.TTLibError, 'memory-mapped'):
+			font.save(self.path)
+		font.close()
+
+
+class SFNTWriterWorkersTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		font = ttLib.TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		buf = BytesIO()
+		font.save(buf)
+		cls.fontData = buf.getvalue()
+
+	def save(self, workers, onlyDirty=False):
+		font = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+		font.flavor = "woff"
+		buf = BytesIO()
+		font.save(buf, onlyDirty=onlyDirty, workers=workers)
+		return buf.getvalue()
+
+	def test_woff_workers(self):
+		for onlyDirty in (False, True):
+			expected = self.save(None, onlyDirty)
+			self.assertEqual(self.save(4, onlyDirty), expected)
+		font = ttLib.TTFont(BytesIO(expected))
+		self.assertEqual(font.flavor, "woff")
+		original = SFNTReader(BytesIO(self.fontData))
+		for tag in original.keys():
+			self.assertEqual(font.reader[tag], original[tag])
+
+
+if __name__ == "__main__":
+	unittest.main()
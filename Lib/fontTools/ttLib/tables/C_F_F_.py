@@ -6,13 +6,16 @@ from . import DefaultTable
 
 class table_C_F_F_(DefaultTable.DefaultTable):
 
+	# the charstrings are kept as slices of the table data until decompiled
+	zeroCopy = True
+
 	def __init__(self, tag=None):
 		DefaultTable.DefaultTable.__init__(self, tag)
 		self.cff = cffLib.CFFFontSet()
 		self._gaveGlyphOrder = False
 
 	def decompile(self, data, otFont):
-		self.cff.decompile(BytesIO(data), otFont)
+		self.cff.decompile(cffLib.BufferReader(data), otFont)
 		assert len(self.cff) == 1, "can't deal with multi-font CFF tables."
 
 	def compile(self, otFont):
@@ -27,11 +30,16 @@ class table_C_F_F_(DefaultTable.DefaultTable):
 			return True
 
 	def getGlyphOrder(self):
+		from fontTools import ttLib
 		if self._gaveGlyphOrder:
-			from fontTools import ttLib
 			raise ttLib.TTLibError("illegal use of getGlyphOrder()")
 		self._gaveGlyphOrder = True
-		return self.cff[self.cff.fontNames[0]].getGlyphOrder()
+		topDict = self.cff[self.cff.fontNames[0]]
+		glyphOrder = topDict.getGlyphOrder()
+		if not isinstance(glyphOrder, ttLib.GlyphOrderList):
+			# the font shares the charset, which keeps its reverse map
+			glyphOrder = topDict.charset = ttLib.GlyphOrderList(glyphOrder)
+		return glyphOrder
 
 	def setGlyphOrder(self, glyphOrder):
 		pass
@@ -4,7 +4,11 @@ from __future__ import print_function, division, absolute_import
 from __future__ import unicode_literals
 from fontTools.misc.py23 import *
 from fontTools.ttLib import TTFont, newTable
+from fontTools import cffLib
+from fontTools.misc import psCharStrings
+from fontTools.misc.loggingTools import CapturingLogHandler
 import os
+import struct
 import unittest
 
 
@@ -13,6 +17,8 @@ DATA_DIR = os.path.join(CURR_DIR, 'testdata')
 
 CFF_TTX = os.path.join(DATA_DIR, "C_F_F_.ttx")
 CFF_BIN = os.path.join(DATA_DIR, "C_F_F_.bin")
+CID_TTX = os.path.join(CURR_DIR, '..', '..', 'subset', 'testdata',
+                       'TestCID-Regular.ttx')
 
 
 class CFFTableTest(unittest.TestCase):
@@ -40,6 +46,74 @@ class CFFTableTest(unittest.TestCase):
         cffData = cffTable.compile(font)
         self.assertEqual(cffData, self.cffData)
 
+    def test_decompile_memoryview(self):
+        font = TTFont(sfntVersion='OTTO')
+        cffTable = font['CFF '] = newTable('CFF ')
+        cffTable.decompile(memoryview(self.cffData), font)
+        topDict = cffTable.cff.topDictIndex[0]
+        charString = topDict.CharStrings['A']
+        self.assertIsInstance(charString.bytecode, memoryview)
+        topDict.CharStrings.loadAll()
+        self.assertNotIn(None, topDict.CharStrings.charStringsIndex.items)
+        self.assertEqual(cffTable.compile(font), self.cffData)
+
+    def test_glyphOrder_is_charset(self):
+        font = TTFont(sfntVersion='OTTO')
+        cffTable = font['CFF '] = newTable('CFF ')
+        cffTable.decompile(self.cffData, font)
+        glyphOrder = font.getGlyphOrder()
+        topDict = cffTable.cff.topDictIndex[0]
+        self.assertIs(topDict.charset, glyphOrder)
+        glyphOrder.append("Z")
+        self.assertEqual(topDict.charset[-1], "Z")
+        self.assertEqual(font.getGlyphID("Z"), len(glyphOrder) - 1)
+
+    def test_compile_two_passes(self):
+        font = TTFont(sfntVersion='OTTO')
+        font.importXML(CFF_TTX)
+        with CapturingLogHandler(cffLib.log, cffLib.DEBUG) as captor:
+            cffData = font['CFF '].compile(font)
+        passes = [r for r in captor.records
+                  if r.msg.startswith("CFFWriter.toFile() pass")]
+        self.assertEqual(len(passes), 2)
+        self.assertEqual(cffData, self.cffData)
+
+    def test_compile_new_FDArray_strings(self):
+        # the FontNames of the FDArray are new strings, added to the INDEX
+        # of strings which comes before them
+        font = TTFont(sfntVersion='OTTO')
+        font.importXML(CID_TTX)
+        cff = font['CFF '].cff
+        topDict = cff[cff.fontNames[0]]
+        fontNames = []
+        for i, fontDict in enumerate(topDict.FDArray):
+            fontDict.FontName = 'N%d' % i + 'x' * 364
+            fontNames.append(fontDict.FontName)
+        cffData = font['CFF '].compile(font)
+        cffTable = newTable('CFF ')
+        cffTable.decompile(cffData, font)
+        topDict = cffTable.cff[cffTable.cff.fontNames[0]]
+        self.assertEqual([fd.FontName for fd in topDict.FDArray], fontNames)
+        self.assertEqual(topDict.CharStrings.keys(), cff[cff.fontNames[0]].CharStrings.keys())
+
+    def test_encodeIntCFFSize(self):
+        for low, high, size in [(0, 107, 1), (108, 1131, 2), (100, 1131, 3),
+                                (0, 32767, 3), (1000, 40000, 5)]:
+            self.assertEqual(cffLib.calcNumberSize(low, high), size)
+            for value in (low, high):
+                data = cffLib.encodeIntCFFSize(value, size)
+                b0 = byteord(data[0])
+                read = psCharStrings.cffDictOperandEncoding[b0]
+                self.assertEqual(read(None, b0, data, 1), (value, size))
+
+    def test_encodeOffsets(self):
+        offsets = [1, 0x20, 0x300, 0x4000, 0x50000, 0x600000]
+        for offSize in (1, 2, 3, 4):
+            values = [o for o in offsets if o < 1 << (8 * offSize)]
+            data = bytesjoin(struct.pack(">L", v)[4-offSize:] for v in values)
+            self.assertEqual(cffLib.encodeOffsets(values, offSize), data)
+            self.assertEqual(cffLib.decodeOffsets(data, offSize), values)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,10 @@ class DefaultTable(object):
 
 	dependencies = []
 
+	# Set to True by subclasses whose decompile() method can work directly
+	# on a memoryview of the table data (see TTFont's 'useMmap' argument).
+	zeroCopy = False
+
 	def __init__(self, tag=None):
 		if tag is None:
 			tag = getClassTag(self.__class__)
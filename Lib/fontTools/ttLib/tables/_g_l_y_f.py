@@ -15,6 +15,10 @@ import sys
 import struct
 import array
 import logging
+try:
+	from collections.abc import MutableMapping
+except ImportError:
+	from collections import MutableMapping
 
 
 log = logging.getLogger(__name__)
@@ -40,7 +44,17 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 	# no padding, except for when padding would allow to use short loca offsets.
 	padding = 1
 
+	# glyph data are kept as slices of the table data until expanded
+	zeroCopy = True
+
+	# CoordinatesCache with the flattened coordinates of composite glyphs;
+	# created on first use
+	coordinatesCache = None
+
 	def decompile(self, data, ttFont):
+		if ttFont.lazy:
+			self.decompileLazy(data, ttFont)
+			return
 		loca = ttFont['loca']
 		last = int(loca[0])
 		noname = 0
@@ -69,6 +83,28 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 			for glyph in self.glyphs.values():
 				glyph.expand(self)
 
+	def decompileLazy(self, data, ttFont):
+		"""Keep the table data and the 'loca' offsets, and only create Glyph
+		objects for the glyphs which are accessed. See LazyGlyphDict.
+		"""
+		loca = ttFont['loca']
+		self.glyphOrder = glyphOrder = ttFont.getGlyphOrder()
+		numGlyphs = max(len(loca) - 1, 0)
+		glyphNames = glyphOrder[:numGlyphs]
+		noname = numGlyphs - len(glyphNames)
+		if noname:
+			glyphNames.extend('ttxautoglyph%s' % i for i in range(len(glyphNames), numGlyphs))
+			log.warning('%s glyphs have no name', noname)
+		offsets = loca.locations
+		end = int(offsets[numGlyphs]) if numGlyphs else 0
+		if end > len(data):
+			raise ttLib.TTLibError("not enough 'glyf' table data")
+		if len(data) - end >= 4:
+			log.warning(
+				"too much 'glyf' table data: expected %d, received %d bytes",
+				end, len(data))
+		self.glyphs = LazyGlyphDict(data, offsets, glyphNames)
+
 	def compile(self, ttFont):
 		if not hasattr(self, "glyphOrder"):
 			self.glyphOrder = ttFont.getGlyphOrder()
@@ -78,9 +114,17 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 		currentLocation = 0
 		dataList = []
 		recalcBBoxes = ttFont.recalcBBoxes
+		glyphs = self.glyphs
+		isLazy = isinstance(glyphs, LazyGlyphDict)
+		# the glyphs which were never accessed are copied as they are, unless
+		# their bounding boxes must be recalculated (and padding trimmed),
+		# like the eager Glyph.compile() does
+		copyData = isLazy and not recalcBBoxes
 		for glyphName in self.glyphOrder:
-			glyph = self.glyphs[glyphName]
-			glyphData = glyph.compile(self, recalcBBoxes)
+			glyphData = glyphs.getGlyphData(glyphName) if copyData else None
+			if glyphData is None:
+				glyph = glyphs[glyphName]
+				glyphData = glyph.compile(self, recalcBBoxes)
 			if padding > 1:
 				glyphData = pad(glyphData, size=padding)
 			locations.append(currentLocation)
@@ -95,7 +139,7 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 			if indices and currentLocation + len(indices) < 0x20000:
 				# It fits.  Do it.
 				for i in indices:
-					dataList[i] += b'\0'
+					dataList[i] = tobytes(dataList[i]) + b'\0'
 				currentLocation = 0
 				for i,glyphData in enumerate(dataList):
 					locations[i] = currentLocation
@@ -163,6 +207,92 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 		if not ttFont.recalcBBoxes:
 			glyph.compact(self, 0)
 
+	def getCoordinatesBulk(self, glyphNames=None):
+		"""Return the coordinates of many glyphs at once, as a tuple
+		(coordinates, offsets): 'coordinates' is a GlyphCoordinates object
+		with the points of all the glyphs one after the other, and the points
+		of glyphNames[i] are coordinates[offsets[i]:offsets[i+1]]. By default,
+		all the glyphs are returned, in glyph order.
+
+		The simple glyphs which are not expanded yet are decoded straight from
+		their data, all at once with NumPy if it's available, and are left
+		unexpanded. Composite glyphs are flattened like Glyph.getCoordinates()
+		does.
+		"""
+		if glyphNames is None:
+			glyphNames = self.glyphOrder
+		glyphs = self.glyphs
+		isLazy = isinstance(glyphs, LazyGlyphDict)
+		pieces = []
+		# simple glyphs to be decoded from their data: (pieces index, data)
+		pending = []
+		for glyphName in glyphNames:
+			data = glyphs.getGlyphData(glyphName) if isLazy else None
+			if data is None:
+				data = getattr(glyphs[glyphName], "data", None)
+			if data is None or (data and struct.unpack(">h", data[:2])[0] < 0):
+				# expanded or composite glyph
+				glyph = glyphs[glyphName]
+				glyph.expand(self)
+				pieces.append(glyph.getCoordinates(self)[0]._a)
+				continue
+			pending.append((len(pieces), data))
+			pieces.append(None)
+
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+		if numpy is not None and pending:
+			decoded = _decodeCoordinatesNumpy(numpy, [data for _, data in pending])
+		else:
+			decoded = [_decodeCoordinates(data) for _, data in pending]
+		for (index, _), a in zip(pending, decoded):
+			pieces[index] = a
+
+		typecode = "f" if any(a.typecode == "f" for a in pieces) else "h"
+		coordinates = GlyphCoordinates(typecode=typecode)
+		a = coordinates._a
+		offsets = [0]
+		for piece in pieces:
+			if piece.typecode != typecode:
+				piece = array.array(typecode, piece)
+			a.extend(piece)
+			offsets.append(len(a) // 2)
+		return coordinates, offsets
+
+	def getFlattenedCoordinates(self, glyphName):
+		"""Return the (coordinates, endPts, flags) of a glyph, like
+		Glyph.getCoordinates() does. The result for composite glyphs is
+		memoized in the 'coordinatesCache' attribute, and must not be
+		modified.
+		"""
+		cache = self.coordinatesCache
+		if cache is None:
+			cache = self.coordinatesCache = CoordinatesCache()
+		result = cache.get(self, glyphName)
+		if result is None:
+			glyph = self[glyphName]
+			result = glyph.getCoordinates(self)
+			if glyph.isComposite():
+				cache.add(self, glyphName, glyph, result)
+		return result
+
+	def getNumPoints(self, glyphName):
+		"""Return the number of points of a simple glyph, or the number of
+		components of a composite glyph, without expanding the glyph.
+		"""
+		glyphs = self.glyphs
+		glyphData = glyphs.getGlyphData(glyphName) if isinstance(glyphs, LazyGlyphDict) else None
+		if glyphData is None:
+			glyph = glyphs[glyphName]
+			glyphData = getattr(glyph, "data", None)
+			if glyphData is None:
+				if glyph.isComposite():
+					return len(glyph.components)
+				return len(getattr(glyph, "coordinates", ()))
+		return countGlyphPoints(glyphData)
+
 	def setGlyphOrder(self, glyphOrder):
 		self.glyphOrder = glyphOrder
 
@@ -190,16 +320,173 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 		self.glyphs[glyphName] = glyph
 		if glyphName not in self.glyphOrder:
 			self.glyphOrder.append(glyphName)
+		if self.coordinatesCache is not None:
+			self.coordinatesCache.invalidate(glyphName)
 
 	def __delitem__(self, glyphName):
 		del self.glyphs[glyphName]
 		self.glyphOrder.remove(glyphName)
+		if self.coordinatesCache is not None:
+			self.coordinatesCache.invalidate(glyphName)
 
 	def __len__(self):
 		assert len(self.glyphOrder) == len(self.glyphs)
 		return len(self.glyphs)
 
 
+class CoordinatesCache(object):
+
+	"""Flattened coordinates of the composite glyphs of a 'glyf' table, by
+	glyph name. An entry is dropped when the glyph or one of its components
+	is replaced or deleted through the table. Each entry also remembers the
+	glyph objects it was computed from, and the coordinates and component
+	attributes of these, so that it's not used after they were replaced.
+	Changes made in place to a glyph's coordinates array are not detected:
+	call invalidate() or clear() after those.
+
+	The 'hits', 'misses' and 'invalidations' attributes count the lookups
+	which found a valid entry, the entries which had to be computed, and the
+	entries which were dropped.
+	"""
+
+	def __init__(self):
+		# glyphName: (coordinates, endPts, flags, dependencies)
+		self.entries = {}
+		# glyphName: names of the cached glyphs which depend on it
+		self.users = {}
+		self.hits = self.misses = self.invalidations = 0
+
+	def __repr__(self):
+		return "<%s: %d entries, %d hits, %d misses, %d invalidations>" % (
+			self.__class__.__name__, len(self.entries), self.hits, self.misses,
+			self.invalidations)
+
+	def get(self, glyfTable, glyphName):
+		entry = self.entries.get(glyphName)
+		if entry is None:
+			return None
+		coordinates, endPts, flags, dependencies = entry
+		glyphs = glyfTable.glyphs
+		for name, glyph, state in dependencies:
+			if glyphs.get(name) is not glyph or not _isSameGlyphState(state, _getGlyphState(glyph)):
+				self.invalidate(glyphName)
+				return None
+		self.hits += 1
+		return coordinates, endPts, flags
+
+	def add(self, glyfTable, glyphName, glyph, result):
+		self.misses += 1
+		dependencies = [(glyphName, glyph, _getGlyphState(glyph))]
+		for compo in glyph.components:
+			entry = self.entries.get(compo.glyphName)
+			if entry is not None:
+				dependencies.extend(entry[3])
+			else:
+				baseGlyph = glyfTable.glyphs[compo.glyphName]
+				dependencies.append((compo.glyphName, baseGlyph, _getGlyphState(baseGlyph)))
+		for name, _, _ in dependencies[1:]:
+			self.users.setdefault(name, set()).add(glyphName)
+		self.entries[glyphName] = tuple(result) + (dependencies,)
+
+	def invalidate(self, glyphName):
+		"""Drop the entries of a glyph and of the glyphs using it."""
+		# dependencies are transitive: the users of a glyph include the
+		# users of its users
+		for name in [glyphName] + list(self.users.pop(glyphName, ())):
+			if self.entries.pop(name, None) is not None:
+				self.invalidations += 1
+
+	def clear(self):
+		self.entries.clear()
+		self.users.clear()
+
+
+def _getGlyphState(glyph):
+	"""Return what the flattened coordinates of a glyph depend on, except
+	for its components' outlines.
+	"""
+	if hasattr(glyph, "data"):
+		return (glyph.data,)
+	if glyph.isComposite():
+		return tuple((
+			compo.glyphName, compo.flags,
+			getattr(compo, "x", None), getattr(compo, "y", None),
+			getattr(compo, "firstPt", None), getattr(compo, "secondPt", None),
+			tuple(tuple(row) for row in compo.transform) if hasattr(compo, "transform") else None,
+			) for compo in glyph.components)
+	if glyph.numberOfContours > 0:
+		return (glyph.coordinates, glyph.endPtsOfContours, glyph.flags)
+	return ()
+
+
+def _isSameGlyphState(state, other):
+	return len(state) == len(other) and all(
+		a is b or a == b for a, b in zip(state, other))
+
+
+class LazyGlyphDict(MutableMapping):
+
+	"""Mapping of glyph names to Glyph objects, used by the 'glyf' table when
+	the font is loaded with lazy=True. The glyphs are only created when they
+	are first accessed, from a slice of the table data.
+	"""
+
+	def __init__(self, data, offsets, glyphNames):
+		self.data = data
+		self.offsets = offsets
+		# glyphs which were not accessed yet, by name: index in 'offsets'
+		self.lazyGlyphs = dict(zip(glyphNames, range(len(glyphNames))))
+		self.glyphs = {}
+
+	def getGlyphData(self, glyphName):
+		"""Return the original data of a glyph which was never accessed,
+		else None.
+		"""
+		i = self.lazyGlyphs.get(glyphName)
+		if i is None:
+			return None
+		return self.data[self.offsets[i]:self.offsets[i+1]]
+
+	def __getitem__(self, glyphName):
+		try:
+			return self.glyphs[glyphName]
+		except KeyError:
+			pass
+		glyphData = self.getGlyphData(glyphName)
+		if glyphData is None:
+			raise KeyError(glyphName)
+		glyph = self.glyphs[glyphName] = self.decompileGlyph(glyphName, glyphData)
+		del self.lazyGlyphs[glyphName]
+		return glyph
+
+	def decompileGlyph(self, glyphName, glyphData):
+		return Glyph(glyphData)
+
+	def __setitem__(self, glyphName, glyph):
+		self.glyphs[glyphName] = glyph
+		self.lazyGlyphs.pop(glyphName, None)
+
+	def __delitem__(self, glyphName):
+		if glyphName in self.glyphs:
+			del self.glyphs[glyphName]
+		else:
+			del self.lazyGlyphs[glyphName]
+
+	def __contains__(self, glyphName):
+		return glyphName in self.glyphs or glyphName in self.lazyGlyphs
+
+	has_key = __contains__
+
+	def __iter__(self):
+		for glyphName in self.glyphs:
+			yield glyphName
+		for glyphName in list(self.lazyGlyphs):
+			yield glyphName
+
+	def __len__(self):
+		return len(self.glyphs) + len(self.lazyGlyphs)
+
+
 glyphHeaderFormat = """
 		>	# big endian
 		numberOfContours:	h
@@ -297,6 +584,176 @@ SCALED_COMPONENT_OFFSET		= 0x0800  # composite designed to have the component of
 UNSCALED_COMPONENT_OFFSET	= 0x1000  # composite designed not to have the component offset scaled (designed for MS)
 
 
+def decompileFlagRuns(data, i, nCoordinates):
+	"""Decompile the flags of a simple glyph with 'nCoordinates' points,
+	starting at offset 'i' of 'data'. Return a list of (flag, count) runs
+	of repeated flags, and the offset of the x coordinates.
+	"""
+	runs = []
+	j = 0
+	while j < nCoordinates:
+		flag = byteord(data[i])
+		i = i + 1
+		repeat = 1
+		if flag & flagRepeat:
+			repeat = byteord(data[i]) + 1
+			i = i + 1
+		runs.append((flag, repeat))
+		j = j + repeat
+	assert j == nCoordinates, "bad glyph flags"
+	return runs, i
+
+
+def decompileDeltas(data, i, runs, shortFlag, sameFlag):
+	"""Decompile the coordinate deltas along one axis, starting at offset 'i'
+	of 'data', given the flag runs returned by decompileFlagRuns(). The axis
+	is selected by its 'short' and 'same' flag bits. Return the list of
+	deltas, and the offset of the end of the coordinates.
+	"""
+	formats = []
+	for flag, repeat in runs:
+		if flag & shortFlag:
+			formats.append("%dB" % repeat)
+		elif not flag & sameFlag:
+			formats.append("%dh" % repeat)
+	format = ">" + "".join(formats)
+	values = struct.unpack_from(format, data, i)
+	i = i + struct.calcsize(format)
+
+	deltas = []
+	k = 0
+	for flag, repeat in runs:
+		if flag & shortFlag:
+			if flag & sameFlag:
+				deltas.extend(values[k:k+repeat])
+			else:
+				deltas.extend([-v for v in values[k:k+repeat]])
+			k = k + repeat
+		elif flag & sameFlag:
+			deltas.extend([0] * repeat)
+		else:
+			deltas.extend(values[k:k+repeat])
+			k = k + repeat
+	return deltas, i
+
+
+def _decompileSimpleGlyphHeader(data):
+	"""Return the number of points of the simple glyph 'data', and the
+	offset of its flags.
+	"""
+	numberOfContours, = struct.unpack(">h", data[:2])
+	if numberOfContours == 0:
+		return 0, 10
+	i = 10 + 2 * numberOfContours
+	lastPoint, instructionLength = struct.unpack(">hh", data[i-2:i+2])
+	return lastPoint + 1, i + 2 + instructionLength
+
+
+def _decodeCoordinates(data):
+	"""Return an array of the interleaved absolute coordinates of the simple
+	glyph 'data'.
+	"""
+	if not data:
+		return array.array("h")
+	nCoordinates, i = _decompileSimpleGlyphHeader(data)
+	runs, i = decompileFlagRuns(data, i, nCoordinates)
+	xDeltas, i = decompileDeltas(data, i, runs, flagXShort, flagXsame)
+	yDeltas, i = decompileDeltas(data, i, runs, flagYShort, flagYsame)
+	return GlyphCoordinates.fromDeltas(xDeltas, yDeltas)._a
+
+
+def _decodeCoordinatesNumpy(numpy, glyphData):
+	"""Like _decodeCoordinates, for a list of glyph data at once. Only the
+	flags are parsed for each glyph; the coordinates of all the glyphs are
+	decoded together with NumPy.
+	"""
+	runFlags = []
+	runCounts = []
+	counts = []
+	xStarts = []
+	ends = []
+	offset = 0
+	for data in glyphData:
+		if data:
+			nCoordinates, i = _decompileSimpleGlyphHeader(data)
+			runs, i = decompileFlagRuns(data, i, nCoordinates)
+			for flag, repeat in runs:
+				runFlags.append(flag)
+				runCounts.append(repeat)
+		else:
+			nCoordinates = i = 0
+		counts.append(nCoordinates)
+		xStarts.append(offset + i)
+		offset += len(data)
+		ends.append(offset)
+
+	buf = numpy.frombuffer(b"".join(tobytes(data) for data in glyphData), dtype=numpy.uint8)
+	flags = numpy.repeat(numpy.array(runFlags, dtype=numpy.uint8), runCounts)
+	counts = numpy.array(counts, dtype=numpy.intp)
+	numPoints = len(flags)
+	# index of the first point of each glyph, and of the glyph of each point
+	pointStarts = numpy.cumsum(counts) - counts
+	glyphIndices = numpy.repeat(numpy.arange(len(counts)), counts)
+
+	def decodeDeltas(dataStarts, shortFlag, sameFlag):
+		short = (flags & shortFlag) != 0
+		same = (flags & sameFlag) != 0
+		sizes = numpy.where(short, 1, numpy.where(same, 0, 2))
+		cumSizes = numpy.cumsum(sizes)
+		# data offset of each point: start of the glyph's data + size of
+		# the glyph's previous points
+		before = cumSizes - sizes
+		glyphBefore = numpy.append(before, cumSizes[-1:])[numpy.minimum(pointStarts, numPoints)]
+		positions = before - glyphBefore[glyphIndices] + dataStarts[glyphIndices]
+		lastIndex = max(len(buf) - 1, 0)
+		hi = buf[numpy.minimum(positions, lastIndex)].astype(numpy.int32)
+		lo = buf[numpy.minimum(positions + 1, lastIndex)].astype(numpy.int32)
+		longValues = ((hi << 8) | lo) - ((hi & 0x80) << 9)
+		deltas = numpy.where(short, numpy.where(same, hi, -hi),
+				numpy.where(same, 0, longValues))
+		glyphSizes = numpy.append(cumSizes, 0)[numpy.minimum(pointStarts + counts - 1, numPoints)] - glyphBefore
+		glyphSizes[counts == 0] = 0
+		return deltas, dataStarts + glyphSizes
+
+	def toAbsolute(deltas):
+		absolute = numpy.cumsum(deltas)
+		previous = numpy.append(absolute - deltas, 0)[numpy.minimum(pointStarts, numPoints)]
+		absolute -= previous[glyphIndices]
+		if numPoints and (absolute.min() < -0x8000 or absolute.max() > 0x7FFF):
+			raise OverflowError("coordinate out of range")
+		return absolute
+
+	if numPoints:
+		xStarts = numpy.array(xStarts, dtype=numpy.intp)
+		xDeltas, yStarts = decodeDeltas(xStarts, flagXShort, flagXsame)
+		yDeltas, yEnds = decodeDeltas(yStarts, flagYShort, flagYsame)
+		if (yEnds > numpy.array(ends)).any():
+			raise struct.error("not enough glyph data")
+		interleaved = numpy.empty(2 * numPoints, dtype=numpy.int16)
+		interleaved[0::2] = toAbsolute(xDeltas)
+		interleaved[1::2] = toAbsolute(yDeltas)
+		allCoordinates = array.array("h", interleaved.tobytes())
+	else:
+		allCoordinates = array.array("h")
+	result = []
+	for start, count in zip(pointStarts.tolist(), counts.tolist()):
+		result.append(allCoordinates[2*start:2*(start+count)])
+	return result
+
+
+_onCurveFlagBytes = {0: b"\0", flagOnCurve: b"\1"}
+
+try:
+	from itertools import accumulate as _accumulate
+except ImportError:
+	# Python 2
+	def _accumulate(iterable):
+		total = 0
+		for value in iterable:
+			total = total + value
+			yield total
+
+
 class Glyph(object):
 
 	def __init__(self, data=""):
@@ -476,45 +933,15 @@ class Glyph(object):
 		self.program.fromBytecode(data[:instructionLength])
 		data = data[instructionLength:]
 		nCoordinates = self.endPtsOfContours[-1] + 1
-		flags, xCoordinates, yCoordinates = \
-				self.decompileCoordinatesRaw(nCoordinates, data)
-
-		# fill in repetitions and apply signs
-		self.coordinates = coordinates = GlyphCoordinates.zeros(nCoordinates)
-		xIndex = 0
-		yIndex = 0
-		for i in range(nCoordinates):
-			flag = flags[i]
-			# x coordinate
-			if flag & flagXShort:
-				if flag & flagXsame:
-					x = xCoordinates[xIndex]
-				else:
-					x = -xCoordinates[xIndex]
-				xIndex = xIndex + 1
-			elif flag & flagXsame:
-				x = 0
-			else:
-				x = xCoordinates[xIndex]
-				xIndex = xIndex + 1
-			# y coordinate
-			if flag & flagYShort:
-				if flag & flagYsame:
-					y = yCoordinates[yIndex]
-				else:
-					y = -yCoordinates[yIndex]
-				yIndex = yIndex + 1
-			elif flag & flagYsame:
-				y = 0
-			else:
-				y = yCoordinates[yIndex]
-				yIndex = yIndex + 1
-			coordinates[i] = (x, y)
-		assert xIndex == len(xCoordinates)
-		assert yIndex == len(yCoordinates)
-		coordinates.relativeToAbsolute()
+		runs, i = decompileFlagRuns(data, 0, nCoordinates)
+		xDeltas, i = decompileDeltas(data, i, runs, flagXShort, flagXsame)
+		yDeltas, i = decompileDeltas(data, i, runs, flagYShort, flagYsame)
+		if len(data) - i >= 4:
+			log.warning("too much glyph data: %d excess bytes", len(data) - i)
+		self.coordinates = GlyphCoordinates.fromDeltas(xDeltas, yDeltas)
 		# discard all flags but for "flagOnCurve"
-		self.flags = array.array("B", (f & flagOnCurve for f in flags))
+		self.flags = array.array("B", b"".join(
+				_onCurveFlagBytes[flag & flagOnCurve] * repeat for flag, repeat in runs))
 
 	def decompileCoordinatesRaw(self, nCoordinates, data):
 		# unpack flags and prepare unpacking of coordinates
@@ -783,8 +1210,7 @@ class Glyph(object):
 			allFlags = array.array("B")
 			allEndPts = []
 			for compo in self.components:
-				g = glyfTable[compo.glyphName]
-				coordinates, endPts, flags = g.getCoordinates(glyfTable)
+				coordinates, endPts, flags = glyfTable.getFlattenedCoordinates(compo.glyphName)
 				if hasattr(compo, "firstPt"):
 					# move according to two reference points
 					x1,y1 = allCoords[compo.firstPt]
@@ -1154,6 +1580,35 @@ class GlyphComponent(object):
 		result = self.__eq__(other)
 		return result if result is NotImplemented else not result
 
+def countGlyphPoints(glyphData):
+	"""Return the number of points of a simple glyph, or the number of
+	components of a composite glyph, from its compiled data.
+	"""
+	if len(glyphData) < 10:
+		return 0
+	numberOfContours, = struct.unpack(">h", glyphData[:2])
+	if numberOfContours > 0:
+		i = 8 + 2 * numberOfContours
+		return struct.unpack(">H", glyphData[i:i+2])[0] + 1
+	if numberOfContours == 0:
+		return 0
+	numComponents = 0
+	i = 10
+	more = True
+	while more:
+		flags, = struct.unpack(">H", glyphData[i:i+2])
+		numComponents += 1
+		i += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+		if flags & WE_HAVE_A_SCALE:
+			i += 2
+		elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+			i += 4
+		elif flags & WE_HAVE_A_TWO_BY_TWO:
+			i += 8
+		more = flags & MORE_COMPONENTS
+	return numComponents
+
+
 class GlyphCoordinates(object):
 
 	def __init__(self, iterable=[], typecode="h"):
@@ -1182,6 +1637,63 @@ class GlyphCoordinates(object):
 	def zeros(count):
 		return GlyphCoordinates([(0,0)] * count)
 
+	@staticmethod
+	def fromDeltas(xDeltas, yDeltas):
+		"""Return the GlyphCoordinates with the absolute coordinates of the
+		points given by two lists of relative x and y coordinates.
+		"""
+		a = array.array("h", [0]) * (2 * len(xDeltas))
+		a[0::2] = array.array("h", _accumulate(xDeltas))
+		a[1::2] = array.array("h", _accumulate(yDeltas))
+		c = GlyphCoordinates()
+		c._a = a
+		return c
+
+	@staticmethod
+	def splitFlat(values, offsets):
+		"""Return the list of the GlyphCoordinates of many glyphs, given by
+		a flat list or NumPy array 'values' of the x and y values of all
+		their points, the points of the i-th glyph being the ones from
+		offsets[i] to offsets[i+1].  Each glyph's coordinates are stored as
+		integers if they are all integral.
+		"""
+		result = []
+		if isinstance(values, list):
+			ints = [int(v) for v in values]
+			for start,end in zip(offsets, offsets[1:]):
+				start, end = 2 * start, 2 * end
+				c = GlyphCoordinates()
+				if ints[start:end] == values[start:end]:
+					c._a = array.array("h", ints[start:end])
+				else:
+					c._a = array.array("f", values[start:end])
+				result.append(c)
+			return result
+		if len(offsets) < 2:
+			return result
+		import numpy
+		ints = values.astype("h")
+		# the sentinel makes the glyphs with no points at the end integral
+		same = numpy.append(ints == values, True)
+		starts = 2 * numpy.array(offsets[:-1], dtype=numpy.intp)
+		ends = 2 * numpy.array(offsets[1:], dtype=numpy.intp)
+		integral = numpy.logical_and.reduceat(same, starts) | (starts == ends)
+		intData = ints.tobytes()
+		floatData = values.astype("f").tobytes()
+		for start,end,isIntegral in zip(offsets, offsets[1:], integral.tolist()):
+			c = GlyphCoordinates()
+			if isIntegral:
+				c._a = array.array("h", intData[4*start:4*end])
+			else:
+				c._a = array.array("f", floatData[8*start:8*end])
+			result.append(c)
+		return result
+
+	@property
+	def array(self):
+		"""The flat array of the x and y values of the points."""
+		return self._a
+
 	def copy(self):
 		c = GlyphCoordinates(typecode=self._a.typecode)
 		c._a.extend(self._a)
@@ -1220,6 +1732,14 @@ class GlyphCoordinates(object):
 		self._a.extend(tuple(p))
 
 	def extend(self, iterable):
+		if isinstance(iterable, GlyphCoordinates):
+			if iterable.isFloat():
+				self._ensureFloat()
+			if self._a.typecode == iterable._a.typecode:
+				self._a.extend(iterable._a)
+			else:
+				self._a.fromlist(iterable._a.tolist())
+			return
 		for p in iterable:
 			p = self._checkFloat(p)
 			self._a.extend(p)
@@ -0,0 +1,271 @@
+from __future__ import print_function, division, absolute_import, unicode_literals
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import (
+	Glyph, GlyphComponent, GlyphCoordinates, LazyGlyphDict, table__g_l_y_f,
+	countGlyphPoints,
+	_decodeCoordinates, _decodeCoordinatesNumpy, ARGS_ARE_XY_VALUES,
+	WE_HAVE_AN_X_AND_Y_SCALE)
+from fontTools.ttLib.tables import ttProgram
+import array
+import unittest
+import os
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+CURR_DIR = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+DATA_DIR = os.path.join(os.path.dirname(CURR_DIR), 'testdata')
+TTX = os.path.join(DATA_DIR, 'TestTTF-Regular.ttx')
+
+
+class LazyGlyfTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		buf = BytesIO()
+		font.save(buf)
+		cls.fontData = buf.getvalue()
+
+	def loadFont(self, lazy):
+		return TTFont(BytesIO(self.fontData), lazy=lazy, recalcTimestamp=False)
+
+	def test_decompile_lazy(self):
+		font = self.loadFont(True)
+		glyf = font['glyf']
+		self.assertIsInstance(glyf.glyphs, LazyGlyphDict)
+		self.assertEqual(len(glyf), len(font.getGlyphOrder()))
+		self.assertEqual(set(glyf.keys()), set(font.getGlyphOrder()))
+		self.assertEqual(glyf.glyphs.glyphs, {})
+		self.assertTrue('period' in glyf)
+		self.assertFalse('xyz' in glyf)
+		glyph = glyf['period']
+		self.assertEqual(list(glyf.glyphs.glyphs), ['period'])
+		self.assertIs(glyf['period'], glyph)
+		eager = self.loadFont(None)['glyf']['period']
+		self.assertEqual(glyph.getCoordinates(glyf)[0], eager.getCoordinates(glyf)[0])
+
+	def test_setitem_delitem(self):
+		font = self.loadFont(True)
+		glyf = font['glyf']
+		glyph = Glyph()
+		glyf['period'] = glyph
+		self.assertIs(glyf['period'], glyph)
+		self.assertIsNone(glyf.glyphs.getGlyphData('period'))
+		numGlyphs = len(glyf)
+		del glyf['space']
+		self.assertEqual(len(glyf), numGlyphs - 1)
+		self.assertFalse('space' in glyf)
+		self.assertRaises(KeyError, glyf.__getitem__, 'space')
+
+	def test_compile(self):
+		for recalcBBoxes in (False, True):
+			expected = self.loadFont(None)
+			expected.recalcBBoxes = recalcBBoxes
+			expected['glyf']
+			expectedData = BytesIO()
+			expected.save(expectedData)
+			font = self.loadFont(True)
+			font.recalcBBoxes = recalcBBoxes
+			font['glyf']['period']
+			data = BytesIO()
+			font.save(data)
+			self.assertEqual(data.getvalue(), expectedData.getvalue())
+
+	def test_compile_recalcBBoxes(self):
+		# glyph data with a wrong bounding box and padding is recompiled
+		font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		font['glyf']['.notdef'].xMax += 100
+		font['glyf'].padding = 4
+		buf = BytesIO()
+		font.save(buf)
+		fontData = buf.getvalue()
+		for recalcBBoxes in (False, True):
+			results = []
+			for lazy in (None, True):
+				font = TTFont(BytesIO(fontData), lazy=lazy, recalcTimestamp=False,
+						recalcBBoxes=recalcBBoxes)
+				font['glyf']['period']
+				data = BytesIO()
+				font.save(data)
+				results.append(data.getvalue())
+			self.assertEqual(results[1], results[0])
+		self.assertNotEqual(results[0], fontData)
+
+
+def makeGlyph(points, endPts):
+	glyph = Glyph()
+	glyph.numberOfContours = len(endPts)
+	glyph.endPtsOfContours = endPts
+	glyph.coordinates = GlyphCoordinates(points)
+	glyph.flags = array.array("B", [i % 3 == 0 for i in range(len(points))])
+	glyph.program = ttProgram.Program()
+	glyph.program.fromBytecode(b"")
+	glyph.recalcBounds(None)
+	return glyph
+
+
+# exercises short/long, positive/negative and repeated deltas
+POINTS = [(0, 0), (0, 0), (0, 0), (10, -10), (300, 5), (300, -1000),
+		(-16000, 16000), (-16000, 16000), (16000, -16000), (5, 5), (4, 4), (3, 3)]
+
+
+class GlyphCoordinatesDecodeTest(unittest.TestCase):
+
+	def test_decompileCoordinates(self):
+		data = makeGlyph(POINTS, [5, 11]).compile(None)
+		glyph = Glyph(data)
+		glyph.expand(None)
+		self.assertEqual(list(glyph.coordinates), POINTS)
+		self.assertEqual(glyph.endPtsOfContours, [5, 11])
+		self.assertEqual(list(glyph.flags), [i % 3 == 0 for i in range(len(POINTS))])
+
+	def test_countGlyphPoints(self):
+		self.assertEqual(countGlyphPoints(makeGlyph(POINTS, [5, 11]).compile(None)), 12)
+		self.assertEqual(countGlyphPoints(b""), 0)
+
+	def test_decodeCoordinates(self):
+		glyphData = [
+			makeGlyph(POINTS, [5, 11]).compile(None),
+			b"",
+			makeGlyph(POINTS[:3], [2]).compile(None),
+			makeGlyph(POINTS[3:], [0, 8]).compile(None),
+		]
+		expected = []
+		for data in glyphData:
+			glyph = Glyph(data)
+			glyph.expand(None)
+			expected.append(glyph.getCoordinates(None)[0]._a)
+		self.assertEqual([_decodeCoordinates(data) for data in glyphData], expected)
+		if numpy is not None:
+			self.assertEqual(_decodeCoordinatesNumpy(numpy, glyphData), expected)
+			self.assertEqual(_decodeCoordinatesNumpy(numpy, [b""]), [array.array("h")])
+
+
+class GetCoordinatesBulkTest(unittest.TestCase):
+
+	def test_getCoordinatesBulk(self):
+		font = TTFont()
+		font.importXML(TTX)
+		glyf = font['glyf']
+		glyphOrder = font.getGlyphOrder()
+		coordinates, offsets = glyf.getCoordinatesBulk()
+		self.assertEqual(len(offsets), len(glyphOrder) + 1)
+		for i, glyphName in enumerate(glyphOrder):
+			expected = list(glyf[glyphName].getCoordinates(glyf)[0])
+			self.assertEqual(coordinates[offsets[i]:offsets[i+1]], expected)
+
+		coordinates, offsets = glyf.getCoordinatesBulk(['period', 'space'])
+		self.assertEqual(offsets[2], offsets[1])
+		self.assertEqual(coordinates[0:offsets[1]],
+				list(glyf['period'].getCoordinates(glyf)[0]))
+
+	def test_getCoordinatesBulk_lazy(self):
+		font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		buf = BytesIO()
+		font.save(buf)
+		eager = TTFont(BytesIO(buf.getvalue()))['glyf']
+		glyf = TTFont(BytesIO(buf.getvalue()), lazy=True)['glyf']
+		self.assertTrue(glyf['ellipsis'].isComposite())
+		glyf = TTFont(BytesIO(buf.getvalue()), lazy=True)['glyf']
+		# none of the glyphs is loaded yet, including the composite ones
+		self.assertEqual(glyf.getCoordinatesBulk(), eager.getCoordinatesBulk())
+
+
+class GlyphCoordinatesSplitFlatTest(unittest.TestCase):
+
+	def check_splitFlat(self, values):
+		offsets = [0, 2, 2, 3, 3]
+		result = GlyphCoordinates.splitFlat(values, offsets)
+		self.assertEqual([list(c) for c in result],
+				[[(1, 2), (3, -4)], [], [(0.5, 6)], []])
+		self.assertEqual([c.isFloat() for c in result], [False, False, True, False])
+		# no glyphs
+		self.assertEqual(GlyphCoordinates.splitFlat(values[:0], [0]), [])
+		self.assertEqual(GlyphCoordinates.splitFlat(values[:0], []), [])
+
+	def test_splitFlat(self):
+		self.check_splitFlat([1.0, 2.0, 3, -4, 0.5, 6.0])
+
+	@unittest.skipIf(numpy is None, "numpy not installed")
+	def test_splitFlat_numpy(self):
+		self.check_splitFlat(numpy.array([1.0, 2.0, 3, -4, 0.5, 6.0]))
+
+
+def makeComposite(*components):
+	glyph = Glyph()
+	glyph.numberOfContours = -1
+	glyph.components = []
+	for glyphName, x, y in components:
+		compo = GlyphComponent()
+		compo.glyphName = glyphName
+		compo.x, compo.y = x, y
+		compo.flags = ARGS_ARE_XY_VALUES
+		glyph.components.append(compo)
+	return glyph
+
+
+class CoordinatesCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		glyf = self.glyf = table__g_l_y_f()
+		glyf.glyphOrder = []
+		glyf.glyphs = {}
+		glyf['a'] = makeGlyph([(0, 0), (10, 0), (10, 10)], [2])
+		glyf['b'] = makeComposite(('a', 5, 5))
+		glyf['c'] = makeComposite(('b', 100, 0), ('a', 0, 0))
+
+	def getPoints(self, glyphName):
+		glyf = self.glyf
+		return list(glyf[glyphName].getCoordinates(glyf)[0])
+
+	def test_cached(self):
+		glyf = self.glyf
+		self.assertEqual(self.getPoints('c'),
+				[(105, 5), (115, 5), (115, 15), (0, 0), (10, 0), (10, 10)])
+		cache = glyf.coordinatesCache
+		self.assertEqual(sorted(cache.entries), ['b'])
+		self.assertEqual((cache.hits, cache.misses), (0, 1))
+		glyf.getFlattenedCoordinates('c')
+		self.getPoints('c')
+		self.assertEqual((cache.hits, cache.misses), (2, 2))
+		self.assertEqual(sorted(cache.entries), ['b', 'c'])
+		# the cached coordinates are not modified by the callers
+		self.assertEqual(self.getPoints('b'), [(5, 5), (15, 5), (15, 15)])
+
+	def test_replaced_glyph(self):
+		glyf = self.glyf
+		self.getPoints('c')
+		glyf['a'] = makeGlyph([(1, 1), (2, 2)], [1])
+		self.assertEqual(sorted(glyf.coordinatesCache.entries), [])
+		self.assertEqual(self.getPoints('c'), [(106, 6), (107, 7), (1, 1), (2, 2)])
+
+	def test_modified_glyph(self):
+		glyf = self.glyf
+		self.getPoints('c')
+		glyf['b'].components[0].x = 0
+		glyf.glyphs['a'] = makeGlyph([(1, 1), (2, 2)], [1])
+		self.assertEqual(self.getPoints('c'), [(101, 6), (102, 7), (1, 1), (2, 2)])
+		self.assertEqual(glyf.coordinatesCache.invalidations, 1)
+
+	def test_getNumPoints(self):
+		glyf = self.glyf
+		glyf['c'].components[1].transform = [[0.5, 0], [0, 1.5]]
+		glyf['c'].components[1].flags |= WE_HAVE_AN_X_AND_Y_SCALE
+		for glyphName in ('a', 'b', 'c'):
+			glyf.glyphs[glyphName] = Glyph(glyf[glyphName].compile(glyf))
+		self.assertEqual([glyf.getNumPoints(n) for n in 'abc'], [3, 1, 2])
+		self.assertTrue(hasattr(glyf.glyphs['c'], 'data'))
+		self.assertEqual(glyf['c'].components[1].transform, [[0.5, 0], [0, 1.5]])
+		self.assertEqual(glyf.getNumPoints('c'), 2)
+
+
+if __name__ == "__main__":
+	unittest.main()
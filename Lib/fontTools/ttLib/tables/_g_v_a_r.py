@@ -6,6 +6,7 @@ from fontTools.misc.fixedTools import fixedToFloat, floatToFixed
 from fontTools.misc.textTools import safeEval
 from fontTools.ttLib import TTLibError
 from . import DefaultTable
+from ._g_l_y_f import LazyGlyphDict
 import array
 import io
 import sys
@@ -51,6 +52,8 @@ DELTA_RUN_COUNT_MASK = 0x3f
 POINTS_ARE_WORDS = 0x80
 POINT_RUN_COUNT_MASK = 0x7f
 
+NUM_PHANTOM_POINTS = 4
+
 
 class table__g_v_a_r(DefaultTable.DefaultTable):
 
@@ -59,7 +62,18 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 	def compile(self, ttFont):
 		axisTags = [axis.axisTag for axis in ttFont["fvar"].axes]
 
-		sharedCoords = self.compileSharedCoords_(axisTags)
+		variations = self.variations
+		if isinstance(variations, LazyVariationsDict) and variations.lazyGlyphs:
+			if len(axisTags) == self.axisCount:
+				# the data of the glyphs which were never accessed is copied as it
+				# is, so the shared coordinates it refers to must keep their indices
+				sharedCoords = self.compileSharedCoords_(axisTags,
+						variations.glyphs.values(), variations.sharedCoords)
+			else:
+				self.variations = dict(variations.items())
+				sharedCoords = self.compileSharedCoords_(axisTags)
+		else:
+			sharedCoords = self.compileSharedCoords_(axisTags)
 		sharedCoordIndices = {coord:i for i, coord in enumerate(sharedCoords)}
 		sharedCoordSize = sum([len(c) for c in sharedCoords])
 
@@ -88,24 +102,41 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 		result.extend(compiledGlyphs)
 		return bytesjoin(result)
 
-	def compileSharedCoords_(self, axisTags):
+	def compileSharedCoords_(self, axisTags, glyphVariations=None, sharedCoords=()):
+		"""Return the compiled coordinates which are used by more than one
+		of 'glyphVariations' (by default, all the variations in the table),
+		appended to the given 'sharedCoords'.
+		"""
+		if glyphVariations is None:
+			glyphVariations = self.variations.values()
 		coordCount = {}
-		for variations in self.variations.values():
+		for variations in glyphVariations:
 			for gvar in variations:
 				coord = gvar.compileCoord(axisTags)
 				coordCount[coord] = coordCount.get(coord, 0) + 1
-		sharedCoords = [(count, coord) for (coord, count) in coordCount.items() if count > 1]
-		sharedCoords.sort(reverse=True)
+		sharedCoords = list(sharedCoords)
+		knownCoords = set(sharedCoords)
+		newCoords = [(count, coord) for (coord, count) in coordCount.items()
+				if count > 1 and coord not in knownCoords]
+		newCoords.sort(reverse=True)
 		MAX_NUM_SHARED_COORDS = TUPLE_INDEX_MASK + 1
-		sharedCoords = sharedCoords[:MAX_NUM_SHARED_COORDS]
-		return [c[1] for c in sharedCoords]  # Strip off counts.
+		newCoords = newCoords[:MAX_NUM_SHARED_COORDS - len(sharedCoords)]
+		return sharedCoords + [c[1] for c in newCoords]  # Strip off counts.
 
 	def compileGlyphs_(self, ttFont, axisTags, sharedCoordIndices):
 		result = []
+		glyf = ttFont["glyf"]
+		variations = self.variations
+		isLazy = isinstance(variations, LazyVariationsDict)
 		for glyphName in ttFont.getGlyphOrder():
-			glyph = ttFont["glyf"][glyphName]
-			numPointsInGlyph = self.getNumPoints_(glyph)
-			result.append(self.compileGlyph_(glyphName, numPointsInGlyph, axisTags, sharedCoordIndices))
+			# the glyphs which were never accessed are copied as they are
+			gvarData = variations.getGlyphData(glyphName) if isLazy else None
+			if gvarData is None:
+				numPointsInGlyph = glyf.getNumPoints(glyphName) + NUM_PHANTOM_POINTS
+				gvarData = self.compileGlyph_(glyphName, numPointsInGlyph, axisTags, sharedCoordIndices)
+			elif len(gvarData) % 2 != 0:
+				gvarData = tobytes(gvarData) + b"\0"  # padding
+			result.append(gvarData)
 		return result
 
 	def compileGlyph_(self, glyphName, numPointsInGlyph, axisTags, sharedCoordIndices):
@@ -179,15 +210,18 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 		assert len(glyphs) == self.glyphCount
 		assert len(axisTags) == self.axisCount
 		offsets = self.decompileOffsets_(data[GVAR_HEADER_SIZE:], tableFormat=(self.flags & 1), glyphCount=self.glyphCount)
+		offsets = [self.offsetToData + offset for offset in offsets]
 		sharedCoords = self.decompileSharedCoords_(axisTags, data)
-		self.variations = {}
-		for i in range(self.glyphCount):
-			glyphName = glyphs[i]
-			glyph = ttFont["glyf"][glyphName]
-			numPointsInGlyph = self.getNumPoints_(glyph)
-			gvarData = data[self.offsetToData + offsets[i] : self.offsetToData + offsets[i + 1]]
-			self.variations[glyphName] = \
-				self.decompileGlyph_(numPointsInGlyph, sharedCoords, axisTags, gvarData)
+		coordSize = 2 * self.axisCount
+		sharedCoordsData = [data[pos : pos + coordSize] for pos in
+				range(self.offsetToCoord, self.offsetToCoord + coordSize * self.sharedCoordCount, coordSize)]
+		glyf = ttFont["glyf"]
+
+		def decompileGlyph(glyphName, gvarData):
+			numPointsInGlyph = glyf.getNumPoints(glyphName) + NUM_PHANTOM_POINTS
+			return self.decompileGlyph_(numPointsInGlyph, sharedCoords, axisTags, gvarData)
+
+		self.variations = LazyVariationsDict(data, offsets, glyphs, sharedCoordsData, decompileGlyph)
 
 	def decompileSharedCoords_(self, axisTags, data):
 		result, _pos = GlyphVariation.decompileCoords_(axisTags, self.sharedCoordCount, data, self.offsetToCoord)
@@ -345,7 +379,6 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 
 	@staticmethod
 	def getNumPoints_(glyph):
-		NUM_PHANTOM_POINTS = 4
 		if glyph.isComposite():
 			return len(glyph.components) + NUM_PHANTOM_POINTS
 		else:
@@ -353,6 +386,20 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 			return len(getattr(glyph, "coordinates", [])) + NUM_PHANTOM_POINTS
 
 
+class LazyVariationsDict(LazyGlyphDict):
+
+	"""Mapping of glyph names to lists of GlyphVariation objects, used by the
+	'gvar' table. The variations of a glyph are only decompiled when they are
+	first accessed.
+	"""
+
+	def __init__(self, data, offsets, glyphNames, sharedCoords, decompileGlyph):
+		LazyGlyphDict.__init__(self, data, offsets, glyphNames)
+		# the compiled shared coordinates the glyph data refers to
+		self.sharedCoords = sharedCoords
+		self.decompileGlyph = decompileGlyph
+
+
 class GlyphVariation(object):
 	def __init__(self, axes, coordinates):
 		self.axes = axes
@@ -3,11 +3,17 @@ from fontTools.misc.py23 import *
 from fontTools.misc.testTools import parseXML
 from fontTools.misc.textTools import deHexStr, hexStr
 from fontTools.misc.xmlWriter import XMLWriter
-from fontTools.ttLib import TTLibError
-from fontTools.ttLib.tables._g_v_a_r import table__g_v_a_r, GlyphVariation
+from fontTools.ttLib import TTFont, TTLibError
+from fontTools.ttLib.tables._g_v_a_r import (
+	table__g_v_a_r, GlyphVariation, LazyVariationsDict)
+import os
 import random
 import unittest
 
+CURR_DIR = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+TTX = os.path.join(os.path.dirname(os.path.dirname(CURR_DIR)),
+		'subset', 'testdata', 'TestGVAR.ttx')
+
 def hexencode(s):
 	h = hexStr(s).upper()
 	return ' '.join([h[i:i+2] for i in range(0, len(h), 2)])
@@ -539,5 +545,50 @@ class GlyphVariationTest(unittest.TestCase):
 		return [line.strip() for line in content.splitlines()][1:]
 
 
+class LazyGlyphVariationsTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+		font.importXML(TTX)
+		buf = BytesIO()
+		font.save(buf)
+		cls.fontData = buf.getvalue()
+
+	def loadFont(self):
+		return TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+
+	def test_decompile_lazy(self):
+		font = self.loadFont()
+		variations = font['gvar'].variations
+		self.assertIsInstance(variations, LazyVariationsDict)
+		self.assertEqual(set(variations.keys()), set(font.getGlyphOrder()))
+		self.assertEqual(variations.glyphs, {})
+		self.assertEqual(len(variations['zero']), 2)
+		self.assertEqual(list(variations.glyphs), ['zero'])
+		# the glyph was not expanded to count its points
+		self.assertTrue(hasattr(font['glyf'].glyphs['zero'], 'data'))
+
+	def test_compile(self):
+		font = self.loadFont()
+		font['gvar']
+		buf = BytesIO()
+		font.save(buf)
+		self.assertEqual(buf.getvalue(), self.fontData)
+
+		font = self.loadFont()
+		font['gvar'].variations['zero'][0].coordinates[0] = (1000, 1000)
+		del font['gvar'].variations['plus'][1]
+		buf = BytesIO()
+		font.save(buf)
+		buf.seek(0)
+		variations = TTFont(buf)['gvar'].variations
+		expected = self.loadFont()['gvar'].variations
+		self.assertEqual(variations['zero'][0].coordinates[0], (1000, 1000))
+		self.assertEqual(variations['zero'][1], expected['zero'][1])
+		self.assertEqual(variations['plus'], expected['plus'][:1])
+		self.assertEqual(variations['minus'], expected['minus'])
+
+
 if __name__ == "__main__":
 	unittest.main()
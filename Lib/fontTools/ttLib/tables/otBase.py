@@ -4,6 +4,7 @@ from .DefaultTable import DefaultTable
 import sys
 import array
 import struct
+import time
 import logging
 
 log = logging.getLogger(__name__)
@@ -34,6 +35,8 @@ class BaseTTXConverter(DefaultTable):
 	we use for OpenType tables, which is necessarily subtly different.
 	"""
 
+	zeroCopy = True
+
 	def decompile(self, data, font):
 		from . import otTables
 		cachingStats = None if True else {}
@@ -69,46 +72,137 @@ class BaseTTXConverter(DefaultTable):
 						This creates a tree of writers, rooted at the GUSB/GPOS writer, with
 						each writer representing a table, and the writer.items list containing
 						the child data strings and writers.
-			call the getAllData method
+			call the layOutTables method
 				call _doneWriting, which removes duplicates
 				call _gatherTables. This traverses the tables, adding unique occurences to a flat list of tables
 				Traverse the flat list of tables, calling getDataLength on each to update their position
-				Traverse the flat list of tables again, calling getData each get the data in the table, now that
-				pos's and offset are known.
+			call getOverflowErrorRecords, which checks every offset now that pos's are known.
+			If there are none, traverse the flat list of tables, calling getData to get the data in each table.
 
-				If a lookup subtable overflows an offset, we have to start all over.
+			If some offsets overflow, all of them are fixed at once (see fixOverflows),
+			and the writers of the lookups which were modified are compiled again, while
+			those of the other lookups are reused. This repeats until nothing overflows.
 		"""
 		class GlobalState(object):
 			def __init__(self, tableType):
 				self.tableType = tableType
 		globalState = GlobalState(tableType=self.tableTag)
-		overflowRecord = None
+		passes = 0
 
 		while True:
-			try:
-				writer = OTTableWriter(globalState)
-				self.table.compile(writer, font)
-				return writer.getAllData()
-
-			except OTLOffsetOverflowError as e:
-
-				if overflowRecord == e.value:
-					raise # Oh well...
-
-				overflowRecord = e.value
-				log.info("Attempting to fix OTLOffsetOverflowError %s", e)
-				lastItem = overflowRecord
-
-				ok = 0
-				if overflowRecord.itemName is None:
-					from .otTables import fixLookupOverFlows
-					ok = fixLookupOverFlows(font, overflowRecord)
-				else:
-					from .otTables import fixSubTableOverFlows
-					ok = fixSubTableOverFlows(font, overflowRecord)
-				if not ok:
-					raise
-
+			writer = OTTableWriter(globalState)
+			self.table.compile(writer, font)
+			sharingStats = {} if log.isEnabledFor(logging.DEBUG) else None
+			tables = writer.layOutTables(sharingStats)
+			overflowRecords = writer.getOverflowErrorRecords(tables)
+			if not overflowRecords:
+				break
+			if not passes:
+				startTime = time.time()
+			passes += 1
+			log.info("Attempting to fix %d OTLOffsetOverflowErrors, first: %s",
+					len(overflowRecords), overflowRecords[0])
+			modifiedLookups = self.fixOverflows(font, writer, overflowRecords)
+			if modifiedLookups is None:
+				raise OTLOffsetOverflowError(overflowRecords[0])
+			# the lookups which were not modified keep their (laid out) writers
+			lookupWriters = writer.getLookupWriters()
+			globalState.subWriters = {id(lookup): (lookup, lookupWriter)
+					for i, (lookup, lookupWriter) in enumerate(
+						zip(self.table.LookupList.Lookup, lookupWriters))
+					if i not in modifiedLookups}
+		if passes:
+			del globalState.subWriters
+			log.info("Fixed '%s' offset overflows in %d passes (%.3f s)",
+					self.tableTag, passes, time.time() - startTime)
+		if sharingStats:
+			log.debug("'%s' subtables: %d, shared duplicates: %d, bytes saved: %d",
+					self.tableTag, sharingStats["subtables"],
+					sharingStats["duplicates"], sharingStats["bytesSaved"])
+		return bytesjoin(table.getData() for table in tables)
+
+	def fixOverflows(self, font, writer, overflowRecords):
+		"""Fix all the overflowing offsets found by one layout of the table.
+		Return the set of the indices of the lookups which were modified,
+		or None if an overflow can't be fixed.
+
+		Each overflowing subtable is split or stops sharing its subtables
+		(see fixSubTableOverFlows), at most once per pass. When offsets from
+		the LookupList overflow, the lookups before the overflowing ones are
+		promoted to Extension lookups, as fixLookupOverFlows does one at a
+		time; the current layout tells how many need to be promoted.
+		"""
+		from .otTables import fixLookupOverFlows, fixSubTableOverFlows
+		modifiedLookups = set()
+		subTableRecords = {}
+		promotedLookups = set()
+		overflowingLookups = set()
+		for record in overflowRecords:
+			if record.LookupListIndex is None:
+				return None
+			if record.itemName is not None:
+				key = (record.LookupListIndex, record.SubTableIndex)
+				subTableRecords.setdefault(key, record)
+			elif record.SubTableIndex is not None:
+				promotedLookups.add(record.LookupListIndex)
+			else:
+				overflowingLookups.add(record.LookupListIndex)
+
+		# split the subtables from last to first, so that the indices of the
+		# subtables still to be split don't change
+		for key in sorted(subTableRecords, reverse=True):
+			if not fixSubTableOverFlows(font, subTableRecords[key]):
+				return None
+			modifiedLookups.add(key[0])
+
+		if overflowingLookups:
+			promote = self._getLookupsToPromote(writer, overflowingLookups)
+			if not promote:
+				return None
+			promotedLookups.update(promote)
+		# fixLookupOverFlows promotes an earlier lookup if the given one already
+		# is an Extension lookup
+		wasExtension = self._getExtensionLookups()
+		for lookupIndex in sorted(promotedLookups):
+			record = OverflowErrorRecord((self.tableTag, lookupIndex, 0, None, None))
+			if not fixLookupOverFlows(font, record):
+				return None
+		for i, isExtension in enumerate(self._getExtensionLookups()):
+			if isExtension != wasExtension[i]:
+				modifiedLookups.add(i)
+		return modifiedLookups
+
+	def _getExtensionLookups(self):
+		extType = 7 if self.tableTag == 'GSUB' else 9
+		return [lookup.SubTable[0].__class__.LookupType == extType
+				if lookup.SubTable else True
+				for lookup in self.table.LookupList.Lookup]
+
+	def _getLookupsToPromote(self, writer, overflowingLookups):
+		"""Return the indices of the lookups to promote to Extension lookups,
+		so that the offsets to the lookups after them fit in 16 bits.
+		"""
+		lookups = self.table.LookupList.Lookup
+		lookupWriters = writer.getLookupWriters()
+		isExtension = self._getExtensionLookups()
+		listPos = writer.getLookupListWriter().pos
+		promote = []
+		saved = 0
+		for i in range(min(overflowingLookups), len(lookupWriters)):
+			k = i - 1
+			while lookupWriters[i].pos - listPos - saved > 0xFFFF:
+				while k >= 0 and isExtension[k]:
+					k -= 1
+				if k < 0:
+					break
+				isExtension[k] = True
+				promote.append(k)
+				# the subtables of the lookup move to the end of the table, and
+				# are replaced by Extension subtables of 8 bytes each
+				size = (lookupWriters[k + 1].pos - lookupWriters[k].pos -
+						lookupWriters[k].getDataLength() - 8 * len(lookups[k].SubTable))
+				saved += max(size, 0)
+		return promote
 	def toXML(self, writer, font):
 		self.table.toXML2(writer, font)
 
@@ -158,7 +252,7 @@ class OTTableReader(object):
 	def readUShortArray(self, count):
 		pos = self.pos
 		newpos = pos + count * 2
-		value = array.array("H", self.data[pos:newpos])
+		value = array.array("H", tobytes(self.data[pos:newpos]))
 		if sys.byteorder != "big":
 			value.byteswap()
 		self.pos = newpos
@@ -221,6 +315,26 @@ class OTTableReader(object):
 		self.pos = newpos
 		return value
 
+	def readValues(self, structFormat, count):
+		"""Read 'count' values of a one-character struct format, as a tuple."""
+		pos = self.pos
+		st = struct.Struct(">%d%s" % (count, structFormat))
+		newpos = pos + st.size
+		value = st.unpack(self.data[pos:newpos])
+		self.pos = newpos
+		return value
+
+	def readStructArray(self, st, count):
+		"""Read 'count' records with a struct.Struct, as a sequence of tuples."""
+		pos = self.pos
+		newpos = pos + count * st.size
+		data = self.data[pos:newpos]
+		self.pos = newpos
+		if hasattr(st, "iter_unpack"):
+			return st.iter_unpack(data)
+		size = st.size
+		return [st.unpack_from(data, i) for i in range(0, len(data), size)]
+
 	def __setitem__(self, name, value):
 		state = self.localState.copy() if self.localState else dict()
 		state[name] = value
@@ -290,20 +404,29 @@ class OTTableWriter(object):
 
 		return bytesjoin(items)
 
+	# hash of the items, set by _doneWriting()
+	_hash = None
+
 	def __hash__(self):
 		# only works after self._doneWriting() has been called
-		return hash(self.items)
+		if self._hash is None:
+			self._hash = hash(self.items)
+		return self._hash
 
 	def __ne__(self, other):
 		result = self.__eq__(other)
 		return result if result is NotImplemented else not result
 
 	def __eq__(self, other):
+		if self is other:
+			return True
 		if type(self) != type(other):
 			return NotImplemented
+		if self._hash is not None and other._hash is not None and self._hash != other._hash:
+			return False
 		return self.items == other.items
 
-	def _doneWriting(self, internedTables):
+	def _doneWriting(self, internedTables, stats=None):
 		# Convert CountData references to data string items
 		# collapse duplicate table references to a unique entry
 		# "tables" are OTTableWriter objects.
@@ -322,16 +445,30 @@ class OTTableWriter(object):
 		if isExtension:
 			internedTables = {}
 
-		items = self.items
+		# the items are a tuple if the writer was reused from a previous layout
+		items = list(self.items)
 		for i in range(len(items)):
 			item = items[i]
+			if isinstance(item, bytes):
+				continue
 			if hasattr(item, "getCountData"):
 				items[i] = item.getCountData()
 			elif hasattr(item, "getData"):
-				item._doneWriting(internedTables)
+				item._doneWriting(internedTables, stats)
 				if not dontShare:
-					items[i] = item = internedTables.setdefault(item, item)
+					internedItem = internedTables.setdefault(item, item)
+					if stats is not None:
+						stats["subtables"] += 1
+						if internedItem is not item:
+							stats["duplicates"] += 1
+							stats["bytesSaved"] += item.getDataLength()
+					items[i] = internedItem
 		self.items = tuple(items)
+		# the subtables are done, so their hashes are known and the items
+		# are hashed in one step; tables are then interned by this hash and a
+		# shallow comparison of the items, as equal subtables are the same
+		# objects
+		self._hash = hash(self.items)
 
 	def _gatherTables(self, tables, extTables, done):
 		# Convert table references in self.items tree to a flat
@@ -391,8 +528,25 @@ class OTTableWriter(object):
 
 	def getAllData(self):
 		"""Assemble all data, including all subtables."""
+		tables = self.layOutTables()
+		data = []
+		for table in tables:
+			tableData = table.getData()
+			data.append(tableData)
+
+		return bytesjoin(data)
+
+	def layOutTables(self, stats=None):
+		"""Return the flat list of all the tables, after setting their
+		absolute positions. If a 'stats' dict is given, the number of
+		subtables, of duplicate subtables, and the bytes saved by sharing
+		them are added to it.
+		"""
+		if stats is not None:
+			for key in ("subtables", "duplicates", "bytesSaved"):
+				stats.setdefault(key, 0)
 		internedTables = {}
-		self._doneWriting(internedTables)
+		self._doneWriting(internedTables, stats)
 		tables = []
 		extTables = []
 		done = {}
@@ -401,25 +555,37 @@ class OTTableWriter(object):
 		extTables.reverse()
 		# Gather all data in two passes: the absolute positions of all
 		# subtable are needed before the actual data can be assembled.
+		tables.extend(extTables)
 		pos = 0
 		for table in tables:
 			table.pos = pos
 			pos = pos + table.getDataLength()
+		return tables
 
-		for table in extTables:
-			table.pos = pos
-			pos = pos + table.getDataLength()
-
-		data = []
+	def getOverflowErrorRecords(self, tables):
+		"""Return an OverflowErrorRecord for each 16-bit offset which
+		overflows, given the tables as laid out by layOutTables().
+		"""
+		records = []
 		for table in tables:
-			tableData = table.getData()
-			data.append(tableData)
+			pos = table.pos
+			for item in table.items:
+				if hasattr(item, "getData") and not item.longOffset and not 0 <= item.pos - pos <= 0xFFFF:
+					records.append(table.getOverflowErrorRecord(item))
+		return records
 
-		for table in extTables:
-			tableData = table.getData()
-			data.append(tableData)
+	def getLookupListWriter(self):
+		for item in self.items:
+			if getattr(item, "name", None) == "LookupList":
+				return item
+		return None
 
-		return bytesjoin(data)
+	def getLookupWriters(self):
+		"""Return the writers of the lookups of a GSUB/GPOS table writer."""
+		lookupList = self.getLookupListWriter()
+		if lookupList is None:
+			return []
+		return [item for item in lookupList.items if hasattr(item, "getData")]
 
 	# interface for gathering data, as used by table.compile()
 
@@ -541,6 +707,9 @@ def packULong(value):
 	return struct.pack(">L", value)
 
 
+_recordLayouts = {}
+
+
 class BaseTable(object):
 
 	"""Generic base class for all OpenType (sub)tables."""
@@ -582,11 +751,33 @@ class BaseTable(object):
 	def getConverters(self):
 		return self.converters
 
+	def getRecordLayout(self, reader):
+		"""Return an otConverters.RecordLayout to read the table's fields at
+		once, or None if they don't all have a fixed size."""
+		# the last (reader.localState, layout) pair of each table class and
+		# format; the local states of readers are copied on write, so the
+		# same state object means the same layout
+		key = (self.__class__, self.__dict__.get("Format"))
+		localState = reader.localState
+		cached = _recordLayouts.get(key)
+		if cached is not None and cached[0] is localState:
+			return cached[1]
+		from .otConverters import buildRecordLayout
+		layout = buildRecordLayout(self.__class__, self.getConverters(), reader)
+		_recordLayouts[key] = (localState, layout)
+		return layout
+
 	def getConverterByName(self, name):
 		return self.convertersByName[name]
 
 	def decompile(self, reader, font):
 		self.readFormat(reader)
+		layout = self.getRecordLayout(reader)
+		if layout is not None:
+			# all the fields have a fixed size, and are unpacked in one go
+			st = layout.struct
+			self.postRead(layout.readFields(reader, font, st.unpack(reader.readData(st.size))), font)
+			return
 		table = {}
 		self.__rawTable = table  # for debugging
 		converters = self.getConverters()
@@ -823,20 +1014,25 @@ class ValueRecordFactory(object):
 			if valueFormat & mask:
 				format.append((name, isDevice, signed))
 		self.format = format
+		self.structFormat = "".join("h" if signed else "H" for name, isDevice, signed in format)
+		self.struct = struct.Struct(">" + self.structFormat)
 
 	def __len__(self):
 		return len(self.format)
 
 	def readValueRecord(self, reader, font):
+		if not self.format:
+			return None
+		return self.fromValues(reader, font, self.struct.unpack(reader.readData(self.struct.size)))
+
+	def fromValues(self, reader, font, values):
+		"""Make a ValueRecord from the values read with the struct format;
+		the device table offsets are relative to the reader's offset."""
 		format = self.format
 		if not format:
 			return None
 		valueRecord = ValueRecord()
-		for name, isDevice, signed in format:
-			if signed:
-				value = reader.readShort()
-			else:
-				value = reader.readUShort()
+		for (name, isDevice, signed), value in zip(format, values):
 			if isDevice:
 				if value:
 					from . import otTables
@@ -1,6 +1,9 @@
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools.misc.textTools import deHexStr
+from fontTools.misc.loggingTools import CapturingLogHandler
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables import otTables
 from fontTools.ttLib.tables.otBase import OTTableReader, OTTableWriter
 import unittest
 
@@ -91,5 +94,116 @@ class OTTableWriterTest(unittest.TestCase):
         self.assertEqual(writer.getData(), deHexStr("BE EF CA FE"))
 
 
+def makeLigatureFont(numLookups, numLigatures):
+    # each lookup has a subtable with 'numLigatures' unique ligatures; the
+    # subtables share their Coverage table
+    glyphs = [".notdef"] + ["g%d" % i for i in range(numLookups * numLigatures + 4)]
+    font = TTFont()
+    font.setGlyphOrder(glyphs)
+    gsub = font["GSUB"] = newTable("GSUB")
+    table = gsub.table = otTables.GSUB()
+    table.Version = 0x00010000
+    table.ScriptList = otTables.ScriptList()
+    table.ScriptList.ScriptRecord = []
+    table.FeatureList = otTables.FeatureList()
+    table.FeatureList.FeatureRecord = []
+    table.LookupList = otTables.LookupList()
+    table.LookupList.Lookup = []
+    for i in range(numLookups):
+        subtable = otTables.LigatureSubst()
+        subtable.Format = 1
+        subtable.ligatures = {}
+        for j in range(numLigatures):
+            ligature = otTables.Ligature()
+            ligature.LigGlyph = glyphs[1 + i * numLigatures + j]
+            ligature.Component = glyphs[-3:]
+            subtable.ligatures[glyphs[1 + j]] = [ligature]
+        lookup = otTables.Lookup()
+        lookup.LookupType = 4
+        lookup.LookupFlag = 0
+        lookup.SubTable = [subtable]
+        table.LookupList.Lookup.append(lookup)
+    return font
+
+
+def getLigatures(table):
+    result = []
+    for lookup in table.LookupList.Lookup:
+        ligatures = {}
+        for subtable in lookup.SubTable:
+            if lookup.LookupType == 7:
+                subtable = subtable.ExtSubTable
+            for glyph, ligs in subtable.ligatures.items():
+                ligatures.setdefault(glyph, []).extend(
+                    (lig.LigGlyph, tuple(lig.Component)) for lig in ligs)
+        result.append(ligatures)
+    return result
+
+
+class OffsetOverflowTest(unittest.TestCase):
+    def test_compile_overflow(self):
+        font = makeLigatureFont(40, 150)
+        expected = getLigatures(font["GSUB"].table)
+        with CapturingLogHandler("fontTools.ttLib.tables.otBase", "INFO") as captor:
+            data = font["GSUB"].compile(font)
+        self.assertGreater(len(data), 0x10000)
+        self.assertTrue(any("passes" in r.msg for r in captor.records))
+
+        decompiled = newTable("GSUB")
+        decompiled.decompile(data, font)
+        lookups = decompiled.table.LookupList.Lookup
+        self.assertTrue(any(lookup.LookupType == 7 for lookup in lookups))
+        self.assertEqual(getLigatures(decompiled.table), expected)
+
+    def test_getOverflowErrorRecords(self):
+        font = makeLigatureFont(40, 150)
+        class GlobalState(object):
+            tableType = "GSUB"
+        writer = OTTableWriter(GlobalState())
+        font["GSUB"].table.compile(writer, font)
+        records = writer.getOverflowErrorRecords(writer.layOutTables())
+        self.assertTrue(records)
+        self.assertTrue(all(r.tableType == "GSUB" for r in records))
+        self.assertTrue(any(r.SubTableIndex is None for r in records))
+
+
+class SharingTest(unittest.TestCase):
+    def compile(self, font):
+        class GlobalState(object):
+            tableType = "GSUB"
+        writer = OTTableWriter(GlobalState())
+        font["GSUB"].table.compile(writer, font)
+        return writer
+
+    def test_layOutTables_stats(self):
+        font = makeLigatureFont(3, 2)
+        writer = self.compile(font)
+        stats = {}
+        writer.layOutTables(stats)
+        # the 2nd and 3rd lookups' Coverage tables are shared with the 1st
+        self.assertEqual(stats["duplicates"], 2)
+        self.assertEqual(stats["bytesSaved"], 2 * 8)
+
+    def test_hash_eq(self):
+        font = makeLigatureFont(2, 2)
+        writer = self.compile(font)
+        writer.layOutTables()
+        lookups = writer.getLookupWriters()
+        subtable1, subtable2 = [w.items[-1] for w in lookups]
+        self.assertNotEqual(subtable1, subtable2)
+        coverage1 = [w for w in subtable1.items if hasattr(w, "getData")][0]
+        coverage2 = [w for w in subtable2.items if hasattr(w, "getData")][0]
+        self.assertIs(coverage1, coverage2)
+        self.assertEqual(hash(subtable1), hash(subtable1.items))
+
+    def test_compile_debug_stats(self):
+        font = makeLigatureFont(3, 2)
+        with CapturingLogHandler("fontTools.ttLib.tables.otBase", "DEBUG") as captor:
+            data = font["GSUB"].compile(font)
+        messages = [r.getMessage() for r in captor.records]
+        self.assertTrue(any("shared duplicates: 2, bytes saved: 16" in m for m in messages))
+        self.assertEqual(data, makeLigatureFont(3, 2)["GSUB"].compile(font))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -4,8 +4,9 @@ from fontTools.misc.textTools import safeEval
 from fontTools.misc.fixedTools import (
 	fixedToFloat as fi2fl, floatToFixed as fl2fi, ensureVersionIsLong as fi2ve,
 	versionToFixed as ve2fi)
-from .otBase import ValueRecordFactory
+from .otBase import ValueRecordFactory, FormatSwitchingBaseTable
 from functools import partial
+import struct
 import logging
 
 
@@ -97,6 +98,14 @@ class BaseConverter(object):
 		self.isLookupType = name.endswith("LookupType")
 		self.isPropagated = name in ["ClassCount", "Class2Count", "FeatureTag", "SettingsCount", "VarRegionCount", "MappingCount", "RegionAxisCount"]
 
+	# The struct format of a fixed-size value, with one character per item
+	# (the values of several items, as in ValueRecords, are tuples). Arrays
+	# of such values, and records made of them, are unpacked in one go.
+	structFormat = None
+	# whether the struct converter takes a tuple of the items of a value,
+	# even if there is only one
+	structTuples = False
+
 	def readArray(self, reader, font, tableDict, count):
 		"""Read an array of values from the reader."""
 		lazy = font.lazy and count > 8
@@ -105,6 +114,9 @@ class BaseConverter(object):
 			if recordSize is NotImplemented:
 				lazy = False
 		if not lazy:
+			structFormat = self.getStructFormat(reader)
+			if structFormat:
+				return self.readStructArray(reader, font, structFormat, count)
 			l = []
 			for i in range(count):
 				l.append(self.read(reader, font, tableDict))
@@ -124,6 +136,26 @@ class BaseConverter(object):
 		if hasattr(self, 'staticSize'): return self.staticSize
 		return NotImplemented
 
+	def getStructFormat(self, reader):
+		"""Return the struct format of a value in the reader's state, or None
+		if the value has no fixed size."""
+		return self.structFormat
+
+	def getStructConverter(self, reader):
+		"""Return a function(reader, font, value) making a value from the
+		items read with the struct format, or None if they are the value."""
+		return None
+
+	def readStructArray(self, reader, font, structFormat, count):
+		convert = self.getStructConverter(reader)
+		if len(structFormat) == 1 and not self.structTuples:
+			values = reader.readValues(structFormat, count)
+		else:
+			values = reader.readStructArray(getStruct(structFormat), count)
+		if convert is None:
+			return list(values)
+		return [convert(reader, font, value) for value in values]
+
 	def read(self, reader, font, tableDict):
 		"""Read a value from the reader."""
 		raise NotImplementedError(self)
@@ -158,6 +190,7 @@ class IntValue(SimpleValue):
 
 class Long(IntValue):
 	staticSize = 4
+	structFormat = "l"
 	def read(self, reader, font, tableDict):
 		return reader.readLong()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -165,6 +198,7 @@ class Long(IntValue):
 
 class ULong(IntValue):
 	staticSize = 4
+	structFormat = "L"
 	def read(self, reader, font, tableDict):
 		return reader.readULong()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -172,6 +206,7 @@ class ULong(IntValue):
 
 class Short(IntValue):
 	staticSize = 2
+	structFormat = "h"
 	def read(self, reader, font, tableDict):
 		return reader.readShort()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -179,6 +214,7 @@ class Short(IntValue):
 
 class UShort(IntValue):
 	staticSize = 2
+	structFormat = "H"
 	def read(self, reader, font, tableDict):
 		return reader.readUShort()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -186,6 +222,7 @@ class UShort(IntValue):
 
 class Int8(IntValue):
 	staticSize = 1
+	structFormat = "b"
 	def read(self, reader, font, tableDict):
 		return reader.readInt8()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -193,6 +230,7 @@ class Int8(IntValue):
 
 class UInt8(IntValue):
 	staticSize = 1
+	structFormat = "B"
 	def read(self, reader, font, tableDict):
 		return reader.readUInt8()
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -224,6 +262,7 @@ class Tag(SimpleValue):
 
 class GlyphID(SimpleValue):
 	staticSize = 2
+	structFormat = "H"
 	def readArray(self, reader, font, tableDict, count):
 		glyphOrder = font.getGlyphOrder()
 		gids = reader.readUShortArray(count)
@@ -235,6 +274,11 @@ class GlyphID(SimpleValue):
 		return l
 	def read(self, reader, font, tableDict):
 		return font.getGlyphName(reader.readUShort())
+	def getStructConverter(self, reader):
+		return self.fromGlyphID
+	@staticmethod
+	def fromGlyphID(reader, font, glyphID):
+		return font.getGlyphName(glyphID)
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
 		writer.writeUShort(font.getGlyphID(value))
 
@@ -307,9 +351,39 @@ class Version(BaseConverter):
 
 class Struct(BaseConverter):
 
+	structTuples = True
+
 	def getRecordSize(self, reader):
 		return self.tableClass and self.tableClass.getRecordSize(reader)
 
+	def getStructFormat(self, reader):
+		layout = self.getRecordLayout(reader)
+		return None if layout is None else layout.structFormat
+
+	def getStructConverter(self, reader):
+		return self.getRecordLayout(reader)
+
+	# the last (reader.localState, layout) pair; the local states of readers
+	# are copied on write, so the same state object means the same layout
+	_layoutCache = None
+
+	def getRecordLayout(self, reader):
+		"""Return a RecordLayout to read the records in bulk, or None if they
+		have no fixed size in the reader's state."""
+		localState = reader.localState
+		cache = self._layoutCache
+		if cache is not None and cache[0] is localState:
+			return cache[1]
+		layout = self._buildRecordLayout(reader)
+		self._layoutCache = (localState, layout)
+		return layout
+
+	def _buildRecordLayout(self, reader):
+		tableClass = self.tableClass
+		if tableClass is None or issubclass(tableClass, FormatSwitchingBaseTable):
+			return None
+		return buildRecordLayout(tableClass, tableClass.converters, reader)
+
 	def read(self, reader, font, tableDict):
 		table = self.tableClass()
 		table.decompile(reader, font)
@@ -355,6 +429,11 @@ class Table(Struct):
 
 	longOffset = False
 	staticSize = 2
+	structFormat = "H"
+	structTuples = False
+
+	def getStructFormat(self, reader):
+		return self.structFormat
 
 	def readOffset(self, reader):
 		return reader.readUShort()
@@ -366,7 +445,12 @@ class Table(Struct):
 			writer.writeUShort(0)
 
 	def read(self, reader, font, tableDict):
-		offset = self.readOffset(reader)
+		return self.readTable(reader, font, self.readOffset(reader))
+
+	def getStructConverter(self, reader):
+		return self.readTable
+
+	def readTable(self, reader, font, offset):
 		if offset == 0:
 			return None
 		if offset <= 3:
@@ -386,6 +470,14 @@ class Table(Struct):
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
 		if value is None:
 			self.writeNullOffset(writer)
+			return
+		# while fixing offset overflows, the writers of the tables which did
+		# not change are reused
+		subWriters = getattr(writer.globalState, "subWriters", None)
+		if subWriters and id(value) in subWriters:
+			subWriter = subWriters[id(value)][1]
+			subWriter.parent = writer
+			writer.writeSubTable(subWriter)
 		else:
 			subWriter = writer.getSubWriter()
 			subWriter.longOffset = self.longOffset
@@ -399,6 +491,7 @@ class LTable(Table):
 
 	longOffset = True
 	staticSize = 4
+	structFormat = "L"
 
 	def readOffset(self, reader):
 		return reader.readULong()
@@ -440,8 +533,13 @@ class ValueFormat(IntValue):
 
 
 class ValueRecord(ValueFormat):
+	structTuples = True
 	def getRecordSize(self, reader):
 		return 2 * len(reader[self.which])
+	def getStructFormat(self, reader):
+		return reader[self.which].structFormat
+	def getStructConverter(self, reader):
+		return reader[self.which].fromValues
 	def read(self, reader, font, tableDict):
 		return reader[self.which].readValueRecord(reader, font)
 	def write(self, writer, font, tableDict, value, repeatIndex=None):
@@ -458,6 +556,100 @@ class ValueRecord(ValueFormat):
 		return value
 
 
+def buildRecordLayout(tableClass, converters, reader):
+	"""Return a RecordLayout for tables with the given converters, or None if
+	their fields don't all have a fixed size in the reader's state."""
+	names = set(conv.name for conv in converters)
+	fields = []
+	for conv in converters:
+		if conv.isPropagated or conv.name in ("SubTable", "ExtSubTable", "FeatureParams"):
+			return None
+		repeat = None
+		if conv.repeat:
+			# only counts propagated from a parent table are known in advance
+			if conv.repeat in names or not conv.repeat in reader:
+				return None
+			repeat = reader[conv.repeat] + conv.aux
+		elif conv.aux:
+			return None
+		structFormat = conv.getStructFormat(reader)
+		if structFormat is None:
+			return None
+		fields.append((conv.name, structFormat, repeat,
+				conv.getStructConverter(reader), conv.structTuples))
+	return RecordLayout(tableClass, fields)
+
+
+_structs = {}
+
+def getStruct(structFormat):
+	"""Return a (cached) big-endian struct.Struct for a format."""
+	st = _structs.get(structFormat)
+	if st is None:
+		st = _structs[structFormat] = struct.Struct(">" + structFormat)
+	return st
+
+
+class RecordLayout(object):
+
+	"""Makes the records of a table class from the values unpacked with one
+	struct format, for tables whose fields all have a fixed size."""
+
+	def __init__(self, tableClass, fields):
+		# fields are (name, structFormat, repeat, convert, isTuple) tuples,
+		# where 'repeat' is the number of items of arrays, or None
+		self.tableClass = tableClass
+		self.fields = []
+		structFormat = ""
+		# the common case of one value per field is the quickest
+		self.isFlat = True
+		for name, itemFormat, repeat, convert, isTuple in fields:
+			start = len(structFormat)
+			structFormat += itemFormat * (1 if repeat is None else repeat)
+			size = len(itemFormat)
+			isTuple = isTuple or size != 1
+			self.fields.append((name, start, len(structFormat), size, isTuple, repeat, convert))
+			if isTuple or repeat is not None:
+				self.isFlat = False
+		self.structFormat = structFormat
+		self.struct = getStruct(structFormat)
+		self.names = [field[0] for field in fields]
+		self.converted = [(i, field[0], field[3])
+				for i, field in enumerate(fields) if field[3] is not None]
+
+	def __call__(self, reader, font, values):
+		table = self.tableClass()
+		table.postRead(self.readFields(reader, font, values), font)
+		return table
+
+	def readFields(self, reader, font, values):
+		"""Return the raw table dict of the values of one record."""
+		if self.isFlat:
+			rawTable = dict(zip(self.names, values))
+			for i, name, convert in self.converted:
+				rawTable[name] = convert(reader, font, values[i])
+		else:
+			rawTable = {}
+			for name, start, stop, size, isTuple, repeat, convert in self.fields:
+				if repeat is None:
+					value = values[start:stop] if isTuple else values[start]
+					if convert is not None:
+						value = convert(reader, font, value)
+				else:
+					if not isTuple:
+						items = values[start:stop]
+					elif size == 0:
+						items = [()] * repeat
+					else:
+						items = [values[i:i+size] for i in range(start, stop, size)]
+					if convert is None:
+						value = list(items)
+					else:
+						value = [convert(reader, font, item) for item in items]
+				rawTable[name] = value
+		return rawTable
+
+
 class DeltaValue(BaseConverter):
 
 	def read(self, reader, font, tableDict):
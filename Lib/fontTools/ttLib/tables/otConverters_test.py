@@ -5,7 +5,9 @@ from fontTools.misc.testTools import FakeFont, makeXMLWriter
 from fontTools.misc.textTools import deHexStr
 import fontTools.ttLib.tables.otConverters as otConverters
 from fontTools.ttLib import newTable
-from fontTools.ttLib.tables.otBase import OTTableReader, OTTableWriter
+from fontTools.ttLib.tables import otTables
+from fontTools.ttLib.tables.otBase import (
+    OTTableReader, OTTableWriter, ValueRecordFactory)
 import unittest
 
 
@@ -30,6 +32,48 @@ class GlyphIDTest(unittest.TestCase):
         self.assertEqual(writer.getData(), deHexStr("0002"))
 
 
+class StructArrayTest(unittest.TestCase):
+    font = FakeFont(".notdef A B C".split())
+    font.lazy = False
+
+    def test_readArray_UShort(self):
+        converter = otConverters.UShort('Value', 'ValueCount', 0)
+        reader = OTTableReader(deHexStr("0002 0001 DEAD 0002"))
+        self.assertEqual(converter.readArray(reader, self.font, {}, 3),
+                         [2, 1, 0xDEAD])
+        self.assertEqual(reader.pos, 6)
+
+    def test_readArray_RangeRecord(self):
+        converter = otTables.Coverage.convertersByName[2]['RangeRecord']
+        data = deHexStr("0001 0002 0000 0003 0003 0002")
+        records = converter.readArray(OTTableReader(data), self.font, {}, 2)
+        self.assertEqual([(r.Start, r.End, r.StartCoverageIndex)
+                          for r in records],
+                         [("A", "B", 0), ("C", "C", 2)])
+        reader = OTTableReader(data)
+        expected = [converter.read(reader, self.font, {}) for i in range(2)]
+        self.assertEqual(records, expected)
+
+    def test_readArray_PairValueRecord(self):
+        converter = otTables.PairSet.convertersByName['PairValueRecord']
+        reader = OTTableReader(deHexStr("0002 FFF6 0003 0014 0000"))
+        reader["ValueFormat1"] = ValueRecordFactory(0x0004)  # XAdvance
+        reader["ValueFormat2"] = ValueRecordFactory(0)
+        records = converter.readArray(reader, self.font, {}, 2)
+        self.assertEqual(reader.pos, 8)
+        self.assertEqual([(r.SecondGlyph, r.Value1.XAdvance, r.Value2)
+                          for r in records],
+                         [("B", -10, None), ("C", 20, None)])
+
+    def test_decompile_Anchor(self):
+        reader = OTTableReader(deHexStr("0001 FFF6 0014"))
+        anchor = otTables.Anchor()
+        anchor.decompile(reader, self.font)
+        self.assertEqual((anchor.Format, anchor.XCoordinate, anchor.YCoordinate),
+                         (1, -10, 20))
+        self.assertEqual(reader.pos, 6)
+
+
 class NameIDTest(unittest.TestCase):
     converter = otConverters.NameID('NameID', 0, None, None)
 
@@ -9,6 +9,8 @@ from fontTools.misc.py23 import *
 from fontTools.misc.textTools import safeEval
 from .otBase import BaseTable, FormatSwitchingBaseTable
 import operator
+import bisect
+import array
 import logging
 
 
@@ -37,6 +39,120 @@ class Coverage(FormatSwitchingBaseTable):
 
 	# manual implementation to get rid of glyphID dependencies
 
+	# In compact mode (see the compactLayout argument of TTFont), the glyphs
+	# are kept as sorted ranges of glyph IDs: the '_starts' and '_ends'
+	# (inclusive) arrays, and the coverage index of each start in '_indices',
+	# for the '_glyphOrder' they were read with. The 'glyphs' list is only
+	# made from them when it is accessed, and then replaces them.
+
+	def __getattr__(self, attr):
+		if attr == "glyphs" and "_starts" in self.__dict__:
+			self.glyphs = self._getGlyphNames()
+			del self._starts, self._ends, self._indices, self._glyphOrder
+			return self.glyphs
+		return FormatSwitchingBaseTable.__getattr__(self, attr)
+
+	def isCompact(self):
+		self.ensureDecompiled()
+		return "_starts" in self.__dict__ and "glyphs" not in self.__dict__
+
+	def compact(self, font):
+		"""Switch to compact mode, if the glyphs are sorted by glyph ID.
+		Return whether the coverage is compact."""
+		if not self.isCompact():
+			ranges = [(glyphID, glyphID) for glyphID in font.getGlyphIDs(self.glyphs)]
+			if not self._setRanges(ranges, font.getGlyphOrder()):
+				return False
+			del self.glyphs
+		return True
+
+	def getCoverageIndex(self, glyphID):
+		"""Return the coverage index of a glyph ID, or None if the glyph isn't
+		covered. Only for compact coverages."""
+		i = bisect.bisect_right(self._starts, glyphID) - 1
+		if i >= 0 and glyphID <= self._ends[i]:
+			return self._indices[i] + glyphID - self._starts[i]
+		return None
+
+	def hasGlyphID(self, glyphID):
+		return self.getCoverageIndex(glyphID) is not None
+
+	def _getGlyphNames(self):
+		glyphOrder = self._glyphOrder
+		return [glyphOrder[glyphID]
+				for start, end in zip(self._starts, self._ends)
+				for glyphID in range(start, end + 1)]
+
+	def _setRanges(self, ranges, glyphOrder):
+		# 'ranges' are (start, end) glyph ID pairs; adjacent ones are merged
+		starts = array.array("H")
+		ends = array.array("H")
+		indices = array.array("H")
+		last = -1
+		index = 0
+		for start, end in ranges:
+			if start <= last or end < start or end >= len(glyphOrder):
+				return False
+			if start != last + 1 or not starts:
+				starts.append(start)
+				ends.append(end)
+				indices.append(index)
+			else:
+				ends[-1] = end
+			index += end - start + 1
+			last = end
+		self._starts, self._ends, self._indices = starts, ends, indices
+		self._glyphOrder = glyphOrder
+		return True
+
+	def decompile(self, reader, font):
+		if getattr(font, "compactLayout", False) and self._decompileRanges(reader.copy(), font):
+			return
+		FormatSwitchingBaseTable.decompile(self, reader, font)
+
+	def _decompileRanges(self, reader, font):
+		# unsorted or out of range glyphs are left to postRead()
+		format = reader.readUShort()
+		if format == 1:
+			glyphIDs = reader.readUShortArray(reader.readUShort())
+			ranges = zip(glyphIDs, glyphIDs)
+		elif format == 2:
+			records = reader.readUShortArray(3 * reader.readUShort())
+			ranges = list(zip(records[0::3], records[1::3]))
+			index = 0
+			for (start, end), startIndex in zip(ranges, records[2::3]):
+				if startIndex != index:
+					return False
+				index += end - start + 1
+		else:
+			return False
+		if not self._setRanges(ranges, font.getGlyphOrder()):
+			return False
+		self.Format = format
+		return True
+
+	def compile(self, writer, font):
+		if not self.isCompact() or self._glyphOrder is not font.getGlyphOrder():
+			FormatSwitchingBaseTable.compile(self, writer, font)
+			return
+		# write the same items as preWrite() and the converters would
+		starts, ends, indices = self._starts, self._ends, self._indices
+		numGlyphs = indices[-1] + ends[-1] - starts[-1] + 1 if starts else 0
+		self.Format = 2 if len(starts) * 3 < numGlyphs else 1
+		self.writeFormat(writer)
+		writeUShort = writer.writeUShort
+		if self.Format == 1:
+			writeUShort(numGlyphs)
+			for start, end in zip(starts, ends):
+				for glyphID in range(start, end + 1):
+					writeUShort(glyphID)
+		else:
+			writeUShort(len(starts))
+			for start, end, index in zip(starts, ends, indices):
+				writeUShort(start)
+				writeUShort(end)
+				writeUShort(index)
+
 	def postRead(self, rawTable, font):
 		if self.Format == 1:
 			# TODO only allow glyphs that are valid?
@@ -82,10 +198,9 @@ class Coverage(FormatSwitchingBaseTable):
 			glyphs = self.glyphs = []
 		format = 1
 		rawTable = {"GlyphArray": glyphs}
-		getGlyphID = font.getGlyphID
 		if glyphs:
 			# find out whether Format 2 is more compact or not
-			glyphIDs = [getGlyphID(glyphName) for glyphName in glyphs ]
+			glyphIDs = font.getGlyphIDs(glyphs)
 			brokenOrder = sorted(glyphIDs) != glyphIDs
 
 			last = glyphIDs[0]
@@ -122,7 +237,11 @@ class Coverage(FormatSwitchingBaseTable):
 		return rawTable
 
 	def toXML2(self, xmlWriter, font):
-		for glyphName in getattr(self, "glyphs", []):
+		if self.isCompact():
+			glyphs = self._getGlyphNames()
+		else:
+			glyphs = getattr(self, "glyphs", [])
+		for glyphName in glyphs:
 			xmlWriter.simpletag("Glyph", value=glyphName)
 			xmlWriter.newline()
 
@@ -368,6 +487,125 @@ class MultipleSubst(FormatSwitchingBaseTable):
 
 class ClassDef(FormatSwitchingBaseTable):
 
+	# In compact mode (see the compactLayout argument of TTFont), the classes
+	# are kept as sorted ranges of glyph IDs: the '_starts' and '_ends'
+	# (inclusive) arrays and the '_classes' of the ranges, for the
+	# '_glyphOrder' they were read with. The 'classDefs' dict is only made
+	# from them when it is accessed, and then replaces them.
+
+	def __getattr__(self, attr):
+		if attr == "classDefs" and "_starts" in self.__dict__:
+			self.classDefs = self._getClassDefs()
+			del self._starts, self._ends, self._classes, self._glyphOrder
+			return self.classDefs
+		return FormatSwitchingBaseTable.__getattr__(self, attr)
+
+	def isCompact(self):
+		self.ensureDecompiled()
+		return "_starts" in self.__dict__ and "classDefs" not in self.__dict__
+
+	def compact(self, font):
+		"""Switch to compact mode. Return whether the class definitions are
+		compact."""
+		if not self.isCompact():
+			items = list(self.classDefs.items())
+			glyphIDs = font.getGlyphIDs([glyphName for glyphName, cls in items])
+			ranges = sorted((glyphID, glyphID, cls)
+					for glyphID, (glyphName, cls) in zip(glyphIDs, items))
+			if not self._setRanges(ranges, font.getGlyphOrder()):
+				return False
+			del self.classDefs
+		return True
+
+	def getClass(self, glyphID):
+		"""Return the class of a glyph ID, 0 if it has none. Only for compact
+		class definitions."""
+		i = bisect.bisect_right(self._starts, glyphID) - 1
+		if i >= 0 and glyphID <= self._ends[i]:
+			return self._classes[i]
+		return 0
+
+	def _getClassDefs(self):
+		glyphOrder = self._glyphOrder
+		return {glyphOrder[glyphID]: cls
+				for start, end, cls in zip(self._starts, self._ends, self._classes)
+				for glyphID in range(start, end + 1)}
+
+	def _setRanges(self, ranges, glyphOrder):
+		# 'ranges' are (start, end, class) tuples; adjacent ones in the same
+		# class are merged, as by preWrite()
+		starts = array.array("H")
+		ends = array.array("H")
+		classes = array.array("H")
+		last = lastClass = -1
+		for start, end, cls in ranges:
+			if start <= last or end < start or end >= len(glyphOrder):
+				return False
+			if start != last + 1 or cls != lastClass or not starts:
+				starts.append(start)
+				ends.append(end)
+				classes.append(cls)
+			else:
+				ends[-1] = end
+			last = end
+			lastClass = cls
+		self._starts, self._ends, self._classes = starts, ends, classes
+		self._glyphOrder = glyphOrder
+		return True
+
+	def decompile(self, reader, font):
+		if getattr(font, "compactLayout", False) and self._decompileRanges(reader.copy(), font):
+			return
+		FormatSwitchingBaseTable.decompile(self, reader, font)
+
+	def _decompileRanges(self, reader, font):
+		# unsorted or out of range glyphs are left to postRead()
+		format = reader.readUShort()
+		if format == 1:
+			start = reader.readUShort()
+			classes = reader.readUShortArray(reader.readUShort())
+			glyphIDs = range(start, start + len(classes))
+			ranges = zip(glyphIDs, glyphIDs, classes)
+		elif format == 2:
+			records = reader.readUShortArray(3 * reader.readUShort())
+			ranges = zip(records[0::3], records[1::3], records[2::3])
+		else:
+			return False
+		if not self._setRanges(ranges, font.getGlyphOrder()):
+			return False
+		self.Format = format
+		return True
+
+	def compile(self, writer, font):
+		if not self.isCompact() or self._glyphOrder is not font.getGlyphOrder():
+			FormatSwitchingBaseTable.compile(self, writer, font)
+			return
+		# write the same items as preWrite() and the converters would
+		starts, ends, classes = self._starts, self._ends, self._classes
+		self.Format = 2
+		if starts:
+			glyphCount = ends[-1] - starts[0] + 1
+			if len(starts) * 3 >= glyphCount + 1:
+				self.Format = 1
+		self.writeFormat(writer)
+		writeUShort = writer.writeUShort
+		if self.Format == 1:
+			writeUShort(starts[0])
+			writeUShort(glyphCount)
+			last = starts[0] - 1
+			for start, end, cls in zip(starts, ends, classes):
+				for glyphID in range(last + 1, start):
+					writeUShort(0)
+				for glyphID in range(start, end + 1):
+					writeUShort(cls)
+				last = end
+		else:
+			writeUShort(len(starts))
+			for start, end, cls in zip(starts, ends, classes):
+				writeUShort(start)
+				writeUShort(end)
+				writeUShort(cls)
+
 	def postRead(self, rawTable, font):
 		classDefs = {}
 		glyphOrder = font.getGlyphOrder()
@@ -424,11 +662,9 @@ class ClassDef(FormatSwitchingBaseTable):
 		items = list(classDefs.items())
 		format = 2
 		rawTable = {"ClassRangeRecord": []}
-		getGlyphID = font.getGlyphID
-		for i in range(len(items)):
-			glyphName, cls = items[i]
-			items[i] = getGlyphID(glyphName), glyphName, cls
-		items.sort()
+		glyphIDs = font.getGlyphIDs([glyphName for glyphName, cls in items])
+		items = sorted((glyphID, glyphName, cls)
+				for glyphID, (glyphName, cls) in zip(glyphIDs, items))
 		if items:
 			last, lastName, lastCls = items[0]
 			ranges = [[lastCls, last, lastName]]
@@ -468,7 +704,10 @@ class ClassDef(FormatSwitchingBaseTable):
 		return rawTable
 
 	def toXML2(self, xmlWriter, font):
-		items = sorted(self.classDefs.items())
+		if self.isCompact():
+			items = sorted(self._getClassDefs().items())
+		else:
+			items = sorted(self.classDefs.items())
 		for glyphName, cls in items:
 			xmlWriter.simpletag("ClassDef", [("glyph", glyphName), ("class", cls)])
 			xmlWriter.newline()
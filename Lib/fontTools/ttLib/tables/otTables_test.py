@@ -2,6 +2,8 @@ from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools.misc.testTools import parseXML, FakeFont
 from fontTools.misc.xmlWriter import XMLWriter
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables.otBase import OTTableReader, OTTableWriter
 import fontTools.ttLib.tables.otTables as otTables
 import unittest
 
@@ -367,5 +369,69 @@ class AlternateSubstTest(unittest.TestCase):
         })
 
 
+class CompactLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.glyphs = ".notdef A B C D E a b c d e".split()
+        self.font = TTFont()
+        self.font.setGlyphOrder(self.glyphs)
+
+    def compile(self, table):
+        writer = OTTableWriter(globalState={})
+        table.compile(writer, self.font)
+        return writer.getAllData()
+
+    def decompile(self, tableClass, data, compact=True):
+        self.font.compactLayout = compact
+        table = tableClass()
+        table.decompile(OTTableReader(data), self.font)
+        return table
+
+    def test_Coverage(self):
+        for glyphs in (["A", "B", "C", "D", "a", "c"], ["A", "C", "e"], []):
+            data = self.compile(makeCoverage(glyphs))
+            coverage = self.decompile(otTables.Coverage, data)
+            self.assertTrue(coverage.isCompact())
+            self.assertEqual(self.compile(coverage), data)
+            for glyphID, glyphName in enumerate(self.glyphs):
+                index = glyphs.index(glyphName) if glyphName in glyphs else None
+                self.assertEqual(coverage.getCoverageIndex(glyphID), index)
+            self.assertEqual(coverage.glyphs, glyphs)
+            self.assertFalse(coverage.isCompact())
+            self.assertEqual(self.compile(coverage), data)
+
+    def test_Coverage_unsorted(self):
+        coverage = makeCoverage(["C", "A"])
+        self.assertFalse(coverage.compact(self.font))
+        data = self.compile(coverage)
+        coverage = self.decompile(otTables.Coverage, data)
+        self.assertFalse(coverage.isCompact())
+        self.assertEqual(coverage.glyphs, ["C", "A"])
+
+    def test_Coverage_compact(self):
+        coverage = makeCoverage(["A", "B", "C", "D", "E", "a", "b"])
+        expected = self.compile(coverage)
+        self.assertTrue(coverage.compact(self.font))
+        self.assertFalse("glyphs" in coverage.__dict__)
+        self.assertTrue(coverage.hasGlyphID(7))
+        self.assertFalse(coverage.hasGlyphID(8))
+        self.assertEqual(self.compile(coverage), expected)
+
+    def test_ClassDef(self):
+        for classDefs in ({"A": 1, "B": 1, "C": 2, "a": 1, "e": 3},
+                          {"A": 1, "B": 0, "C": 2}, {}):
+            table = otTables.ClassDef()
+            table.classDefs = dict(classDefs)
+            data = self.compile(table)
+            expected = self.decompile(otTables.ClassDef, data, compact=False)
+            classDef = self.decompile(otTables.ClassDef, data)
+            self.assertTrue(classDef.isCompact())
+            self.assertEqual(self.compile(classDef), data)
+            for glyphID, glyphName in enumerate(self.glyphs):
+                self.assertEqual(classDef.getClass(glyphID),
+                                 expected.classDefs.get(glyphName, 0))
+            self.assertEqual(classDef.classDefs, expected.classDefs)
+            self.assertFalse(classDef.isCompact())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import print_function, division, absolute_import, unicode_literals
+from fontTools.misc.py23 import *
+from fontTools import ttLib
+from fontTools.ttLib.sfnt import SFNTReader, readTTCHeader
+import unittest
+import os
+
+
+current_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+data_dir = os.path.join(current_dir, 'testdata')
+TTX = os.path.join(data_dir, 'TestTTF-Regular.ttx')
+
+
+def compileFont(path):
+	font = ttLib.TTFont(recalcBBoxes=False, recalcTimestamp=False)
+	font.importXML(path)
+	buf = BytesIO()
+	font.save(buf)
+	return buf.getvalue()
+
+
+class TTCollectionTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.fontData = compileFont(TTX)
+
+	def makeCollection(self, shareTables=True, renameGlyph=False):
+		collection = ttLib.TTCollection()
+		for i in range(2):
+			font = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+			if renameGlyph and i == 1:
+				# the fonts only differ in a glyph name of the 'post' table
+				glyphOrder = list(font.getGlyphOrder())
+				glyphOrder[-1] = "renamed"
+				del font.tables['post']
+				font.setGlyphOrder(glyphOrder)
+			for tag in font.keys():
+				font[tag]
+			if renameGlyph and i == 1:
+				font['post'].extraNames = []
+				font['post'].mapping = {}
+			collection.fonts.append(font)
+		# make the fonts differ in one table
+		collection[1]['name'].names[0].string = b"Second"
+		buf = BytesIO()
+		collection.save(buf, shareTables=shareTables)
+		return buf.getvalue()
+
+	def test_save_shareTables(self):
+		shared = self.makeCollection()
+		unshared = self.makeCollection(shareTables=False)
+		self.assertLess(len(shared), len(unshared))
+
+		header = readTTCHeader(BytesIO(shared))
+		self.assertEqual(header.numFonts, 2)
+		readers = [SFNTReader(BytesIO(shared), checkChecksums=2, fontNumber=i)
+				for i in range(2)]
+		self.assertEqual(readers[0].tables['glyf'].offset,
+				readers[1].tables['glyf'].offset)
+		self.assertNotEqual(readers[0].tables['name'].offset,
+				readers[1].tables['name'].offset)
+		# 'head' tables are never shared
+		self.assertNotEqual(readers[0].tables['head'].offset,
+				readers[1].tables['head'].offset)
+
+	def test_read(self):
+		data = self.makeCollection()
+		for lazy in (None, True):
+			collection = ttLib.TTCollection(BytesIO(data), lazy=lazy,
+					recalcTimestamp=False)
+			self.assertEqual(len(collection), 2)
+			self.assertEqual(collection[1]['name'].names[0].string, b"Second")
+			original = SFNTReader(BytesIO(self.fontData))
+			for font in collection:
+				self.assertEqual(font.reader['glyf'], original['glyf'])
+			collection.close()
+
+	def test_read_shareTables(self):
+		data = self.makeCollection()
+		collection = ttLib.TTCollection(BytesIO(data), shareTables=True)
+		first, second = collection
+		self.assertIs(first['glyf'], second['glyf'])
+		self.assertIsNot(first['name'], second['name'])
+		collection = ttLib.TTCollection(BytesIO(data))
+		first, second = collection
+		self.assertIsNot(first['glyf'], second['glyf'])
+
+	def test_read_shareTables_glyphOrder(self):
+		expected = ttLib.TTFont(BytesIO(self.fontData)).getGlyphOrder()
+		cmap = ttLib.TTFont(BytesIO(self.fontData))['cmap'].getcmap(3, 1).cmap
+		data = self.makeCollection()
+		collection = ttLib.TTCollection(BytesIO(data), shareTables=True)
+		for font in collection:
+			self.assertEqual(font.getGlyphOrder(), expected)
+			self.assertEqual(font['cmap'].getcmap(3, 1).cmap, cmap)
+			self.assertEqual(sorted(font['hmtx'].metrics), sorted(expected))
+		first, second = collection
+		self.assertIs(first['hmtx'], second['hmtx'])
+
+	def test_read_shareTables_different_glyphOrder(self):
+		data = self.makeCollection(renameGlyph=True)
+		collection = ttLib.TTCollection(BytesIO(data), shareTables=True)
+		first, second = collection
+		self.assertNotEqual(first.getGlyphOrder()[-1], "renamed")
+		self.assertEqual(second.getGlyphOrder()[-1], "renamed")
+		self.assertIsNot(first['glyf'], second['glyf'])
+		self.assertIn("renamed", second['glyf'].keys())
+		self.assertIn("renamed", second['hmtx'].metrics)
+
+	def test_roundtrip(self):
+		data = self.makeCollection()
+		collection = ttLib.TTCollection(BytesIO(data), recalcTimestamp=False)
+		for font in collection:
+			for tag in font.keys():
+				font[tag]
+		buf = BytesIO()
+		collection.save(buf)
+		self.assertEqual(buf.getvalue(), data)
+
+	def test_save_flavor(self):
+		collection = ttLib.TTCollection()
+		font = ttLib.TTFont(BytesIO(self.fontData))
+		font.flavor = "woff"
+		collection.fonts.append(font)
+		self.assertRaises(ttLib.TTLibError, collection.save, BytesIO())
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,208 @@
+from __future__ import print_function, division, absolute_import, unicode_literals
+from fontTools.misc.py23 import *
+from fontTools import ttLib
+import unittest
+import os
+
+
+current_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+data_dir = os.path.join(current_dir, 'testdata')
+TTX = os.path.join(data_dir, 'TestTTF-Regular.ttx')
+
+
+def compileFont(path):
+	font = ttLib.TTFont(recalcBBoxes=False, recalcTimestamp=False)
+	font.importXML(path)
+	buf = BytesIO()
+	font.save(buf)
+	return buf.getvalue()
+
+
+class TTFontDirtyTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.fontData = compileFont(TTX)
+
+	def setUp(self):
+		self.font = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+
+	def test_loaded_tables_are_clean(self):
+		font = self.font
+		font.getGlyphOrder()
+		font['glyf']
+		self.assertTrue(font.isLoaded('post'))
+		self.assertFalse(font.isDirty('post'))
+		self.assertFalse(font.isDirty('glyf'))
+		self.assertEqual(font.getDirtyTables(), [])
+
+	def test_markDirty(self):
+		font = self.font
+		font['glyf']
+		font['maxp']
+		font['head']
+		font['name']
+		font.markDirty('glyf')
+		# 'loca', 'maxp' and 'head' depend on 'glyf' (directly or not)
+		self.assertEqual(font.getDirtyTables(), ['head', 'maxp', 'loca', 'glyf'])
+
+	def test_setitem_is_dirty(self):
+		font = self.font
+		font['name'] = font['name']
+		self.assertTrue(font.isDirty('name'))
+		del font['name']
+		self.assertFalse(font.isDirty('name'))
+
+	def test_save_onlyDirty(self):
+		font = self.font
+		for tag in font.keys():
+			font[tag]
+		# an unmarked in-place modification is ignored
+		font['OS/2'].usWeightClass = 900
+		font['name'].names[0].string = b"Dirty"
+		font.markDirty('name')
+		out = BytesIO()
+		font.save(out, onlyDirty=True)
+		out.seek(0)
+		saved = ttLib.TTFont(out)
+		self.assertEqual(saved['name'].names[0].string, b"Dirty")
+		original = ttLib.TTFont(BytesIO(self.fontData))
+		self.assertEqual(saved['OS/2'].usWeightClass,
+				original['OS/2'].usWeightClass)
+		self.assertEqual(saved.reader['glyf'], original.reader['glyf'])
+
+
+	def test_save_onlyDirty_dependents(self):
+		# 'hhea' is loaded while 'glyf' compiles: it must be recompiled too
+		def scaleAndSave(onlyDirty):
+			font = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+			glyf = font['glyf']
+			glyph = glyf['period']
+			glyph.coordinates.scale((5, 5))
+			font.markDirty('glyf')
+			out = BytesIO()
+			font.save(out, onlyDirty=onlyDirty)
+			out.seek(0)
+			return ttLib.TTFont(out)
+		expected = scaleAndSave(onlyDirty=False)['hhea']
+		hhea = scaleAndSave(onlyDirty=True)['hhea']
+		self.assertEqual(hhea.xMaxExtent, expected.xMaxExtent)
+		self.assertEqual(hhea.minRightSideBearing, expected.minRightSideBearing)
+		original = ttLib.TTFont(BytesIO(self.fontData))['hhea']
+		self.assertNotEqual(hhea.xMaxExtent, original.xMaxExtent)
+
+
+class _UnseekableStream(object):
+
+	def __init__(self):
+		self.buf = BytesIO()
+
+	def write(self, data):
+		self.buf.write(data)
+
+	def seekable(self):
+		return False
+
+
+class TTFontSaveTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.fontData = compileFont(TTX)
+
+	def save(self, file, flavor=None, reorderTables=True):
+		font = ttLib.TTFont(BytesIO(self.fontData), recalcTimestamp=False)
+		for tag in font.keys():
+			font[tag]
+		font.flavor = flavor
+		font.save(file, reorderTables=reorderTables)
+
+	def test_table_order(self):
+		buf = BytesIO()
+		self.save(buf)
+		buf.seek(0)
+		reader = ttLib.sfnt.SFNTReader(buf, checkChecksums=2)
+		tags = list(reader.keys())
+		self.assertEqual(tags, ttLib.sortedTagList(tags))
+
+	def test_unseekable_stream(self):
+		for flavor in (None, "woff"):
+			expected = BytesIO()
+			self.save(expected, flavor)
+			stream = _UnseekableStream()
+			self.save(stream, flavor)
+			self.assertEqual(stream.buf.getvalue(), expected.getvalue())
+
+	def test_stream_not_at_start(self):
+		expected = BytesIO()
+		self.save(expected)
+		buf = BytesIO()
+		buf.write(b"\0" * 3)
+		self.save(buf)
+		self.assertEqual(buf.getvalue()[3:], expected.getvalue())
+
+
+class GlyphOrderTest(unittest.TestCase):
+
+	def setUp(self):
+		self.font = ttLib.TTFont()
+		self.font.setGlyphOrder(ttLib.GlyphOrderList([".notdef", "A", "B", "C"]))
+
+	def assertReverseMap(self, font):
+		glyphOrder = font.getGlyphOrder()
+		self.assertEqual(font.getReverseGlyphMap(),
+				{glyphName: i for i, glyphName in enumerate(glyphOrder)})
+		for i, glyphName in enumerate(glyphOrder):
+			self.assertEqual(font.getGlyphID(glyphName), i)
+
+	def test_setGlyphOrder(self):
+		glyphOrder = ttLib.GlyphOrderList([".notdef", "A"])
+		self.font.setGlyphOrder(glyphOrder)
+		self.assertIs(self.font.getGlyphOrder(), glyphOrder)
+		self.assertRaises(KeyError, self.font.getGlyphID, "B", requireReal=True)
+
+	def test_setGlyphOrder_list(self):
+		# a plain list is used as is, and can be modified afterwards
+		glyphOrder = [".notdef", "A", "B"]
+		self.font.setGlyphOrder(glyphOrder)
+		self.assertIs(self.font.getGlyphOrder(), glyphOrder)
+		self.assertReverseMap(self.font)
+		glyphOrder.append("C")
+		glyphOrder[1] = "a"
+		self.assertEqual(self.font.getGlyphID("C"), 3)
+		self.assertEqual(self.font.getGlyphID("a"), 1)
+		self.assertRaises(KeyError, self.font.getGlyphID, "A", requireReal=True)
+		self.assertEqual(self.font.getGlyphIDs(["B", "a"]), [2, 1])
+		self.assertReverseMap(self.font)
+		self.assertRaises(KeyError, self.font.getGlyphID, "Z")
+
+	def test_modified(self):
+		glyphOrder = self.font.getGlyphOrder()
+		self.assertReverseMap(self.font)
+		version = glyphOrder.version
+		glyphOrder.append("D")
+		glyphOrder.extend(["E", "F"])
+		glyphOrder[1] = "a"
+		self.assertIsNotNone(glyphOrder._reverseMap)
+		self.assertReverseMap(self.font)
+		glyphOrder.insert(1, "Z")
+		del glyphOrder[-1]
+		glyphOrder[2:4] = ["b", "c"]
+		self.assertReverseMap(self.font)
+		glyphOrder.sort()
+		self.assertReverseMap(self.font)
+		self.assertEqual(glyphOrder.version, version + 7)
+
+	def test_getGlyphID_missing(self):
+		self.assertEqual(self.font.getGlyphID("glyph00010"), 10)
+		self.assertRaises(KeyError, self.font.getGlyphID, "glyph00010", requireReal=True)
+		self.font.getGlyphOrder().append("glyph00010")
+		self.assertEqual(self.font.getGlyphID("glyph00010"), 4)
+
+	def test_getGlyphIDs(self):
+		self.assertEqual(self.font.getGlyphIDs(["C", "A"]), [3, 1])
+		self.assertEqual(self.font.getGlyphIDs(["C", "glyph00012"]), [3, 12])
+
+
+if __name__ == "__main__":
+	unittest.main()
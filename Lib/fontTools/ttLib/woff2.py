@@ -30,7 +30,8 @@ class WOFF2Reader(SFNTReader):
 
 	flavor = "woff2"
 
-	def __init__(self, file, checkChecksums=1, fontNumber=-1):
+	def __init__(self, file, checkChecksums=1, fontNumber=-1, useMmap=False):
+		# 'useMmap' is ignored: the table data must be decompressed anyway
 		if not haveBrotli:
 			log.error(
 				'The WOFF2 decoder requires the Brotli Python extension, available at: '
@@ -136,7 +137,10 @@ class WOFF2Writer(SFNTWriter):
 	flavor = "woff2"
 
 	def __init__(self, file, numTables, sfntVersion="\000\001\000\000",
-		         flavor=None, flavorData=None):
+		         flavor=None, flavorData=None, tableCache=None, workers=None):
+		# 'workers' is ignored: all the table data goes into a single brotli
+		# stream, and the glyf/loca transforms are pure Python code which
+		# can't run concurrently in threads
 		if not haveBrotli:
 			log.error(
 				'The WOFF2 encoder requires the Brotli Python extension, available at: '
@@ -285,7 +289,7 @@ class WOFF2Writer(SFNTWriter):
 			entry.origOffset = offset
 			entry.origLength = len(data)
 			if tag == 'head':
-				entry.checkSum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+				entry.checkSum = calcChecksum(data[12:], calcChecksum(data[:8]))
 			else:
 				entry.checkSum = calcChecksum(data)
 			offset += (entry.origLength + 3) & ~3
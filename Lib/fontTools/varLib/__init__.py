@@ -161,10 +161,13 @@ def _add_gvar(font, model, master_ttfs):
 	gvar.reserved = 0
 	gvar.variations = {}
 
+	# Flatten the coordinates of all the glyphs of each master
+	glyphs = []
+	offsets = [0]
+	allCoords = [[] for m in master_ttfs]
 	for glyph in font.getGlyphOrder():
 
 		allData = [_GetCoordinates(m, glyph) for m in master_ttfs]
-		allCoords = [d[0] for d in allData]
 		allControls = [d[1] for d in allData]
 		control = allControls[0]
 		if (any(c != control for c in allControls)):
@@ -172,25 +175,39 @@ def _add_gvar(font, model, master_ttfs):
 			continue
 		del allControls
 
-		# Update gvar
+		for coords,d in zip(allCoords, allData):
+			coords.extend(d[0].array)
+		glyphs.append(glyph)
+		offsets.append(len(allCoords[0]) // 2)
+
+	# Compute the deltas of all the glyphs at once
+	deltas = model.getDeltasBatch(allCoords)
+	del allCoords
+	supports = model.supports
+	assert len(deltas) == len(supports)
+
+	# Update gvar
+	for glyph in glyphs:
 		gvar.variations[glyph] = []
-		deltas = model.getDeltas(allCoords)
-		supports = model.supports
-		assert len(deltas) == len(supports)
-		for i,(delta,support) in enumerate(zip(deltas[1:], supports[1:])):
-			var = GlyphVariation(support, delta)
+	for delta,support in zip(deltas[1:], supports[1:]):
+		glyphCoords = GlyphCoordinates.splitFlat(delta, offsets)
+		for glyph,coords in zip(glyphs, glyphCoords):
+			var = GlyphVariation(support, coords)
 			gvar.variations[glyph].append(var)
 
 def _add_HVAR(font, model, master_ttfs, axisTags):
 
 	print("Generating HVAR")
 
-	hAdvanceDeltas = {}
+	glyphOrder = font.getGlyphOrder()
 	metricses = [m["hmtx"].metrics for m in master_ttfs]
-	for glyph in font.getGlyphOrder():
-		hAdvances = [metrics[glyph][0] for metrics in metricses]
-		# TODO move round somewhere else?
-		hAdvanceDeltas[glyph] = tuple(round(d) for d in model.getDeltas(hAdvances)[1:])
+	hAdvances = [[metrics[glyph][0] for glyph in glyphOrder] for metrics in metricses]
+	deltas = model.getDeltasBatch(hAdvances)[1:]
+	if deltas and not isinstance(deltas[0], list):
+		deltas = [d.tolist() for d in deltas]
+	# TODO move round somewhere else?
+	hAdvanceDeltas = {glyph:tuple(round(d) for d in glyphDeltas)
+			  for glyph,glyphDeltas in zip(glyphOrder, zip(*deltas))}
 
 	# We only support the direct mapping right now.
 
@@ -1,6 +1,8 @@
 """Variation fonts interpolation models."""
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
+from itertools import repeat
+import operator
 
 __all__ = ['normalizeLocation', 'supportScalar', 'VariationModel']
 
@@ -215,6 +217,42 @@ class VariationModel(object):
 			out.append(delta)
 		return out
 
+	def getDeltasBatch(self, masterValues):
+		"""Like getDeltas, for many values at once.  masterValues is a list,
+		in the masters order, of equal-length sequences of numbers.  Returns
+		a list, in the model's order, of the sequences of deltas: NumPy
+		arrays of floats if NumPy is available, else lists.  The arithmetic
+		is the same as getDeltas', done a whole sequence at a time.
+		>>> model = VariationModel([{}, {'wght':1}, {'wdth':1}, \
+		{'wght':1,'wdth':1}, {'wght':.5,'wdth':1}])
+		>>> masterValues = [[0, 10], [100, 40], [30, 21], [150, 55], [60, 25]]
+		>>> deltas = model.getDeltasBatch(masterValues)
+		>>> [list(d) for d in zip(*deltas)] == \
+		[model.getDeltas(list(v)) for v in zip(*masterValues)]
+		True
+		"""
+		assert len(masterValues) == len(self.deltaWeights)
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+		mapping = self.reverseMapping
+		out = []
+		for i,weights in enumerate(self.deltaWeights):
+			if numpy is not None:
+				delta = numpy.array(masterValues[mapping[i]], dtype=float)
+				for j,weight in weights.items():
+					delta -= out[j] * weight
+			else:
+				delta = list(masterValues[mapping[i]])
+				for j,weight in weights.items():
+					other = out[j]
+					if weight != 1:
+						other = map(operator.mul, other, repeat(weight))
+					delta = list(map(operator.sub, delta, other))
+			out.append(delta)
+		return out
+
 	def interpolateFromDeltas(self, loc, deltas):
 		v = None
 		supports = self.supports
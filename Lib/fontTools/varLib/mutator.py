@@ -11,6 +11,202 @@ from fontTools.varLib import _GetCoordinates, _SetCoordinates
 from fontTools.varLib.models import VariationModel, supportScalar, normalizeLocation
 import os.path
 
+
+def iupDeltas(deltas, coords, endPts):
+	"""Return the deltas of a simple glyph with the deltas of the points
+	which have none (None items) inferred from those of their neighbours
+	on the same contour, as described in the 'gvar' spec. The points after
+	the last contour (phantom points) which have no delta get (0, 0).
+
+	>>> iupDeltas([(10, 0), None, (20, 0), None], [(0, 0), (5, 0), (10, 0), (20, 0)], [2])
+	[(10, 0), (15.0, 0), (20, 0), (0, 0)]
+	>>> iupDeltas([None, (5, -5), None], [(0, 0), (10, 10), (20, 20)], [2])
+	[(5, -5), (5, -5), (5, -5)]
+	"""
+	result = list(deltas)
+	start = 0
+	for end in endPts:
+		touched = [i for i in range(start, end + 1) if deltas[i] is not None]
+		if touched and len(touched) <= end - start:
+			for j, i1 in enumerate(touched):
+				i2 = touched[(j + 1) % len(touched)]
+				# the untouched points from i1 to i2, wrapping around the contour
+				if i2 > i1:
+					untouched = range(i1 + 1, i2)
+				else:
+					untouched = list(range(i1 + 1, end + 1)) + list(range(start, i2))
+				if not untouched:
+					continue
+				delta = [[], []]
+				for axis in (0, 1):
+					x1, x2 = coords[i1][axis], coords[i2][axis]
+					d1, d2 = deltas[i1][axis], deltas[i2][axis]
+					if x1 > x2:
+						x1, x2, d1, d2 = x2, x1, d2, d1
+					for i in untouched:
+						x = coords[i][axis]
+						if x1 == x2:
+							d = d1 if d1 == d2 else 0
+						elif x <= x1:
+							d = d1
+						elif x >= x2:
+							d = d2
+						else:
+							d = d1 + (x - x1) * (d2 - d1) / (x2 - x1)
+						delta[axis].append(d)
+				for i, dx, dy in zip(untouched, delta[0], delta[1]):
+					result[i] = (dx, dy)
+		start = end + 1
+	return [(0, 0) if d is None else d for d in result]
+
+
+class VariableFontInstancer(object):
+
+	"""Make static instances of a 'gvar' variation font at several locations.
+
+	The font is loaded once; the variations of all glyphs are decompiled and
+	interpolated (IUP) up front, and summed by region, so that making an
+	instance only costs a scalar per region and one multiply-add per delta.
+	The varfont argument is a TTFont, or a path or file to load one from.
+	"""
+
+	def __init__(self, varfont):
+		if isinstance(varfont, TTFont):
+			buf = BytesIO()
+			varfont.save(buf)
+			self.fontData = buf.getvalue()
+		elif isinstance(varfont, basestring):
+			with open(varfont, "rb") as f:
+				self.fontData = f.read()
+		else:
+			self.fontData = varfont.read()
+		varfont = TTFont(BytesIO(self.fontData))
+
+		self.axes = {a.axisTag:(a.minValue,a.defaultValue,a.maxValue) for a in varfont['fvar'].axes}
+		gvar = varfont['gvar']
+		glyf = varfont['glyf']
+		# (glyphName, start, end) of the glyphs' points in the whole-font arrays;
+		# composite glyphs last, since their bounds depend on their components
+		self.glyphs = []
+		composites = []
+		coordinates = []
+		regions = {}
+		for glyphName in varfont.getGlyphOrder():
+			coords, control = _GetCoordinates(varfont, glyphName)
+			start = len(coordinates)
+			coordinates.extend(coords)
+			isComposite = glyf[glyphName].isComposite()
+			if isComposite:
+				composites.append((glyphName, start, len(coordinates)))
+			else:
+				self.glyphs.append((glyphName, start, len(coordinates)))
+			for var in gvar.variations.get(glyphName, []):
+				deltas = var.coordinates
+				if None in deltas:
+					if isComposite:
+						# component offsets are not interpolated
+						deltas = [(0, 0) if d is None else d for d in deltas]
+					else:
+						deltas = iupDeltas(deltas, coords, control[0])
+				region = tuple(sorted(var.axes.items()))
+				indices, xDeltas, yDeltas = regions.setdefault(region, ([], [], []))
+				for i, (dx, dy) in enumerate(deltas, start):
+					if dx or dy:
+						indices.append(i)
+						xDeltas.append(dx)
+						yDeltas.append(dy)
+		self.glyphs.extend(composites)
+		self.regions = [dict(region) for region in regions]
+		self.coordinates = [c for point in coordinates for c in point]
+
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+		self.regionDeltas = []
+		for indices, xDeltas, yDeltas in regions.values():
+			if numpy is None:
+				self.regionDeltas.append((indices, xDeltas, yDeltas))
+				continue
+			# the deltas of several tuples of a glyph with the same region are summed
+			indices, inverse = numpy.unique(numpy.array(indices, dtype=int), return_inverse=True)
+			self.regionDeltas.append((indices,
+					numpy.bincount(inverse, weights=xDeltas, minlength=len(indices)),
+					numpy.bincount(inverse, weights=yDeltas, minlength=len(indices))))
+		if numpy is not None:
+			self.coordinates = numpy.array(self.coordinates, dtype=float).reshape(-1, 2)
+
+	def normalizeLocation(self, location):
+		return normalizeLocation(location, self.axes)
+
+	def getScalars(self, location):
+		"""Return the scalar of each region at a (normalized) location."""
+		return [supportScalar(location, region) for region in self.regions]
+
+	def getCoordinates(self, location):
+		"""Return the coordinates of all the points of the font (with the
+		glyphs' phantom points) at a (normalized) location, as a sequence of
+		(x, y) pairs which may be sliced by the offsets in 'glyphs'.
+		"""
+		coordinates = self.coordinates
+		if isinstance(coordinates, list):
+			result = list(coordinates)
+			for scalar, (indices, xDeltas, yDeltas) in zip(self.getScalars(location), self.regionDeltas):
+				if not scalar:
+					continue
+				for i, dx, dy in zip(indices, xDeltas, yDeltas):
+					result[2*i] += dx * scalar
+					result[2*i+1] += dy * scalar
+			return list(zip(result[0::2], result[1::2]))
+		result = coordinates.copy()
+		for scalar, (indices, xDeltas, yDeltas) in zip(self.getScalars(location), self.regionDeltas):
+			if not scalar:
+				continue
+			result[indices, 0] += xDeltas * scalar
+			result[indices, 1] += yDeltas * scalar
+		return result.tolist()
+
+	def instantiate(self, location, normalized=False):
+		"""Return a new TTFont with the instance at 'location', which is in
+		user coordinates unless 'normalized' is true.
+		"""
+		if not normalized:
+			location = self.normalizeLocation(location)
+		coordinates = self.getCoordinates(location)
+		font = TTFont(BytesIO(self.fontData))
+		for glyphName, start, end in self.glyphs:
+			_SetCoordinates(font, glyphName, GlyphCoordinates(coordinates[start:end]))
+		for tag in ('fvar','avar','gvar'):
+			if tag in font:
+				del font[tag]
+		return font
+
+	def saveInstance(self, location, outfile, normalized=False):
+		self.instantiate(location, normalized).save(outfile)
+
+	def saveInstances(self, locations, outfiles, normalized=False, workers=None):
+		"""Save the instances at each of 'locations' to the corresponding
+		'outfiles'. If 'workers' is greater than 1, the instances are made by
+		a pool of as many processes (this requires the concurrent.futures
+		module, which on Python 2 is the 'futures' backport).
+		"""
+		assert len(locations) == len(outfiles)
+		if workers is not None and workers > 1:
+			from concurrent.futures import ProcessPoolExecutor
+			with ProcessPoolExecutor(max_workers=workers) as executor:
+				futures = [executor.submit(_saveInstance, self, location, outfile, normalized)
+						for location, outfile in zip(locations, outfiles)]
+				for future in futures:
+					future.result()
+		else:
+			for location, outfile in zip(locations, outfiles):
+				self.saveInstance(location, outfile, normalized)
+
+
+def _saveInstance(instancer, location, outfile, normalized):
+	instancer.saveInstance(location, outfile, normalized)
+
+
 def main(args=None):
 
 	if args is None:
@@ -29,32 +225,15 @@ def main(args=None):
 	print("Location:", loc)
 
 	print("Loading GX font")
-	varfont = TTFont(varfilename)
+	instancer = VariableFontInstancer(varfilename)
 
-	fvar = varfont['fvar']
-	axes = {a.axisTag:(a.minValue,a.defaultValue,a.maxValue) for a in fvar.axes}
 	# TODO Round to F2Dot14?
-	loc = normalizeLocation(loc, axes)
+	loc = instancer.normalizeLocation(loc)
 	# Location is normalized now
 	print("Normalized location:", loc)
 
-	gvar = varfont['gvar']
-	for glyphname,variations in gvar.variations.items():
-		coordinates,_ = _GetCoordinates(varfont, glyphname)
-		for var in variations:
-			scalar = supportScalar(loc, var.axes)
-			if not scalar: continue
-			# TODO Do IUP / handle None items
-			coordinates += GlyphCoordinates(var.coordinates) * scalar
-		_SetCoordinates(varfont, glyphname, coordinates)
-
-	print("Removing GX tables")
-	for tag in ('fvar','avar','gvar'):
-		if tag in varfont:
-			del varfont[tag]
-
 	print("Saving instance font", outfile)
-	varfont.save(outfile)
+	instancer.saveInstance(loc, outfile, normalized=True)
 
 
 if __name__ == "__main__":
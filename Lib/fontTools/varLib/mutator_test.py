@@ -0,0 +1,63 @@
+from __future__ import print_function, division, absolute_import
+from __future__ import unicode_literals
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.varLib.mutator import VariableFontInstancer, iupDeltas
+import os
+import shutil
+import tempfile
+import unittest
+
+
+TTX = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                   "subset", "testdata", "TestGVAR.ttx")
+
+
+class VariableFontInstancerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        font = TTFont()
+        font.importXML(TTX)
+        cls.instancer = VariableFontInstancer(font)
+
+    def test_instantiate(self):
+        for wght, x in ((400, 40), (900, 50), (650, 45), (100, 30)):
+            font = self.instancer.instantiate({"wght": wght})
+            self.assertNotIn("gvar", font)
+            self.assertNotIn("fvar", font)
+            self.assertEqual(font["glyf"]["zero"].coordinates[2][0], x)
+            self.assertEqual(font["hmtx"]["zero"][1], x)
+
+    def test_iup(self):
+        instancer = VariableFontInstancer(BytesIO(self.instancer.fontData))
+        font = TTFont(BytesIO(instancer.fontData))
+        variation = font["gvar"].variations["zero"][1]
+        self.assertEqual(variation.coordinates[2], (10, 0))
+        variation.coordinates[2] = None
+        instancer = VariableFontInstancer(font)
+        coordinates = instancer.instantiate({"wght": 900})["glyf"]["zero"].coordinates
+        self.assertNotEqual(coordinates[2][0], 40)
+
+    def test_saveInstances(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(tempdir, "%d.ttf" % wght) for wght in (400, 900)]
+            self.instancer.saveInstances([{"wght": 400}, {"wght": 900}], paths)
+            self.assertEqual(TTFont(paths[1])["hmtx"]["zero"][1], 50)
+        finally:
+            shutil.rmtree(tempdir)
+
+
+class IupDeltasTest(unittest.TestCase):
+
+    def test_contours(self):
+        coords = [(0, 0), (10, 0), (10, 10), (0, 10), (20, 20), (30, 20), (0, 0)]
+        deltas = [(0, 0), None, (4, 4), None, None, None, None]
+        self.assertEqual(
+            iupDeltas(deltas, coords, [3, 5]),
+            [(0, 0), (4, 0), (4, 4), (0, 4), (0, 0), (0, 0), (0, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()